@@ -6,6 +6,11 @@ Unified Medical Report Summarizer & Symptom Checker Backend
 from flask import Flask
 from flask_cors import CORS
 from config import Config
+from utils.metrics import init_request_metrics
+from utils.profiling import init_profiling
+from utils.deadline import init_request_deadline
+from utils.usage import init_usage_tracking
+from services.upload_validator import init_upload_validation
 import os
 
 # Initialize Flask app
@@ -18,14 +23,16 @@ if cors_origins == ['*']:
     # Allow all origins (for development/testing)
     CORS(app, 
          resources={r"/api/*": {"origins": "*"}},
-         allow_headers=['Content-Type', 'Authorization', 'Accept'],
+         allow_headers=['Content-Type', 'Authorization', 'Accept', Config.PROFILING_HEADER, Config.IDEMPOTENCY_HEADER],
+         expose_headers=['Server-Timing', 'X-Profile-Id', 'X-Profile-Dump', 'Idempotent-Replayed'],
          methods=['GET', 'POST', 'PUT', 'DELETE', 'OPTIONS'],
          supports_credentials=False)
 else:
     # Allow specific origins
     CORS(app, 
          origins=cors_origins,
-         allow_headers=['Content-Type', 'Authorization', 'Accept'],
+         allow_headers=['Content-Type', 'Authorization', 'Accept', Config.PROFILING_HEADER, Config.IDEMPOTENCY_HEADER],
+         expose_headers=['Server-Timing', 'X-Profile-Id', 'X-Profile-Dump', 'Idempotent-Replayed'],
          methods=['GET', 'POST', 'PUT', 'DELETE', 'OPTIONS'],
          supports_credentials=False)
 
@@ -34,14 +41,35 @@ os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 os.makedirs(app.config['CHROMA_DB_PATH'], exist_ok=True)
 os.makedirs(app.config['EMBEDDINGS_PATH'], exist_ok=True)
 
+# Record per-endpoint latency and status counts
+init_request_metrics(app)
+
+# Bound every request by REQUEST_DEADLINE_SECONDS (honoured by LLM calls and retries)
+init_request_deadline(app)
+
+# Account LLM token usage and cost per request
+init_usage_tracking(app)
+
+# Check uploads by content while they stream in (magic bytes, pixel budget)
+init_upload_validation(app)
+
+# Opt-in per-request stage timing (Server-Timing header / X-Profile: 1)
+init_profiling(app)
+
 # Register blueprints
 from routes.summarize import summarize_bp
 from routes.symptoms import symptoms_bp
 from routes.ocr import ocr_bp
+from routes.medications import medications_bp
+from routes.metrics import metrics_bp
+from routes.admin import admin_bp
 
 app.register_blueprint(summarize_bp, url_prefix='/api')
 app.register_blueprint(symptoms_bp, url_prefix='/api')
 app.register_blueprint(ocr_bp, url_prefix='/api')
+app.register_blueprint(medications_bp, url_prefix='/api')
+app.register_blueprint(metrics_bp)
+app.register_blueprint(admin_bp, url_prefix='/api')
 
 @app.route('/')
 def health_check():
@@ -60,7 +88,10 @@ def api_health():
         'endpoints': {
             'ocr': '/api/ocr',
             'summarize': '/api/summarize',
-            'symptom-check': '/api/symptom-check'
+            'symptom-check': '/api/symptom-check',
+            'medications': '/api/medications',
+            'metrics': '/metrics',
+            'admin-usage': '/api/admin/usage'
         }
     }, 200
 
@@ -0,0 +1,59 @@
+"""
+End-to-End Benchmarks - Flask test client requests against the mock LLM provider
+"""
+
+import io
+import os
+from benchmarks.harness import measure, BenchmarkSkipped
+from benchmarks.fixtures import medical_report, pdf_bytes
+
+GROUP = 'e2e'
+
+def configure_mock_provider(latency_ms=0.0):
+    """Point the app at the offline mock provider; must run before the app is imported"""
+    os.environ['LLM_PROVIDER'] = 'mock'
+    os.environ.setdefault('MOCK_LLM_LATENCY_MS', str(latency_ms))
+    os.environ.setdefault('MOCK_LLM_TOKENS_PER_SECOND', '0')
+    os.environ.setdefault('HF_HUB_OFFLINE', '1')
+    os.environ.setdefault('METRICS_TOKEN', 'benchmark-metrics-token')
+
+def run(results, quick=False):
+    try:
+        from app import app
+    except Exception as e:
+        raise BenchmarkSkipped(f"app failed to start: {str(e)}")
+
+    from config import Config
+    if Config.LLM_PROVIDER != 'mock':
+        raise BenchmarkSkipped("end-to-end benchmarks require LLM_PROVIDER=mock")
+
+    client = app.test_client()
+
+    def post_ok(path, **kwargs):
+        response = client.post(path, **kwargs)
+        if response.status_code != 200:
+            raise RuntimeError(f"{path} returned {response.status_code}: {response.get_data(as_text=True)[:200]}")
+        return response
+
+    for size in ([2_000] if quick else [2_000, 20_000, 200_000]):
+        report = medical_report(size)
+        stats = measure(lambda: post_ok('/api/summarize', json={'text': report}), repeat=10)
+        results.add(GROUP, f"summarize/{size // 1000}KB", stats, requests_per_s=round(1 / stats['median_s'], 1))
+
+    stats = measure(lambda: post_ok('/api/symptom-check', json={'symptoms': 'fever, cough and sore throat for 3 days'}),
+                    repeat=20)
+    results.add(GROUP, "symptom_check", stats, requests_per_s=round(1 / stats['median_s'], 1))
+
+    # Red-flag symptoms are answered by the triage rules, without retrieval or the LLM
+    stats = measure(lambda: post_ok('/api/symptom-check', json={'symptoms': 'chest pain and shortness of breath'}),
+                    repeat=20)
+    results.add(GROUP, "symptom_check_red_flag", stats, requests_per_s=round(1 / stats['median_s'], 1))
+
+    document = pdf_bytes(5)
+    stats = measure(lambda: post_ok('/api/ocr', data={'file': (io.BytesIO(document), 'report.pdf')},
+                                    content_type='multipart/form-data'), repeat=10)
+    results.add(GROUP, "ocr_pdf/5_pages", stats, requests_per_s=round(1 / stats['median_s'], 1))
+
+    scrape_headers = {'Authorization': f"Bearer {Config.METRICS_TOKEN or Config.ADMIN_TOKEN}"}
+    stats = measure(lambda: client.get('/metrics', headers=scrape_headers), repeat=20)
+    results.add(GROUP, "metrics_scrape", stats)
@@ -0,0 +1,31 @@
+"""
+OCR Benchmarks - OCRService on generated report images
+"""
+
+import os
+import tempfile
+from benchmarks.harness import measure, BenchmarkSkipped
+from benchmarks.fixtures import report_image
+
+GROUP = 'ocr'
+
+def run(results, quick=False):
+    try:
+        from services.ocr_service import OCRService
+        service = OCRService()
+        if service.ocr_method == 'tesseract':
+            service.pytesseract.get_tesseract_version()
+    except Exception as e:
+        raise BenchmarkSkipped(f"OCR engine unavailable: {str(e).splitlines()[0]}")
+
+    layouts = [(620, 877, 20)] if quick else [(620, 877, 20), (1240, 1754, 40), (2480, 3508, 60)]
+    with tempfile.TemporaryDirectory() as directory:
+        for width, height, lines in layouts:
+            path = os.path.join(directory, f"page_{width}x{height}.png")
+            report_image(width, height, lines).save(path)
+
+            stats = measure(lambda: service.extract_text_from_image(path), repeat=3, warmup=1)
+            text, confidence = service.extract_text_from_image(path)
+            results.add(GROUP, f"{service.ocr_method}/{width}x{height}", stats,
+                        megapixels=round(width * height / 1e6, 2), chars=len(text),
+                        confidence=round(confidence, 3))
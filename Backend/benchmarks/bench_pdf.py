@@ -0,0 +1,30 @@
+"""
+PDF Benchmarks - PDFReader.extract_text on synthetic multi-page documents
+"""
+
+import os
+import tempfile
+from benchmarks.harness import measure, BenchmarkSkipped
+from benchmarks.fixtures import pdf_bytes
+
+GROUP = 'pdf_reader'
+
+def run(results, quick=False):
+    try:
+        from utils.pdf_reader import PDFReader
+        reader = PDFReader()
+    except ImportError as e:
+        raise BenchmarkSkipped(str(e))
+
+    page_counts = [1, 10] if quick else [1, 10, 50, 200]
+    with tempfile.TemporaryDirectory() as directory:
+        for pages in page_counts:
+            path = os.path.join(directory, f"report_{pages}.pdf")
+            with open(path, 'wb') as pdf_file:
+                pdf_file.write(pdf_bytes(pages))
+
+            stats = measure(lambda: reader.extract_text(path), repeat=3 if pages >= 50 else 5)
+            results.add(GROUP, f"extract_text/{pages}_pages", stats,
+                        pages=pages, file_bytes=os.path.getsize(path),
+                        ms_per_page=round(stats['median_s'] * 1000 / pages, 3),
+                        chars=len(reader.extract_text(path)))
@@ -0,0 +1,107 @@
+"""
+Retrieval Benchmarks - Embedding, vector search, context assembly and ingestion dedup
+"""
+
+import os
+import tempfile
+from benchmarks.harness import measure, BenchmarkSkipped
+from benchmarks.fixtures import knowledge_corpus, hashed_embeddings
+
+GROUP = 'retrieval'
+
+QUERIES = [
+    "fever cough and body aches",
+    "frequent urination and increased thirst",
+    "severe headache with nausea and light sensitivity",
+    "wheezing and chest tightness at night"
+]
+
+def _load_embedding_model():
+    """SentenceTransformer from the local cache only (never downloads during a benchmark)"""
+    os.environ.setdefault('HF_HUB_OFFLINE', '1')
+    try:
+        from sentence_transformers import SentenceTransformer
+        from config import Config
+        return SentenceTransformer(Config.EMBEDDING_MODEL)
+    except Exception:
+        return None
+
+def run(results, quick=False):
+    try:
+        import numpy  # noqa: F401
+    except ImportError as e:
+        raise BenchmarkSkipped(str(e))
+
+    from services.kb_snapshot import KnowledgeBaseSnapshot
+    from services.context_assembler import ContextAssembler
+    from services.near_duplicates import MinHashDeduplicator
+
+    sizes = [1_000, 10_000] if quick else [1_000, 10_000, 50_000]
+    assembler = ContextAssembler()
+    model = _load_embedding_model()
+
+    if model is not None:
+        texts, _ = knowledge_corpus(256)
+        stats = measure(lambda: model.encode(texts, batch_size=64), repeat=3)
+        results.add(GROUP, "embedding/sentence_transformers_256_docs", stats,
+                    docs_per_s=round(256 / stats['median_s'], 1))
+        stats = measure(lambda: model.encode(QUERIES[0]), repeat=20)
+        results.add(GROUP, "embedding/sentence_transformers_query", stats)
+    else:
+        results.skip(f"{GROUP}/embedding", "embedding model not installed or not cached locally")
+
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            texts, metadatas = knowledge_corpus(size)
+            stats = measure(lambda: hashed_embeddings(texts), repeat=1, warmup=0)
+            embeddings = hashed_embeddings(texts)
+            results.add(GROUP, f"embedding/hashed/{size}", stats, docs=size)
+
+            path = os.path.join(directory, f"kb_{size}.mskb")
+            ids = [f"doc_{index}" for index in range(size)]
+            stats = measure(lambda: KnowledgeBaseSnapshot.export(path, ids, texts, metadatas, embeddings, 'hashed'),
+                            repeat=1, warmup=0)
+            results.add(GROUP, f"snapshot_export/{size}", stats, file_bytes=os.path.getsize(path))
+
+            stats = measure(lambda: KnowledgeBaseSnapshot.load(path, verify=True), repeat=3)
+            results.add(GROUP, f"snapshot_load/{size}", stats)
+            snapshot = KnowledgeBaseSnapshot.load(path)
+
+            query_vectors = hashed_embeddings(QUERIES)
+            snapshot.search(query_vectors[0], 20)  # normalise once outside the timed loop
+            stats = measure(lambda: [snapshot.search(vector, 20) for vector in query_vectors], repeat=5)
+            results.add(GROUP, f"dense_search/{size}", stats, queries=len(QUERIES))
+
+            stats = measure(lambda: [snapshot.lexical_search(query, 20) for query in QUERIES], repeat=5)
+            results.add(GROUP, f"lexical_search/{size}", stats, queries=len(QUERIES))
+
+            candidates = snapshot.search(query_vectors[0], 20)
+            stats = measure(lambda: assembler.assemble(candidates, query_vectors[0]), repeat=20)
+            results.add(GROUP, f"context_assembly/{size}", stats, candidates=len(candidates))
+
+            if size <= 10_000:
+                def deduplicate():
+                    return MinHashDeduplicator().filter(texts)
+                stats = measure(deduplicate, repeat=1, warmup=0)
+                kept, dropped = deduplicate()
+                results.add(GROUP, f"minhash_dedup/{size}", stats, dropped=len(dropped),
+                            docs_per_s=round(size / stats['median_s'], 1))
+
+        try:
+            import chromadb
+        except ImportError:
+            results.skip(f"{GROUP}/chroma", "chromadb not installed")
+            return
+
+        client = chromadb.EphemeralClient()
+        for size in sizes:
+            texts, metadatas = knowledge_corpus(size)
+            embeddings = hashed_embeddings(texts).tolist()
+            collection = client.create_collection(f"bench_{size}")
+            for start in range(0, size, 5000):
+                collection.add(ids=[f"doc_{index}" for index in range(start, min(size, start + 5000))],
+                               documents=texts[start:start + 5000], metadatas=metadatas[start:start + 5000],
+                               embeddings=embeddings[start:start + 5000])
+            query_vectors = hashed_embeddings(QUERIES).tolist()
+            stats = measure(lambda: collection.query(query_embeddings=query_vectors, n_results=20), repeat=5)
+            results.add(GROUP, f"chroma_query/{size}", stats, queries=len(QUERIES))
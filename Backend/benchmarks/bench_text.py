@@ -0,0 +1,99 @@
+"""
+Text Cleaning Benchmarks - TextCleaner, report condensing, medication and lab extraction on large inputs
+"""
+
+import re
+from benchmarks.harness import measure
+from benchmarks.fixtures import medical_report
+from services.text_cleaner import TextCleaner
+from services.report_sections import ReportSegmenter
+from services.medication_extractor import MedicationExtractor
+from services.lab_parser import LabParser
+
+GROUP = 'text_cleaner'
+
+def legacy_clean_text(text):
+    """The multi-pass clean_text this module replaced, kept as the comparison baseline"""
+    if not text:
+        return ""
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r'[^\w\s\.\,\;\:\-\+\%\°\/\(\)]', ' ', text)
+    text = text.replace('\n', ' ').replace('\r', ' ')
+    text = re.sub(r' +', ' ', text)
+    return text.strip()
+
+def legacy_extract_sections(text):
+    """The per-section DOTALL regex extract_sections, kept as the comparison baseline"""
+    sections = {}
+    section_patterns = {
+        'diagnosis': r'(?:diagnosis|diagnoses|dx)[:]\s*(.+?)(?=\n\n|\n[A-Z]|$)',
+        'medications': r'(?:medications|meds|prescription|rx)[:]\s*(.+?)(?=\n\n|\n[A-Z]|$)',
+        'test_results': r'(?:test results|lab results|findings)[:]\s*(.+?)(?=\n\n|\n[A-Z]|$)',
+        'recommendations': r'(?:recommendations|follow.?up|advice)[:]\s*(.+?)(?=\n\n|\n[A-Z]|$)'
+    }
+    for section_name, pattern in section_patterns.items():
+        matches = re.findall(pattern, text, re.IGNORECASE | re.DOTALL)
+        if matches:
+            sections[section_name] = matches[0].strip()
+    return sections
+
+def run(results, quick=False):
+    cleaner = TextCleaner()
+    segmenter = ReportSegmenter(text_cleaner=cleaner)
+    extractor = MedicationExtractor()
+    lab_parser = LabParser()
+    sizes = [10_000, 100_000] if quick else [10_000, 100_000, 1_000_000, 4_000_000]
+
+    for size in sizes:
+        text = medical_report(size)
+        repeat = 3 if size >= 1_000_000 else 10
+        label = f"{size // 1000}KB"
+
+        stats = measure(lambda: legacy_clean_text(text), repeat=repeat)
+        legacy = legacy_clean_text(text)
+        results.add(GROUP, f"clean_text_legacy/{label}", stats,
+                    input_bytes=len(text), output_bytes=len(legacy),
+                    mb_per_s=round(len(text) / stats['median_s'] / 1e6, 2))
+
+        stats = measure(lambda: cleaner.clean_text(text), repeat=repeat)
+        cleaned = cleaner.clean_text(text)
+        # OCR artifact fixes (hyphenation, ligatures, repeated letterheads) shrink the output
+        results.add(GROUP, f"clean_text/{label}", stats,
+                    input_bytes=len(text), output_bytes=len(cleaned),
+                    output_vs_legacy=round(len(cleaned) / max(len(legacy), 1), 3),
+                    mb_per_s=round(len(text) / stats['median_s'] / 1e6, 2))
+
+        chunks = [text[start:start + 64 * 1024] for start in range(0, len(text), 64 * 1024)]
+        stats = measure(lambda: sum(len(piece) for piece in cleaner.clean_stream(chunks)), repeat=repeat)
+        results.add(GROUP, f"clean_stream_64KB_chunks/{label}", stats,
+                    input_bytes=len(text), mb_per_s=round(len(text) / stats['median_s'] / 1e6, 2))
+
+        stats = measure(lambda: legacy_extract_sections(text), repeat=repeat)
+        results.add(GROUP, f"extract_sections_legacy/{label}", stats,
+                    input_bytes=len(text), sections=len(legacy_extract_sections(text)),
+                    mb_per_s=round(len(text) / stats['median_s'] / 1e6, 2))
+
+        stats = measure(lambda: cleaner.extract_sections(text), repeat=repeat)
+        results.add(GROUP, f"extract_sections/{label}", stats,
+                    input_bytes=len(text), sections=len(cleaner.extract_sections(text)),
+                    mb_per_s=round(len(text) / stats['median_s'] / 1e6, 2))
+
+        # Section-aware prompt input: boilerplate, identifiers and repeated pages dropped
+        stats = measure(lambda: segmenter.condense(text), repeat=repeat)
+        condensed = segmenter.condense(text)
+        results.add(GROUP, f"condense_report/{label}", stats,
+                    input_bytes=len(text), original_tokens=condensed['original_tokens'],
+                    prompt_tokens=condensed['prompt_tokens'],
+                    saved_ratio=round(condensed['saved_tokens'] / max(condensed['original_tokens'], 1), 3),
+                    mb_per_s=round(len(text) / stats['median_s'] / 1e6, 2))
+
+        stats = measure(lambda: extractor.extract(text), repeat=repeat)
+        results.add(GROUP, f"extract_medications/{label}", stats,
+                    input_bytes=len(text), medications=len(extractor.extract(text)),
+                    mb_per_s=round(len(text) / stats['median_s'] / 1e6, 2))
+
+        stats = measure(lambda: lab_parser.parse(text), repeat=repeat)
+        lab_results = lab_parser.parse(text)
+        results.add(GROUP, f"parse_labs/{label}", stats,
+                    input_bytes=len(text), rows=len(lab_results), abnormal=len(lab_results.abnormal_indices()),
+                    mb_per_s=round(len(text) / stats['median_s'] / 1e6, 2))
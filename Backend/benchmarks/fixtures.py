@@ -0,0 +1,210 @@
+"""
+Benchmark Fixtures - Deterministic synthetic reports, PDFs, images and corpora
+"""
+
+import random
+
+_REPORT_HEADER = """CITY GENERAL HOSPITAL - DEPARTMENT OF INTERNAL MEDICINE
+123 Health Avenue, Springfield | Tel: (555) 010-2030 | www.citygeneral.example
+PATIENT: John Doe    DOB: 1965-04-12    MRN: 00451287
+DATE: 2024-01-15    REFERRING PHYSICIAN: Dr. A. Smith
+"""
+
+_REPORT_SECTIONS = [
+    """DIAGNOSIS: Type 2 Diabetes Mellitus with early diabetic nephropathy.
+Hypertension, stage 1. Hyperlipidemia.
+""",
+    """LAB RESULTS:
+Fasting Blood Glucose    126 mg/dL     70 - 99
+HbA1c                    7.2 %         4.0 - 5.6
+Total Cholesterol        210 mg/dL     < 200
+LDL Cholesterol          140 mg/dL     < 100
+HDL Cholesterol          38 mg/dL      > 40
+Creatinine               1.4 mg/dL     0.6 - 1.2
+Potassium                4.1 mmol/L    3.5 - 5.1
+Hemoglobin               13.2 g/dL     13.5 - 17.5
+""",
+    """MEDICATIONS PRESCRIBED:
+- Metformin 500mg, twice daily with meals
+- Lisinopril 10 mg once daily
+- Atorvastatin 20 mg at bedtime
+- Aspirin 81mg daily
+""",
+    """FINDINGS: Patient reports increased thirst and frequent urination over three months.
+Mild peripheral neuropathy noted on monofilament testing. Blood pressure 142/88 mmHg.
+BMI 31.4. No retinopathy on fundoscopic examination.
+""",
+    """RECOMMENDATIONS: Follow-up in 3 months with repeat HbA1c and lipid panel.
+Dietary consultation for carbohydrate counting. Daily foot inspection.
+Increase physical activity to 150 minutes per week.
+""",
+    """This report is confidential and intended solely for the named recipient.
+If you have received it in error please notify the sender and destroy all copies.
+Page 1 of 1
+"""
+]
+
+_FILLER_WORDS = (
+    "patient reports mild fatigue intermittent headache stable vitals no acute distress "
+    "abdomen soft non-tender lungs clear bilaterally heart regular rate rhythm no murmurs "
+    "extremities without edema neurological exam grossly intact follow-up advised"
+).split()
+
+def medical_report(target_bytes, seed=7):
+    """
+    Build an OCR-like medical report of roughly target_bytes characters
+
+    Repeats letterhead/footer per page and sprinkles OCR artifacts (hyphenated
+    line breaks, ligatures, stray symbols) so cleaning has realistic work to do.
+    """
+    rng = random.Random(seed)
+    pages = []
+    size = 0
+    page_number = 1
+    while size < target_bytes:
+        body = []
+        for section in _REPORT_SECTIONS[:-1]:
+            body.append(section)
+            filler = ' '.join(rng.choice(_FILLER_WORDS) for _ in range(rng.randint(40, 120)))
+            # OCR artifacts: hyphenation across line breaks, ligatures, noise symbols
+            filler = filler.replace('follow-up', 'fol-\nlow-up').replace('fi', 'ﬁ', 1)
+            body.append(filler + ' ~~ | ** •\n')
+        page = _REPORT_HEADER + '\n' + '\n'.join(body) + _REPORT_SECTIONS[-1].replace('Page 1', f'Page {page_number}')
+        pages.append(page)
+        size += len(page)
+        page_number += 1
+    return '\f'.join(pages)[:max(target_bytes, 1)]
+
+def pdf_bytes(pages, lines_per_page=45, seed=11):
+    """
+    Write a minimal multi-page text PDF without third-party writers
+
+    Args:
+        pages: Number of pages
+        lines_per_page: Text lines per page
+
+    Returns:
+        PDF file content as bytes
+    """
+    rng = random.Random(seed)
+
+    def escape(text):
+        return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+    objects = []
+    # 1: catalog, 2: pages tree, 3: font; page/content pairs follow
+    page_ids = [4 + 2 * index for index in range(pages)]
+    objects.append(b"<< /Type /Catalog /Pages 2 0 R >>")
+    kids = ' '.join(f"{page_id} 0 R" for page_id in page_ids)
+    objects.append(f"<< /Type /Pages /Kids [{kids}] /Count {pages} >>".encode('ascii'))
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    report_lines = [line for section in _REPORT_SECTIONS for line in section.splitlines() if line.strip()]
+    for index, page_id in enumerate(page_ids):
+        lines = [f"Page {index + 1} - Laboratory and clinical summary"]
+        while len(lines) < lines_per_page:
+            lines.append(rng.choice(report_lines))
+        stream = ["BT", "/F1 10 Tf", "12 TL", "50 780 Td"]
+        for line in lines:
+            stream.append(f"({escape(line)}) Tj T*")
+        stream.append("ET")
+        content = '\n'.join(stream).encode('latin-1', 'replace')
+
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {page_id + 1} 0 R >>".encode('ascii')
+        )
+        objects.append(b"<< /Length " + str(len(content)).encode('ascii') + b" >>\nstream\n" + content + b"\nendstream")
+
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output += f"{number} 0 obj\n".encode('ascii') + body + b"\nendobj\n"
+
+    xref_offset = len(output)
+    output += f"xref\n0 {len(objects) + 1}\n".encode('ascii')
+    output += b"0000000000 65535 f \n"
+    for offset in offsets:
+        output += f"{offset:010d} 00000 n \n".encode('ascii')
+    output += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n".encode('ascii')
+    return bytes(output)
+
+def report_image(width=1240, height=1754, lines=40, seed=5):
+    """
+    Render report text onto a white page image (A4 at 150 dpi by default)
+
+    Returns:
+        PIL.Image.Image in grayscale
+    """
+    from PIL import Image, ImageDraw, ImageFont
+
+    rng = random.Random(seed)
+    image = Image.new('L', (width, height), color=255)
+    draw = ImageDraw.Draw(image)
+    try:
+        font = ImageFont.load_default(size=22)
+    except TypeError:
+        font = ImageFont.load_default()
+
+    report_lines = [line for section in _REPORT_SECTIONS for line in section.splitlines() if line.strip()]
+    y = 60
+    for _ in range(lines):
+        draw.text((60, y), rng.choice(report_lines), fill=0, font=font)
+        y += int((height - 120) / lines)
+    return image
+
+_CONDITIONS = [
+    ("Influenza", "fever, cough, sore throat, body aches and fatigue", "rest, fluids and antivirals for high-risk patients"),
+    ("Type 2 Diabetes", "increased thirst, frequent urination, fatigue and blurred vision", "diet, exercise and metformin"),
+    ("Migraine", "severe headache, nausea, vomiting and sensitivity to light", "triptans, rest in a dark room and trigger avoidance"),
+    ("Hypertension", "often no symptoms, sometimes headache or nosebleeds", "ACE inhibitors, salt restriction and exercise"),
+    ("Asthma", "wheezing, shortness of breath, chest tightness and cough", "inhaled corticosteroids and bronchodilators"),
+    ("Gastroenteritis", "diarrhea, vomiting, abdominal cramps and low-grade fever", "oral rehydration and rest"),
+    ("Pneumonia", "fever, productive cough, chest pain and shortness of breath", "antibiotics and supportive care"),
+    ("Anemia", "fatigue, pallor, dizziness and shortness of breath on exertion", "iron supplementation and treating the cause")
+]
+
+def knowledge_corpus(size, seed=3, duplicate_fraction=0.1):
+    """
+    Generate knowledge-base passages, including a share of near-duplicate mirrors
+
+    Returns:
+        Tuple of (texts, metadatas)
+    """
+    rng = random.Random(seed)
+    texts = []
+    metadatas = []
+    for index in range(size):
+        if texts and rng.random() < duplicate_fraction:
+            # Mirrored fact sheet with a cosmetic difference
+            source = rng.randrange(len(texts))
+            texts.append(texts[source] + " Source: mirror site.")
+            metadatas.append(dict(metadatas[source], source='mirror'))
+            continue
+        name, symptoms, treatment = rng.choice(_CONDITIONS)
+        filler = ' '.join(rng.choice(_FILLER_WORDS) for _ in range(rng.randint(20, 60)))
+        texts.append(
+            f"{name} (entry {index}) commonly presents with {symptoms}. "
+            f"Management typically includes {treatment}. Clinical note: {filler}."
+        )
+        metadatas.append({'source': rng.choice(['WHO', 'NIH', 'CDC']), 'category': name.lower().replace(' ', '_')})
+    return texts, metadatas
+
+def hashed_embeddings(texts, dimension=384, seed=13):
+    """
+    Cheap deterministic pseudo-embeddings (bag of hashed words) for offline retrieval benchmarks
+
+    Returns:
+        float32 array of shape (len(texts), dimension)
+    """
+    import zlib
+    import numpy as np
+
+    matrix = np.zeros((len(texts), dimension), dtype=np.float32)
+    for row, text in enumerate(texts):
+        for word in text.lower().split():
+            bucket = zlib.crc32(word.encode('utf-8'), seed) % dimension
+            matrix[row, bucket] += 1.0
+    matrix /= np.linalg.norm(matrix, axis=1, keepdims=True) + 1e-12
+    return matrix
@@ -0,0 +1,99 @@
+"""
+Benchmark Harness - Timing, statistics and result bookkeeping
+"""
+
+import gc
+import os
+import sys
+import time
+import platform
+import statistics
+import subprocess
+
+class BenchmarkSkipped(Exception):
+    """Raised by a benchmark whose dependency (binary, package, model) is unavailable"""
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * (len(sorted_values) - 1)))))
+    return sorted_values[index]
+
+def measure(function, repeat=5, warmup=1, min_time=0.0):
+    """
+    Time a zero-argument callable
+
+    Args:
+        function: Callable to benchmark
+        repeat: Number of timed runs (at least)
+        warmup: Untimed runs before measuring
+        min_time: Keep repeating until this many seconds have been measured
+
+    Returns:
+        Dictionary of timing statistics in seconds
+    """
+    for _ in range(warmup):
+        function()
+
+    timings = []
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        while len(timings) < repeat or sum(timings) < min_time:
+            started = time.perf_counter()
+            function()
+            timings.append(time.perf_counter() - started)
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+    ordered = sorted(timings)
+    return {
+        'runs': len(timings),
+        'min_s': ordered[0],
+        'median_s': statistics.median(ordered),
+        'mean_s': statistics.fmean(ordered),
+        'p95_s': _percentile(ordered, 0.95),
+        'stdev_s': statistics.stdev(ordered) if len(ordered) > 1 else 0.0
+    }
+
+def environment():
+    """Describe the machine and commit a result set was produced on"""
+    commit = None
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, timeout=10
+        ).stdout.strip() or None
+    except Exception:
+        pass
+
+    return {
+        'commit': commit,
+        'python': sys.version.split()[0],
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine(),
+        'cpu_count': os.cpu_count()
+    }
+
+class ResultSet:
+    """Collects benchmark results keyed by '<group>/<name>'"""
+
+    def __init__(self):
+        self.results = {}
+
+    def add(self, group, name, stats, **extra):
+        key = f"{group}/{name}"
+        entry = {'group': group, 'name': name, 'status': 'ok'}
+        entry.update(stats)
+        entry.update(extra)
+        self.results[key] = entry
+        median_ms = stats.get('median_s', 0.0) * 1000
+        details = ' '.join(f"{k}={v}" for k, v in extra.items() if not isinstance(v, (dict, list)))
+        print(f"  {key:<55} median {median_ms:10.3f} ms  p95 {stats.get('p95_s', 0.0) * 1000:10.3f} ms  {details}")
+
+    def skip(self, group, reason):
+        self.results[f"{group}/*"] = {'group': group, 'name': '*', 'status': 'skipped', 'reason': reason}
+        print(f"  {group:<55} skipped: {reason}")
@@ -0,0 +1,317 @@
+"""
+Load Generator - Concurrent request replay with latency percentiles and saturation search
+
+Usage:
+    # Start a local app (mock provider) in-process and step concurrency 1..64
+    python benchmarks/loadgen.py --concurrency 1,2,4,8,16,32,64 --duration 20
+
+    # Open-loop load at a fixed arrival rate against an already running server
+    python benchmarks/loadgen.py --url http://localhost:5000 --rate 50 --duration 30
+
+    # Custom request mix (weights) and saturation criteria
+    python benchmarks/loadgen.py --mix summarize=5,symptom-check=3,ocr=2 --p99-slo-ms 2000
+
+The saturation point per endpoint is the highest load level whose p99 latency
+stays within --p99-slo-ms (or --p99-degradation x the p99 at the lowest level)
+and whose error rate stays below --max-error-rate.
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import argparse
+import threading
+import statistics
+import urllib.request
+import urllib.error
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+# Add Backend directory to path
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from benchmarks.fixtures import medical_report, pdf_bytes
+
+SYMPTOM_SAMPLES = [
+    "fever, cough and sore throat for 3 days",
+    "frequent urination and increased thirst",
+    "severe headache with nausea and sensitivity to light",
+    "mild rash on both arms after gardening",
+    "chest pain and shortness of breath"
+]
+
+def _multipart(field, filename, content, content_type):
+    boundary = uuid.uuid4().hex
+    body = (
+        f"--{boundary}\r\n"
+        f"Content-Disposition: form-data; name=\"{field}\"; filename=\"{filename}\"\r\n"
+        f"Content-Type: {content_type}\r\n\r\n"
+    ).encode('utf-8') + content + f"\r\n--{boundary}--\r\n".encode('utf-8')
+    return body, f"multipart/form-data; boundary={boundary}"
+
+class RequestFactory:
+    """Builds deterministic request payloads for each endpoint"""
+
+    def __init__(self, report_bytes=4000, pdf_pages=3, seed=1):
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.reports = [medical_report(report_bytes, seed=seed + index) for index in range(8)]
+        self.pdf = pdf_bytes(pdf_pages)
+
+    def build(self, endpoint):
+        """Return (path, body bytes, content type)"""
+        with self.lock:
+            pick = self.rng.randrange(1 << 30)
+        if endpoint == 'summarize':
+            body = json.dumps({'text': self.reports[pick % len(self.reports)]}).encode('utf-8')
+            return '/api/summarize', body, 'application/json'
+        if endpoint == 'symptom-check':
+            body = json.dumps({'symptoms': SYMPTOM_SAMPLES[pick % len(SYMPTOM_SAMPLES)]}).encode('utf-8')
+            return '/api/symptom-check', body, 'application/json'
+        if endpoint == 'ocr':
+            body, content_type = _multipart('file', 'report.pdf', self.pdf, 'application/pdf')
+            return '/api/ocr', body, content_type
+        raise ValueError(f"Unknown endpoint: {endpoint}")
+
+class LevelStats:
+    """Latencies and outcomes for one load level"""
+
+    def __init__(self):
+        self.latencies = {}
+        self.errors = {}
+        self.statuses = {}
+        self.lock = threading.Lock()
+
+    def record(self, endpoint, latency, status):
+        with self.lock:
+            self.latencies.setdefault(endpoint, []).append(latency)
+            self.statuses.setdefault(endpoint, {}).setdefault(str(status), 0)
+            self.statuses[endpoint][str(status)] += 1
+            if not (200 <= status < 300):
+                self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+    def summary(self, elapsed):
+        report = {}
+        with self.lock:
+            for endpoint, values in self.latencies.items():
+                ordered = sorted(values)
+                count = len(ordered)
+                report[endpoint] = {
+                    'requests': count,
+                    'throughput_rps': round(count / elapsed, 2) if elapsed else 0.0,
+                    'error_rate': round(self.errors.get(endpoint, 0) / count, 4) if count else 0.0,
+                    'p50_ms': round(percentile(ordered, 0.50) * 1000, 2),
+                    'p95_ms': round(percentile(ordered, 0.95) * 1000, 2),
+                    'p99_ms': round(percentile(ordered, 0.99) * 1000, 2),
+                    'mean_ms': round(statistics.fmean(ordered) * 1000, 2) if count else 0.0,
+                    'statuses': dict(self.statuses.get(endpoint, {}))
+                }
+        return report
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(-(-fraction * len(sorted_values) // 1)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+class LoadGenerator:
+    """Replays a weighted request mix in closed-loop (concurrency) or open-loop (rate) mode"""
+
+    def __init__(self, base_url, mix, factory, timeout=180.0, seed=7):
+        self.base_url = base_url.rstrip('/')
+        self.endpoints = list(mix.keys())
+        self.weights = [mix[endpoint] for endpoint in self.endpoints]
+        self.factory = factory
+        self.timeout = timeout
+        self.rng = random.Random(seed)
+        self.rng_lock = threading.Lock()
+
+    def _pick(self):
+        with self.rng_lock:
+            return self.rng.choices(self.endpoints, weights=self.weights)[0]
+
+    def _send(self, endpoint, stats):
+        path, body, content_type = self.factory.build(endpoint)
+        request = urllib.request.Request(self.base_url + path, data=body, method='POST',
+                                         headers={'Content-Type': content_type})
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                response.read()
+                status = response.status
+        except urllib.error.HTTPError as e:
+            e.read()
+            status = e.code
+        except Exception:
+            status = 599  # connection error / client timeout
+        stats.record(endpoint, time.perf_counter() - started, status)
+
+    def run_concurrency(self, concurrency, duration, warmup=2.0):
+        """Closed loop: `concurrency` workers each send back-to-back requests"""
+        stats = LevelStats()
+        warm_stats = LevelStats()
+        deadline = time.perf_counter() + warmup + duration
+        measure_from = time.perf_counter() + warmup
+
+        def worker():
+            while time.perf_counter() < deadline:
+                endpoint = self._pick()
+                target = stats if time.perf_counter() >= measure_from else warm_stats
+                self._send(endpoint, target)
+
+        threads = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return stats.summary(duration)
+
+    def run_rate(self, rate, duration, max_workers=256):
+        """Open loop: requests arrive at `rate` per second regardless of server speed (Poisson arrivals)"""
+        stats = LevelStats()
+        started = time.perf_counter()
+        next_at = started
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            while next_at - started < duration:
+                now = time.perf_counter()
+                if next_at > now:
+                    time.sleep(next_at - now)
+                pool.submit(self._send, self._pick(), stats)
+                with self.rng_lock:
+                    next_at += self.rng.expovariate(rate)
+        return stats.summary(time.perf_counter() - started)
+
+def find_saturation(levels, p99_slo_ms, degradation, max_error_rate):
+    """
+    Highest load level per endpoint that still meets the latency and error criteria
+
+    Args:
+        levels: List of (level, summary) in increasing load order
+    """
+    saturation = {}
+    endpoints = {endpoint for _, summary in levels for endpoint in summary}
+    for endpoint in sorted(endpoints):
+        baseline = None
+        best = None
+        peak_throughput = 0.0
+        for level, summary in levels:
+            entry = summary.get(endpoint)
+            if not entry:
+                continue
+            if baseline is None:
+                baseline = entry['p99_ms'] or 1.0
+            limit = p99_slo_ms if p99_slo_ms else baseline * degradation
+            healthy = entry['p99_ms'] <= limit and entry['error_rate'] <= max_error_rate
+            if healthy:
+                best = level
+                peak_throughput = max(peak_throughput, entry['throughput_rps'])
+            else:
+                break
+        saturation[endpoint] = {
+            'last_healthy_level': best,
+            'throughput_rps_at_saturation': peak_throughput,
+            'p99_limit_ms': p99_slo_ms or round((baseline or 0) * degradation, 2)
+        }
+    return saturation
+
+def start_local_server(port, mock_latency_ms):
+    """Run the Flask app (mock provider) in a background thread on a threaded WSGI server"""
+    os.environ['LLM_PROVIDER'] = 'mock'
+    os.environ.setdefault('MOCK_LLM_LATENCY_MS', str(mock_latency_ms))
+    os.environ.setdefault('HF_HUB_OFFLINE', '1')
+
+    import logging
+    from werkzeug.serving import make_server
+    from app import app
+
+    # Per-request access logs would dominate the output (and cost CPU) under load
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+
+    server = make_server('127.0.0.1', port, app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://127.0.0.1:{port}"
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(','):
+        endpoint, _, weight = part.partition('=')
+        mix[endpoint.strip()] = float(weight or 1)
+    return mix
+
+def print_level(label, summary):
+    print(f"\n== {label} ==")
+    print(f"{'endpoint':<15}{'req':>7}{'rps':>9}{'err%':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for endpoint, entry in sorted(summary.items()):
+        print(f"{endpoint:<15}{entry['requests']:>7}{entry['throughput_rps']:>9.1f}{entry['error_rate'] * 100:>7.1f}"
+              f"{entry['p50_ms']:>10.1f}{entry['p95_ms']:>10.1f}{entry['p99_ms']:>10.1f}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="MediSense AI concurrent load generator")
+    parser.add_argument('--url', help='Target server; omitted = start the app locally with the mock provider')
+    parser.add_argument('--port', type=int, default=5055, help='Port for the locally started app')
+    parser.add_argument('--mock-latency-ms', type=float, default=800, help='Mock provider median latency (local app)')
+    parser.add_argument('--mix', default='summarize=5,symptom-check=4,ocr=1', help='Weighted endpoint mix')
+    parser.add_argument('--concurrency', default='1,2,4,8,16,32', help='Closed-loop concurrency levels')
+    parser.add_argument('--rate', help='Open-loop arrival rates (req/s), comma-separated; overrides --concurrency')
+    parser.add_argument('--duration', type=float, default=15.0, help='Seconds measured per level')
+    parser.add_argument('--report-bytes', type=int, default=4000, help='Size of synthetic reports sent to /api/summarize')
+    parser.add_argument('--p99-slo-ms', type=float, default=0.0, help='Absolute p99 limit (0 = use --p99-degradation)')
+    parser.add_argument('--p99-degradation', type=float, default=2.0, help='Allowed p99 growth vs the lowest level')
+    parser.add_argument('--max-error-rate', type=float, default=0.01)
+    parser.add_argument('--output', help='JSON report path (default benchmarks/results/load_<timestamp>.json)')
+    args = parser.parse_args()
+
+    server = None
+    base_url = args.url
+    if not base_url:
+        server, base_url = start_local_server(args.port, args.mock_latency_ms)
+
+    generator = LoadGenerator(base_url, parse_mix(args.mix), RequestFactory(args.report_bytes))
+    mode = 'rate' if args.rate else 'concurrency'
+    values = [float(value) for value in (args.rate or args.concurrency).split(',')]
+
+    levels = []
+    try:
+        for value in values:
+            if mode == 'rate':
+                summary = generator.run_rate(value, args.duration)
+            else:
+                summary = generator.run_concurrency(int(value), args.duration)
+            levels.append((value, summary))
+            print_level(f"{mode} = {value:g}", summary)
+    finally:
+        if server is not None:
+            server.shutdown()
+
+    saturation = find_saturation(levels, args.p99_slo_ms, args.p99_degradation, args.max_error_rate)
+    print("\n== saturation ==")
+    for endpoint, entry in saturation.items():
+        level = entry['last_healthy_level']
+        print(f"{endpoint:<15} last healthy {mode}: {'none' if level is None else f'{level:g}'}  "
+              f"({entry['throughput_rps_at_saturation']} req/s, p99 limit {entry['p99_limit_ms']} ms)")
+
+    output = args.output
+    if not output:
+        results_dir = os.path.join(BACKEND_DIR, 'benchmarks', 'results')
+        os.makedirs(results_dir, exist_ok=True)
+        output = os.path.join(results_dir, f"load_{datetime.utcnow().strftime('%Y%m%d-%H%M%S')}.json")
+
+    from benchmarks.harness import environment
+    with open(output, 'w', encoding='utf-8') as report_file:
+        json.dump({
+            'created_at': datetime.utcnow().isoformat(),
+            'environment': environment(),
+            'target': args.url or 'local (mock provider)',
+            'mode': mode,
+            'mix': parse_mix(args.mix),
+            'duration_s': args.duration,
+            'levels': [{'level': level, 'endpoints': summary} for level, summary in levels],
+            'saturation': saturation
+        }, report_file, indent=2)
+    print(f"\nReport written to {output}")
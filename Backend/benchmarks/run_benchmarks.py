@@ -0,0 +1,118 @@
+"""
+Benchmark Runner - Offline, reproducible benchmarks for every backend stage
+
+Usage:
+    python benchmarks/run_benchmarks.py [--quick] [--only text_cleaner,pdf_reader] [--output FILE]
+    python benchmarks/run_benchmarks.py --compare OLD.json NEW.json [--threshold 0.10]
+
+Results are written to benchmarks/results/<timestamp>_<commit>.json. End-to-end
+benchmarks run against LLM_PROVIDER=mock, so no API key or network is needed.
+"""
+
+import os
+import sys
+import json
+import argparse
+from datetime import datetime
+
+# Add Backend directory to path
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+RESULTS_DIR = os.path.join(BACKEND_DIR, 'benchmarks', 'results')
+GROUPS = ['text_cleaner', 'pdf_reader', 'ocr', 'retrieval', 'e2e']
+
+def run(groups, quick=False, output=None):
+    """Run the selected benchmark groups and write a JSON result file"""
+    from benchmarks import bench_e2e
+
+    # The mock provider must be configured before anything imports Config
+    bench_e2e.configure_mock_provider()
+
+    from benchmarks.harness import ResultSet, BenchmarkSkipped, environment
+    from benchmarks import bench_text, bench_pdf, bench_ocr, bench_retrieval
+
+    modules = {
+        'text_cleaner': bench_text,
+        'pdf_reader': bench_pdf,
+        'ocr': bench_ocr,
+        'retrieval': bench_retrieval,
+        'e2e': bench_e2e
+    }
+
+    results = ResultSet()
+    for group in groups:
+        print(f"[{group}]")
+        try:
+            modules[group].run(results, quick=quick)
+        except BenchmarkSkipped as e:
+            results.skip(group, str(e))
+
+    env = environment()
+    payload = {
+        'created_at': datetime.utcnow().isoformat(),
+        'quick': quick,
+        'environment': env,
+        'results': results.results
+    }
+
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.utcnow().strftime('%Y%m%d-%H%M%S')
+        output = os.path.join(RESULTS_DIR, f"{stamp}_{env['commit'] or 'nocommit'}.json")
+    with open(output, 'w', encoding='utf-8') as results_file:
+        json.dump(payload, results_file, indent=2)
+    print(f"\nResults written to {output}")
+    return output
+
+def compare(old_path, new_path, threshold):
+    """
+    Compare median timings of two result files
+
+    Returns:
+        Number of benchmarks that regressed by more than threshold
+    """
+    with open(old_path, encoding='utf-8') as old_file:
+        old = json.load(old_file)
+    with open(new_path, encoding='utf-8') as new_file:
+        new = json.load(new_file)
+
+    print(f"Baseline:  {old_path} ({old['environment'].get('commit')})")
+    print(f"Candidate: {new_path} ({new['environment'].get('commit')})\n")
+
+    regressions = 0
+    for key, entry in sorted(new['results'].items()):
+        baseline = old['results'].get(key)
+        if entry.get('status') != 'ok' or not baseline or baseline.get('status') != 'ok':
+            continue
+        before, after = baseline['median_s'], entry['median_s']
+        change = (after - before) / before if before else 0.0
+        marker = ''
+        if change > threshold:
+            marker = '  REGRESSION'
+            regressions += 1
+        elif change < -threshold:
+            marker = '  improved'
+        print(f"{key:<55} {before * 1000:10.3f} ms -> {after * 1000:10.3f} ms  {change:+7.1%}{marker}")
+
+    print(f"\n{regressions} regression(s) above {threshold:.0%}")
+    return regressions
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="MediSense AI backend benchmarks")
+    parser.add_argument('--quick', action='store_true', help='Smaller inputs for a fast smoke run')
+    parser.add_argument('--only', help=f"Comma-separated groups ({', '.join(GROUPS)})")
+    parser.add_argument('--output', help='Result file path (default benchmarks/results/<timestamp>_<commit>.json)')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help='Compare two result files')
+    parser.add_argument('--threshold', type=float, default=0.10, help='Relative slowdown reported as regression')
+    args = parser.parse_args()
+
+    if args.compare:
+        sys.exit(1 if compare(args.compare[0], args.compare[1], args.threshold) else 0)
+
+    selected = args.only.split(',') if args.only else GROUPS
+    unknown = [group for group in selected if group not in GROUPS]
+    if unknown:
+        parser.error(f"Unknown benchmark group(s): {', '.join(unknown)}")
+
+    run(selected, quick=args.quick, output=args.output)
@@ -0,0 +1,211 @@
+"""
+Server Layouts - Throughput, latency, startup time and memory per gunicorn worker layout
+
+Usage:
+    # Default layouts against the mock provider (800 ms median LLM latency)
+    python benchmarks/server_layouts.py
+
+    # Custom layouts (class:workers[:threads]) and load
+    python benchmarks/server_layouts.py --layouts sync:1,sync:4,gthread:2:8,gevent:2 --concurrency 32
+
+Each layout starts `gunicorn --config gunicorn.conf.py app:app` with the mock
+provider, waits for /api/health, then drives a closed loop of --concurrency
+clients with the load generator's request mix. Memory is the proportional set
+size (PSS) of the master plus its workers, so pages shared copy-on-write after
+a preload are counted once. Layouts whose worker class is not installed
+(gevent) are reported as skipped.
+"""
+
+import os
+import sys
+import json
+import time
+import signal
+import argparse
+import subprocess
+import urllib.request
+from datetime import datetime
+
+# Add Backend directory to path
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from benchmarks.loadgen import LoadGenerator, RequestFactory, parse_mix
+from benchmarks.harness import environment
+
+DEFAULT_LAYOUTS = 'sync:1,sync:4,gthread:1:8,gthread:2:8,gevent:2'
+
+def parse_layouts(text):
+    """'gthread:2:8,sync:1' -> [(worker class, workers, threads)]"""
+    layouts = []
+    for part in text.split(','):
+        fields = part.strip().split(':')
+        threads = int(fields[2]) if len(fields) > 2 else 1
+        layouts.append((fields[0], int(fields[1]) if len(fields) > 1 else 1, threads))
+    return layouts
+
+def layout_label(worker_class, workers, threads):
+    return f"{workers} x {worker_class}" + (f" ({threads} threads)" if worker_class == 'gthread' else '')
+
+def _children(pid):
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children", 'r') as children_file:
+            return [int(child) for child in children_file.read().split()]
+    except OSError:
+        return []
+
+def _pss_kb(pid):
+    """Proportional set size of a process in KiB (None where /proc is unavailable)"""
+    try:
+        with open(f"/proc/{pid}/smaps_rollup", 'r') as smaps_file:
+            for line in smaps_file:
+                if line.startswith('Pss:'):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+    return None
+
+def server_memory_mb(master_pid):
+    """PSS of the gunicorn master and all of its descendants in MiB"""
+    total = 0
+    pending = [master_pid]
+    while pending:
+        pid = pending.pop()
+        pss = _pss_kb(pid)
+        if pss is None:
+            return None
+        total += pss
+        pending.extend(_children(pid))
+    return round(total / 1024, 1)
+
+def start_server(worker_class, workers, threads, port, mock_latency_ms, log_path):
+    env = dict(os.environ)
+    env.update({
+        'PORT': str(port),
+        'WEB_CONCURRENCY': str(workers),
+        'GUNICORN_WORKER_CLASS': worker_class,
+        'GUNICORN_THREADS': str(threads),
+        'LLM_PROVIDER': 'mock',
+        'MOCK_LLM_LATENCY_MS': str(mock_latency_ms),
+        'HF_HUB_OFFLINE': '1'
+    })
+    log_file = open(log_path, 'w', encoding='utf-8')
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '--config', 'gunicorn.conf.py', 'app:app'],
+        cwd=BACKEND_DIR, env=env, stdout=log_file, stderr=subprocess.STDOUT
+    )
+    return process, log_file
+
+def wait_ready(base_url, process, timeout):
+    """Seconds until /api/health answers, or None if the server died or never came up"""
+    started = time.perf_counter()
+    while time.perf_counter() - started < timeout:
+        if process.poll() is not None:
+            return None
+        try:
+            with urllib.request.urlopen(base_url + '/api/health', timeout=2) as response:
+                if response.status == 200:
+                    return round(time.perf_counter() - started, 2)
+        except Exception:
+            time.sleep(0.2)
+    return None
+
+def stop_server(process, log_file):
+    process.send_signal(signal.SIGTERM)
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+    log_file.close()
+
+def run_layout(layout, args, generator_factory):
+    worker_class, workers, threads = layout
+    label = layout_label(worker_class, workers, threads)
+    if worker_class == 'gevent':
+        try:
+            import gevent  # noqa: F401
+        except ImportError:
+            return {'layout': label, 'skipped': 'gevent is not installed'}
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    log_path = os.path.join(BACKEND_DIR, 'benchmarks', 'results', f"server_{worker_class}_{workers}x{threads}.log")
+    process, log_file = start_server(worker_class, workers, threads, args.port, args.mock_latency_ms, log_path)
+    try:
+        startup_s = wait_ready(base_url, process, args.startup_timeout)
+        if startup_s is None:
+            return {'layout': label, 'skipped': f"server did not start (see {log_path})"}
+        # Let every worker finish booting before measuring memory
+        time.sleep(1.0)
+        memory_idle = server_memory_mb(process.pid)
+        summary = generator_factory(base_url).run_concurrency(args.concurrency, args.duration)
+        memory_loaded = server_memory_mb(process.pid)
+    finally:
+        stop_server(process, log_file)
+
+    requests = sum(entry['requests'] for entry in summary.values())
+    errors = sum(round(entry['error_rate'] * entry['requests']) for entry in summary.values())
+    return {
+        'layout': label,
+        'worker_class': worker_class,
+        'workers': workers,
+        'threads': threads,
+        'startup_s': startup_s,
+        'memory_idle_mb': memory_idle,
+        'memory_loaded_mb': memory_loaded,
+        'throughput_rps': round(requests / args.duration, 2),
+        'error_rate': round(errors / requests, 4) if requests else 0.0,
+        'endpoints': summary
+    }
+
+def print_results(results, focus):
+    print(f"\n{'layout':<26}{'rps':>8}{'err%':>7}{f'{focus} p50':>18}{f'{focus} p99':>18}{'start s':>9}{'PSS MB':>9}")
+    for result in results:
+        if 'skipped' in result:
+            print(f"{result['layout']:<26}  skipped: {result['skipped']}")
+            continue
+        entry = result['endpoints'].get(focus, {})
+        memory = result['memory_loaded_mb']
+        print(f"{result['layout']:<26}{result['throughput_rps']:>8.1f}{result['error_rate'] * 100:>7.1f}"
+              f"{entry.get('p50_ms', 0):>15.0f} ms{entry.get('p99_ms', 0):>15.0f} ms"
+              f"{result['startup_s']:>9.1f}{'n/a' if memory is None else f'{memory:.0f}':>9}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="MediSense AI gunicorn worker layout benchmark")
+    parser.add_argument('--layouts', default=DEFAULT_LAYOUTS, help='Comma-separated class:workers[:threads]')
+    parser.add_argument('--port', type=int, default=5056)
+    parser.add_argument('--mock-latency-ms', type=float, default=800, help='Mock provider median latency')
+    parser.add_argument('--mix', default='summarize=5,symptom-check=4,ocr=1', help='Weighted endpoint mix')
+    parser.add_argument('--concurrency', type=int, default=16, help='Concurrent clients')
+    parser.add_argument('--duration', type=float, default=20.0, help='Seconds measured per layout')
+    parser.add_argument('--report-bytes', type=int, default=4000, help='Size of synthetic reports sent to /api/summarize')
+    parser.add_argument('--startup-timeout', type=float, default=180.0)
+    parser.add_argument('--output', help='JSON report path (default benchmarks/results/layouts_<timestamp>.json)')
+    args = parser.parse_args()
+
+    os.makedirs(os.path.join(BACKEND_DIR, 'benchmarks', 'results'), exist_ok=True)
+    mix = parse_mix(args.mix)
+    factory = RequestFactory(args.report_bytes)
+
+    results = []
+    for layout in parse_layouts(args.layouts):
+        result = run_layout(layout, args, lambda base_url: LoadGenerator(base_url, mix, factory))
+        results.append(result)
+        print(f"{result['layout']}: " + (f"skipped ({result['skipped']})" if 'skipped' in result
+                                         else f"{result['throughput_rps']} req/s"))
+    print_results(results, 'summarize')
+
+    output = args.output or os.path.join(
+        BACKEND_DIR, 'benchmarks', 'results', f"layouts_{datetime.utcnow().strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    with open(output, 'w', encoding='utf-8') as report_file:
+        json.dump({
+            'created_at': datetime.utcnow().isoformat(),
+            'environment': environment(),
+            'mock_latency_ms': args.mock_latency_ms,
+            'mix': mix,
+            'concurrency': args.concurrency,
+            'duration_s': args.duration,
+            'layouts': results
+        }, report_file, indent=2)
+    print(f"\nReport written to {output}")
@@ -20,10 +20,14 @@ class Config:
     UPLOAD_FOLDER = os.path.join(os.path.dirname(__file__), 'uploads')
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
     ALLOWED_EXTENSIONS = {'pdf', 'png', 'jpg', 'jpeg', 'gif', 'bmp', 'tiff'}
+    UPLOAD_MAX_PIXELS = int(os.environ.get('UPLOAD_MAX_PIXELS', 40_000_000))  # Per image, from its header (a 600 dpi letter page is ~34 MP)
+    UPLOAD_SNIFF_BYTES = int(os.environ.get('UPLOAD_SNIFF_BYTES', 65536))  # Upload bytes inspected before the rest is kept
     
     # Database Configuration
     CHROMA_DB_PATH = os.path.join(os.path.dirname(__file__), 'database', 'vectorstore')
     EMBEDDINGS_PATH = os.path.join(os.path.dirname(__file__), 'database', 'embeddings')
+    KB_SNAPSHOT_PATH = os.environ.get('KB_SNAPSHOT_PATH', os.path.join(os.path.dirname(__file__), 'database', 'snapshots', 'medical_knowledge.mskb'))
+    KB_SNAPSHOT_VERIFY = os.environ.get('KB_SNAPSHOT_VERIFY', 'true').lower() == 'true'
     
     # OCR Configuration
     # Auto-detect Tesseract path based on platform
@@ -33,16 +37,132 @@ class Config:
         # For Linux (Render, PythonAnywhere, Railway, etc.)
         TESSERACT_CMD = os.environ.get('TESSERACT_CMD', '/usr/bin/tesseract')
     USE_EASYOCR = os.environ.get('USE_EASYOCR', 'false').lower() == 'true'
+    OCR_PROCESS_WORKERS = int(os.environ.get('OCR_PROCESS_WORKERS', 0))  # Separate OCR processes per server worker; 0 = OCR on threads
+    OCR_PAGE_WORKERS = int(os.environ.get('OCR_PAGE_WORKERS', 4))  # Pages OCR'd at once per server worker (without OCR processes)
+    OCR_MAX_PAGES = int(os.environ.get('OCR_MAX_PAGES', 50))  # Per request, across all files and frames
     
     # LLM Configuration
-    LLM_PROVIDER = os.environ.get('LLM_PROVIDER', 'gemini')  # gemini, openai, groq
+    LLM_PROVIDER = os.environ.get('LLM_PROVIDER', 'gemini')  # gemini, openai, groq, mock
     GEMINI_MODEL = os.environ.get('GEMINI_MODEL', 'gemini-pro')
+    GEMINI_SMALL_MODEL = os.environ.get('GEMINI_SMALL_MODEL', 'gemini-2.0-flash-lite')
+    OPENAI_MODEL = os.environ.get('OPENAI_MODEL', 'gpt-3.5-turbo')
+    OPENAI_SMALL_MODEL = os.environ.get('OPENAI_SMALL_MODEL', 'gpt-4o-mini')
+    GROQ_MODEL = os.environ.get('GROQ_MODEL', 'llama-3.1-70b-versatile')
+    GROQ_SMALL_MODEL = os.environ.get('GROQ_SMALL_MODEL', 'llama-3.1-8b-instant')
+    
+    # Model Tiering (short prompts go to each provider's *_SMALL_MODEL; empty small model = off)
+    LLM_TIERING_ENABLED = os.environ.get('LLM_TIERING_ENABLED', 'true').lower() == 'true'
+    LLM_SMALL_TIER_MAX_TOKENS_SYMPTOMS = int(os.environ.get('LLM_SMALL_TIER_MAX_TOKENS_SYMPTOMS', 2500))  # Prompt tokens
+    LLM_SMALL_TIER_MAX_TOKENS_SUMMARY = int(os.environ.get('LLM_SMALL_TIER_MAX_TOKENS_SUMMARY', 2000))  # Prompt instructions alone are ~850
+    LLM_MODEL_PRICES = os.environ.get('LLM_MODEL_PRICES', '')  # model=input/output USD per 1M tokens, comma-separated
+    
+    # LLM Transport (shared keep-alive clients, timeouts, retries)
+    LLM_CONNECT_TIMEOUT = float(os.environ.get('LLM_CONNECT_TIMEOUT', 5))
+    LLM_READ_TIMEOUT = float(os.environ.get('LLM_READ_TIMEOUT', 60))  # Per provider call
+    LLM_MAX_RETRIES = int(os.environ.get('LLM_MAX_RETRIES', 2))  # Only timeouts, connection errors, 429 and 5xx
+    LLM_RETRY_BASE_DELAY = float(os.environ.get('LLM_RETRY_BASE_DELAY', 0.5))  # Seconds, doubled per retry (full jitter)
+    LLM_RETRY_MAX_DELAY = float(os.environ.get('LLM_RETRY_MAX_DELAY', 8))
+    LLM_POOL_MAX_CONNECTIONS = int(os.environ.get('LLM_POOL_MAX_CONNECTIONS', 20))
+    LLM_POOL_MAX_KEEPALIVE = int(os.environ.get('LLM_POOL_MAX_KEEPALIVE', 10))
+    LLM_KEEPALIVE_EXPIRY = float(os.environ.get('LLM_KEEPALIVE_EXPIRY', 30))
+    REQUEST_DEADLINE_SECONDS = float(os.environ.get('REQUEST_DEADLINE_SECONDS', 100))  # Below gunicorn's 120s timeout; 0 = off
+    
+    # Per-Provider Rate and Concurrency Limits (per worker process; 0 = unlimited)
+    LLM_RATE_LIMIT_RPM = float(os.environ.get('LLM_RATE_LIMIT_RPM', 0))  # Requests per minute
+    LLM_RATE_LIMIT_TPM = float(os.environ.get('LLM_RATE_LIMIT_TPM', 0))  # Prompt + expected output tokens per minute
+    LLM_EXPECTED_OUTPUT_TOKENS = int(os.environ.get('LLM_EXPECTED_OUTPUT_TOKENS', 800))
+    LLM_CONCURRENCY_INITIAL = int(os.environ.get('LLM_CONCURRENCY_INITIAL', 8))
+    LLM_CONCURRENCY_MIN = int(os.environ.get('LLM_CONCURRENCY_MIN', 1))
+    LLM_CONCURRENCY_MAX = int(os.environ.get('LLM_CONCURRENCY_MAX', 64))
+    LLM_LATENCY_TOLERANCE = float(os.environ.get('LLM_LATENCY_TOLERANCE', 3.0))  # x baseline before shrinking the window
+    LLM_LATENCY_BACKOFF = float(os.environ.get('LLM_LATENCY_BACKOFF', 0.9))  # Window multiplier on slow calls (429s halve it)
+    LLM_QUEUE_TIMEOUT = float(os.environ.get('LLM_QUEUE_TIMEOUT', 5))  # Max seconds queued before shedding with 503
+    LLM_MAX_QUEUE = int(os.environ.get('LLM_MAX_QUEUE', 32))  # Waiting calls beyond this are shed immediately
+    
+    # Circuit Breaker and Degraded Mode
+    LLM_CIRCUIT_FAILURE_THRESHOLD = int(os.environ.get('LLM_CIRCUIT_FAILURE_THRESHOLD', 5))  # Consecutive failures; 0 = off
+    LLM_CIRCUIT_RECOVERY_SECONDS = float(os.environ.get('LLM_CIRCUIT_RECOVERY_SECONDS', 30))  # Open time before probing
+    LLM_CIRCUIT_HALF_OPEN_PROBES = int(os.environ.get('LLM_CIRCUIT_HALF_OPEN_PROBES', 1))
+    RESPONSE_CACHE_SIZE = int(os.environ.get('RESPONSE_CACHE_SIZE', 512))  # Recent answers kept for degraded mode
+    RESPONSE_CACHE_TTL = float(os.environ.get('RESPONSE_CACHE_TTL', 86400))  # Seconds; 0 = no expiry
+    
+    # Multi-Provider Routing (hedged requests and failover)
+    LLM_FALLBACK_PROVIDERS = [name.strip().lower() for name in os.environ.get('LLM_FALLBACK_PROVIDERS', '').split(',') if name.strip()]
+    LLM_HEDGE_ENABLED = os.environ.get('LLM_HEDGE_ENABLED', 'true').lower() == 'true'
+    LLM_HEDGE_PERCENTILE = float(os.environ.get('LLM_HEDGE_PERCENTILE', 0.95))  # Hedge once the primary is slower than this
+    LLM_HEDGE_MIN_DELAY = float(os.environ.get('LLM_HEDGE_MIN_DELAY', 0.5))  # Seconds
+    LLM_HEDGE_DEFAULT_DELAY = float(os.environ.get('LLM_HEDGE_DEFAULT_DELAY', 8))  # Until enough samples are observed
+    LLM_HEDGE_MIN_SAMPLES = int(os.environ.get('LLM_HEDGE_MIN_SAMPLES', 20))
+    LLM_HEDGE_BUDGET = float(os.environ.get('LLM_HEDGE_BUDGET', 0.1))  # Max extra calls per primary call
+    LLM_HEDGE_WORKERS = int(os.environ.get('LLM_HEDGE_WORKERS', 16))
+    LLM_STATS_WINDOW = int(os.environ.get('LLM_STATS_WINDOW', 200))  # Recent calls kept per provider
+    
+    # Mock LLM Provider (LLM_PROVIDER=mock, offline load testing)
+    MOCK_LLM_MODEL = os.environ.get('MOCK_LLM_MODEL', 'mock-medisense')
+    MOCK_LLM_SMALL_MODEL = os.environ.get('MOCK_LLM_SMALL_MODEL', 'mock-medisense-small')
+    MOCK_LLM_SMALL_SPEEDUP = float(os.environ.get('MOCK_LLM_SMALL_SPEEDUP', 3.0))  # Small tier: latency / x, tokens/s * x
+    MOCK_LLM_SEED = int(os.environ.get('MOCK_LLM_SEED', 42))
+    MOCK_LLM_LATENCY_MS = float(os.environ.get('MOCK_LLM_LATENCY_MS', 800))  # Median time to first token
+    MOCK_LLM_LATENCY_SIGMA = float(os.environ.get('MOCK_LLM_LATENCY_SIGMA', 0.35))  # Log-normal spread
+    MOCK_LLM_TOKENS_PER_SECOND = float(os.environ.get('MOCK_LLM_TOKENS_PER_SECOND', 200))  # 0 = instant
+    MOCK_LLM_MALFORMED_RATE = float(os.environ.get('MOCK_LLM_MALFORMED_RATE', 0.0))
+    MOCK_LLM_ERROR_RATE = float(os.environ.get('MOCK_LLM_ERROR_RATE', 0.0))
+    MOCK_LLM_RATE_LIMIT_RPM = int(os.environ.get('MOCK_LLM_RATE_LIMIT_RPM', 0))  # Simulated provider quota; 0 = off
     
     # RAG Configuration
     EMBEDDING_MODEL = os.environ.get('EMBEDDING_MODEL', 'all-MiniLM-L6-v2')
     CHUNK_SIZE = int(os.environ.get('CHUNK_SIZE', 500))
     CHUNK_OVERLAP = int(os.environ.get('CHUNK_OVERLAP', 50))
     TOP_K_RESULTS = int(os.environ.get('TOP_K_RESULTS', 5))
+    RETRIEVAL_CANDIDATES = int(os.environ.get('RETRIEVAL_CANDIDATES', 20))  # Over-fetch for dedup/MMR
+    CONTEXT_TOKEN_BUDGET = int(os.environ.get('CONTEXT_TOKEN_BUDGET', 1200))
+    MMR_LAMBDA = float(os.environ.get('MMR_LAMBDA', 0.7))  # 1.0 = pure relevance, 0.0 = pure diversity
+    CONTEXT_DUPLICATE_THRESHOLD = float(os.environ.get('CONTEXT_DUPLICATE_THRESHOLD', 0.8))
+    
+    # Report Condensing (section-aware summarization input)
+    REPORT_SECTION_FILTER = os.environ.get('REPORT_SECTION_FILTER', 'true').lower() == 'true'
+    # Sections left out of the prompt besides boilerplate; patient_info holds identifiers (age/sex are kept)
+    REPORT_DROP_SECTIONS = [name.strip().lower() for name in os.environ.get('REPORT_DROP_SECTIONS', 'patient_info').split(',') if name.strip()]
+    
+    # Medication Fast Path (lexicon + dose grammar instead of asking the LLM)
+    MEDICATION_FAST_PATH = os.environ.get('MEDICATION_FAST_PATH', 'true').lower() == 'true'
+    MEDICATION_LEXICON_PATH = os.environ.get('MEDICATION_LEXICON_PATH', '')  # Extra names: one per line or brand=generic
+    LAB_FAST_PATH = os.environ.get('LAB_FAST_PATH', 'true').lower() == 'true'  # Parse and flag lab values locally
+    SYMPTOM_TRIAGE_FAST_PATH = os.environ.get('SYMPTOM_TRIAGE_FAST_PATH', 'true').lower() == 'true'  # Answer red-flag symptoms without RAG/LLM
+    
+    # Incremental Summaries (follow-up reports with a patient_id; only the changes go to the LLM)
+    INCREMENTAL_SUMMARY = os.environ.get('INCREMENTAL_SUMMARY', 'true').lower() == 'true'
+    INCREMENTAL_MAX_DELTA_RATIO = float(os.environ.get('INCREMENTAL_MAX_DELTA_RATIO', 0.6))  # Larger deltas get a full summary
+    PATIENT_STORE_PATH = os.environ.get('PATIENT_STORE_PATH', os.path.join(os.path.dirname(__file__), 'database', 'patient_reports.sqlite3'))
+    PATIENT_STORE_MAX_VERSIONS = int(os.environ.get('PATIENT_STORE_MAX_VERSIONS', 5))  # Kept per patient
+    PATIENT_STORE_TTL_DAYS = float(os.environ.get('PATIENT_STORE_TTL_DAYS', 365))  # 0 = keep forever
+    PATIENT_KEY_MIN_LENGTH = int(os.environ.get('PATIENT_KEY_MIN_LENGTH', 16))  # Client-held secret sent with patient_id
+    
+    # Idempotency Keys (retried uploads replay the stored response instead of recomputing)
+    IDEMPOTENCY_ENABLED = os.environ.get('IDEMPOTENCY_ENABLED', 'true').lower() == 'true'
+    IDEMPOTENCY_HEADER = os.environ.get('IDEMPOTENCY_HEADER', 'Idempotency-Key')
+    IDEMPOTENCY_STORE_PATH = os.environ.get('IDEMPOTENCY_STORE_PATH', os.path.join(os.path.dirname(__file__), 'database', 'idempotency.sqlite3'))
+    IDEMPOTENCY_TTL_SECONDS = float(os.environ.get('IDEMPOTENCY_TTL_SECONDS', 86400))  # How long completed responses are replayed
+    IDEMPOTENCY_WAIT_SECONDS = float(os.environ.get('IDEMPOTENCY_WAIT_SECONDS', 30))  # A retry waits this long for the in-flight original
+    
+    # Ingestion Near-Duplicate Detection (MinHash/LSH)
+    NEAR_DUP_DEDUP = os.environ.get('NEAR_DUP_DEDUP', 'true').lower() == 'true'
+    NEAR_DUP_THRESHOLD = float(os.environ.get('NEAR_DUP_THRESHOLD', 0.85))  # Estimated Jaccard similarity
+    MINHASH_PERMUTATIONS = int(os.environ.get('MINHASH_PERMUTATIONS', 128))
+    MINHASH_SHINGLE_SIZE = int(os.environ.get('MINHASH_SHINGLE_SIZE', 5))  # Words per shingle
+    
+    # Profiling Configuration
+    PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', 'false').lower() == 'true'
+    PROFILING_SAMPLE_RATE = float(os.environ.get('PROFILING_SAMPLE_RATE', 0.01))  # Fraction of requests sampled
+    PROFILING_HEADER = os.environ.get('PROFILING_HEADER', 'X-Profile')
+    PROFILING_ALLOW_HEADER = os.environ.get('PROFILING_ALLOW_HEADER', 'false').lower() == 'true'  # Needs the ADMIN_TOKEN bearer token outside debug
+    PROFILE_DUMP = os.environ.get('PROFILE_DUMP', 'false').lower() == 'true'  # Write cProfile stats per sampled request
+    PROFILE_DUMP_DIR = os.environ.get('PROFILE_DUMP_DIR', os.path.join(os.path.dirname(__file__), 'profiles'))
+    
+    # Usage Accounting and Admin Endpoints
+    USAGE_STATS_WINDOW = int(os.environ.get('USAGE_STATS_WINDOW', 1000))  # Recent calls kept per endpoint/provider/model
+    ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN', '')  # Bearer token for /api/admin/*; unset disables those endpoints
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')  # Bearer token for /metrics (ADMIN_TOKEN also works); unset with no ADMIN_TOKEN disables it
     
     # CORS Configuration
     # For production, set CORS_ORIGINS in environment variables
@@ -39,15 +39,17 @@ def load_medical_dataset():
     
     print(f"Loading {len(sample_entries)} medical knowledge entries...")
     
-    for entry in sample_entries:
-        success = rag_service.add_medical_document(
-            entry["text"],
-            entry.get("metadata", {})
-        )
-        if success:
-            print(f"✓ Loaded: {entry['metadata'].get('category', 'unknown')}")
-        else:
-            print(f"✗ Failed to load entry")
+    report = rag_service.add_medical_documents(
+        [entry["text"] for entry in sample_entries],
+        [entry.get("metadata", {}) for entry in sample_entries]
+    )
+    if report['added']:
+        print(f"✓ Loaded {report['added']} of {report['received']} entries")
+    else:
+        print(f"✗ Failed to load entries")
+    if report['dropped_near_duplicates']:
+        print(f"Dropped {report['dropped_near_duplicates']} near-duplicate passages "
+              f"({report['bytes_saved']} bytes, {report['index_size_saved_pct']}% of index size)")
     
     print("Medical knowledge base initialization complete!")
     print(f"Vector store location: {Config.CHROMA_DB_PATH}")
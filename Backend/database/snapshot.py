@@ -0,0 +1,67 @@
+"""
+Knowledge Base Snapshot Tool - Export, verify and inspect RAG snapshots
+
+Usage:
+    python database/snapshot.py export [--output PATH]
+    python database/snapshot.py verify [PATH]
+    python database/snapshot.py info [PATH]
+"""
+
+import os
+import sys
+import argparse
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.kb_snapshot import KnowledgeBaseSnapshot, SnapshotError
+from config import Config
+
+def export_snapshot(output_path):
+    """Export the current Chroma collection into a snapshot file"""
+    from services.rag_service import RAGService
+    
+    print("Exporting medical knowledge base...")
+    rag_service = RAGService()
+    header = rag_service.export_snapshot(output_path)
+    
+    size_mb = os.path.getsize(output_path) / (1024 * 1024)
+    print(f"✓ Exported {header['count']} documents ({header['dimension']}-d, {header['embedding_model']})")
+    print(f"Snapshot location: {output_path} ({size_mb:.1f} MB)")
+
+def verify_snapshot(path):
+    """Validate the snapshot checksum and that it can be mapped"""
+    snapshot = KnowledgeBaseSnapshot.load(path, verify=True)
+    print(f"✓ Snapshot valid: {len(snapshot)} documents, model {snapshot.embedding_model}")
+
+def show_info(path):
+    """Print the snapshot header without reading the payload"""
+    header, _ = KnowledgeBaseSnapshot.read_header(path)
+    for key in ('format_version', 'created_at', 'embedding_model', 'count', 'dimension', 'sha256'):
+        print(f"{key}: {header.get(key)}")
+    for name, section in header['sections'].items():
+        print(f"section {name}: {section['length']} bytes at +{section['offset']}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Knowledge base snapshot tooling")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    
+    export_parser = subparsers.add_parser('export', help='Export the vector store to a snapshot')
+    export_parser.add_argument('--output', default=Config.KB_SNAPSHOT_PATH)
+    
+    for name in ('verify', 'info'):
+        command_parser = subparsers.add_parser(name)
+        command_parser.add_argument('path', nargs='?', default=Config.KB_SNAPSHOT_PATH)
+    
+    args = parser.parse_args()
+    
+    try:
+        if args.command == 'export':
+            export_snapshot(args.output)
+        elif args.command == 'verify':
+            verify_snapshot(args.path)
+        else:
+            show_info(args.path)
+    except SnapshotError as e:
+        print(f"✗ {str(e)}")
+        sys.exit(1)
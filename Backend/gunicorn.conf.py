@@ -0,0 +1,65 @@
+"""
+Gunicorn Configuration - Production server profile for MediSense AI
+
+Usage:
+    gunicorn --config gunicorn.conf.py app:app
+
+Settings come from the environment (see env.example):
+    PORT                   Listen port (set by Render), default 5000
+    WEB_CONCURRENCY        Worker processes, default 2
+    GUNICORN_WORKER_CLASS  gthread (default), gevent or sync
+    GUNICORN_THREADS       Threads per gthread worker, default 8
+    GUNICORN_PRELOAD       Import the app once in the master, default true (false for gevent)
+    GUNICORN_TIMEOUT       Worker timeout in seconds, default 120 (above REQUEST_DEADLINE_SECONDS)
+
+Requests spend most of their time waiting on the LLM provider, so each worker
+serves several at once (threads, or greenlets with gevent) instead of one
+slow call blocking everyone. With preload, the embedding model, knowledge base
+snapshot and OCR engine are loaded once in the master and shared copy-on-write
+by the workers. Anything holding sockets, SQLite handles or threads is created
+per process after the fork (LLM clients, the hedge pool, the report stores,
+Chroma and the OCR process pool). CPU-bound OCR runs in OCR_PROCESS_WORKERS
+separate processes per worker so it does not hold the request threads' GIL.
+"""
+
+import os
+import sys
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.environ.get('GUNICORN_THREADS', 8))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+
+if worker_class == 'gevent':
+    # Greenlets instead of threads; gunicorn monkey-patches the worker after the fork
+    worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 100))
+
+# gevent patches the standard library after the fork, so a preloaded app would
+# keep unpatched locks and sockets; preload is off for gevent unless forced
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'false' if worker_class == 'gevent' else 'true').lower() == 'true'
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG') or None
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+
+def when_ready(server):
+    server.log.info(
+        f"MediSense AI: {workers} x {worker_class} worker(s)"
+        + (f", {threads} threads each" if worker_class == 'gthread' else '')
+        + (", app preloaded" if preload_app else '')
+    )
+
+def post_fork(server, worker):
+    # Models run from several request threads at once; split the CPUs between
+    # workers instead of every call starting one intra-op thread per core
+    torch = sys.modules.get('torch')
+    if torch is not None:
+        torch.set_num_threads(max(1, (os.cpu_count() or 1) // max(workers, 1)))
+
+def worker_exit(server, worker):
+    ocr_service = sys.modules.get('services.ocr_service')
+    if ocr_service is not None:
+        ocr_service.shutdown_ocr_pool()
@@ -0,0 +1,53 @@
+"""
+Admin Route - Operational summaries (LLM token usage and cost)
+"""
+
+from flask import Blueprint, request, jsonify
+from config import Config
+from utils.auth import has_admin_token
+from utils.usage import usage_stats, PROMPT_SIZE_BANDS
+
+admin_bp = Blueprint('admin', __name__)
+
+@admin_bp.before_request
+def require_admin_token():
+    """Reject admin requests without the ADMIN_TOKEN bearer token (hidden entirely when no token is configured)"""
+    if not Config.ADMIN_TOKEN:
+        return jsonify({
+            'success': False,
+            'error': 'Not found'
+        }), 404
+    if not has_admin_token(request):
+        return jsonify({
+            'success': False,
+            'error': 'Admin token required'
+        }), 401
+    return None
+
+@admin_bp.route('/admin/usage', methods=['GET'])
+def usage_summary():
+    """
+    LLM token usage and estimated cost of this worker process since it started
+    
+    Response:
+        {
+            "success": bool,
+            "since": float,  # Unix time the counters started
+            "totals": {"calls": int, "errors": int, "prompt_tokens": int,
+                       "completion_tokens": int, "total_tokens": int, "cost_usd": float},
+            "breakdown": [{
+                "endpoint": str, "provider": str, "model": str,
+                "calls": int, "errors": int, "prompt_tokens": int, "completion_tokens": int,
+                "reported_share": float,  # Share of calls with provider-reported counts
+                "avg_prompt_tokens": int, "avg_latency_ms": float, "cost_usd": float,
+                "by_prompt_size": [{"prompt_tokens": str, "calls": int, "avg_prompt_tokens": int,
+                                    "avg_completion_tokens": int, "p50_ms": float, "p95_ms": float}]
+            }],
+            "prompt_size_bands": [int]
+        }
+    """
+    return jsonify({
+        'success': True,
+        **usage_stats.summary(),
+        'prompt_size_bands': list(PROMPT_SIZE_BANDS)
+    }), 200
@@ -0,0 +1,61 @@
+"""
+Medications Route - Extracts medications from report text without calling an LLM
+"""
+
+from flask import Blueprint, request, jsonify
+from services.medication_extractor import medication_extractor
+from utils.metrics import track_stage
+
+medications_bp = Blueprint('medications', __name__)
+
+@medications_bp.route('/medications', methods=['POST'])
+def extract_medications():
+    """
+    Extract medications, doses and frequencies with the local lexicon and grammar
+    
+    Request Body:
+        {
+            "text": str  # Medical report text
+        }
+    
+    Response:
+        {
+            "success": bool,
+            "medications": [str],  # Currently taken, e.g. "Metformin 500 mg twice daily"
+            "details": [{          # Every mention, including stopped drugs and allergies
+                "name": str, "brand": str, "dose": str, "form": str, "route": str,
+                "frequency": str, "duration": str, "status": str, "source": str, "display": str
+            }]
+        }
+    """
+    try:
+        data = request.get_json()
+        
+        if not data or 'text' not in data:
+            return jsonify({
+                'success': False,
+                'error': 'Text field is required'
+            }), 400
+        
+        text = data['text']
+        
+        if not text or not text.strip():
+            return jsonify({
+                'success': False,
+                'error': 'Text cannot be empty'
+            }), 400
+        
+        with track_stage('extract_medications'):
+            details = medication_extractor.extract(text)
+        
+        return jsonify({
+            'success': True,
+            'medications': [entry['display'] for entry in details if entry['status'] == 'active'],
+            'details': details
+        }), 200
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
@@ -0,0 +1,31 @@
+"""
+Metrics Route - Exposes pipeline and HTTP metrics in Prometheus text format
+"""
+
+from flask import Blueprint, Response, request, jsonify
+from config import Config
+from utils.auth import has_metrics_token
+from utils.metrics import registry
+
+metrics_bp = Blueprint('metrics', __name__)
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def export_metrics():
+    """
+    Prometheus scrape endpoint (per-model usage and cost included, so it needs
+    "Authorization: Bearer <METRICS_TOKEN or ADMIN_TOKEN>")
+    
+    Response:
+        text/plain exposition format with latency histograms, counters and in-flight gauges
+    """
+    if not (Config.METRICS_TOKEN or Config.ADMIN_TOKEN):
+        return jsonify({
+            'success': False,
+            'error': 'Not found'
+        }), 404
+    if not has_metrics_token(request):
+        return jsonify({
+            'success': False,
+            'error': 'Metrics token required'
+        }), 401
+    return Response(registry.render(), mimetype=None, content_type=registry.CONTENT_TYPE)
@@ -4,9 +4,15 @@ OCR Route - Handles text extraction from medical documents
 
 from flask import Blueprint, request, jsonify
 from werkzeug.utils import secure_filename
+from werkzeug.exceptions import RequestEntityTooLarge
 import os
-from services.ocr_service import OCRService
+import uuid
+from services.ocr_service import OCRService, join_pages, aggregate_confidence
+from services.upload_validator import upload_validator, upload_rejections_total, UploadRejected
 from utils.pdf_reader import PDFReader
+from utils.metrics import track_stage
+from utils.deadline import DeadlineExceeded
+from utils.idempotency import idempotent
 from config import Config
 
 ocr_bp = Blueprint('ocr', __name__)
@@ -19,19 +25,26 @@ def allowed_file(filename):
            filename.rsplit('.', 1)[1].lower() in Config.ALLOWED_EXTENSIONS
 
 @ocr_bp.route('/ocr', methods=['POST'])
+@idempotent
 def extract_text():
     """
-    Extract text from uploaded medical document (PDF or image)
+    Extract text from uploaded medical documents (PDFs or images)
     
     Request:
-        - file: PDF or image file (multipart/form-data)
+        - file: PDF or image file (multipart/form-data); repeat the field to send
+                several files. Every frame of a multi-frame TIFF/GIF is a page, and
+                image pages are OCR'd concurrently.
     
     Response:
         {
             "success": bool,
-            "extracted_text": str,
-            "confidence": float,
-            "file_type": str
+            "extracted_text": str,  # All pages in upload order, separated by form feeds
+            "confidence": float,    # Aggregate, weighted by the text recognised per page
+            "file_type": str,       # Extension of the file(s), "mixed" when they differ
+            "page_count": int,
+            "pages": [
+                {"page": int, "file": str, "file_page": int, "text": str, "confidence": float}
+            ]
         }
     """
     try:
@@ -41,53 +54,123 @@ def extract_text():
                 'error': 'No file provided'
             }), 400
         
-        file = request.files['file']
+        files = [file for file in request.files.getlist('file') if file.filename != '']
         
-        if file.filename == '':
+        if not files:
             return jsonify({
                 'success': False,
                 'error': 'No file selected'
             }), 400
         
-        if not allowed_file(file.filename):
-            return jsonify({
-                'success': False,
-                'error': f'File type not allowed. Allowed types: {", ".join(Config.ALLOWED_EXTENSIONS)}'
-            }), 400
+        for file in files:
+            if not allowed_file(file.filename):
+                return jsonify({
+                    'success': False,
+                    'error': f'File type not allowed. Allowed types: {", ".join(Config.ALLOWED_EXTENSIONS)}'
+                }), 400
         
-        # Save file temporarily
-        filename = secure_filename(file.filename)
-        filepath = os.path.join(Config.UPLOAD_FOLDER, filename)
-        file.save(filepath)
+        # Type and pixel budget come from the bytes (magic number, image header), not the name
+        uploads = []
+        for file in files:
+            try:
+                with track_stage('upload_validate'):
+                    uploads.append(upload_validator.validate(file))
+            except UploadRejected as e:
+                return jsonify({
+                    'success': False,
+                    'error': f"{file.filename}: {str(e)}",
+                    'reason': e.reason
+                }), e.status
+        
+        # Save files temporarily
+        filenames = [secure_filename(file.filename) for file in files]
+        # Unique on disk: concurrent uploads of "report.pdf" must not overwrite each other
+        filepaths = [os.path.join(Config.UPLOAD_FOLDER, f"{uuid.uuid4().hex}_{filename}") for filename in filenames]
         
         try:
-            # Extract text based on file type
-            file_ext = filename.rsplit('.', 1)[1].lower()
+            with track_stage('upload_save'):
+                for file, filepath in zip(files, filepaths):
+                    file.save(filepath)
             
-            if file_ext == 'pdf':
-                # Extract text from PDF
-                extracted_text = pdf_reader.extract_text(filepath)
-                confidence = 0.95  # PDF extraction is generally reliable
-            else:
-                # Extract text from image using OCR
-                extracted_text, confidence = ocr_service.extract_text_from_image(filepath)
+            # Count pages (PDF pages, image frames) before extracting anything; counting
+            # image frames stops at the page limit and checks every frame's pixel budget
+            pdf_paths = [path for path, upload in zip(filepaths, uploads) if upload['kind'] == 'pdf']
+            page_count = sum(pdf_reader.get_page_count(path) for path in pdf_paths)
+            image_jobs = []
+            for filename, filepath in zip(filenames, filepaths):
+                if filepath in pdf_paths or page_count > Config.OCR_MAX_PAGES:
+                    continue
+                try:
+                    jobs = ocr_service.page_jobs([filepath], max_pages=Config.OCR_MAX_PAGES - page_count)
+                except UploadRejected as e:
+                    upload_rejections_total.inc(reason=e.reason)
+                    return jsonify({
+                        'success': False,
+                        'error': f"{filename}: {str(e)}",
+                        'reason': e.reason
+                    }), e.status
+                image_jobs.extend(jobs)
+                page_count += len(jobs)
+            if page_count > Config.OCR_MAX_PAGES:
+                upload_rejections_total.inc(reason='pages')
+                return jsonify({
+                    'success': False,
+                    'error': f'Upload has more than {Config.OCR_MAX_PAGES} pages; the limit is {Config.OCR_MAX_PAGES} per request',
+                    'reason': 'pages'
+                }), 413
             
-            # Clean up uploaded file
-            os.remove(filepath)
+            # Extract text from PDFs
+            pdf_texts = {}
+            for filepath in pdf_paths:
+                with track_stage('pdf_extract', provider='pypdf2'):
+                    pdf_texts[filepath] = pdf_reader.extract_pages(filepath)
             
-            return jsonify({
-                'success': True,
-                'extracted_text': extracted_text,
-                'confidence': confidence,
-                'file_type': file_ext
-            }), 200
+            # Extract text from images using OCR (every frame of every image at once)
+            ocr_pages = {}
+            if image_jobs:
+                with track_stage('ocr', provider=ocr_service.ocr_method):
+                    for page in ocr_service.extract_pages(image_jobs):
+                        ocr_pages.setdefault(page['path'], []).append(page)
             
-        except Exception as e:
-            # Clean up on error
-            if os.path.exists(filepath):
-                os.remove(filepath)
-            raise e
+            pages = []
+            for filename, filepath in zip(filenames, filepaths):
+                if filepath in pdf_texts:
+                    # PDF extraction is generally reliable
+                    file_pages = [{'text': text, 'confidence': 0.95} for text in pdf_texts[filepath]]
+                else:
+                    file_pages = ocr_pages[filepath]
+                for index, page in enumerate(file_pages):
+                    pages.append({
+                        'page': len(pages) + 1,
+                        'file': filename,
+                        'file_page': index + 1,
+                        'text': page['text'],
+                        'confidence': page['confidence']
+                    })
+        finally:
+            # Clean up uploaded files
+            for filepath in filepaths:
+                if os.path.exists(filepath):
+                    os.remove(filepath)
+        
+        file_types = {filename.rsplit('.', 1)[1].lower() for filename in filenames}
+        return jsonify({
+            'success': True,
+            'extracted_text': join_pages(pages),
+            'confidence': aggregate_confidence(pages),
+            'file_type': file_types.pop() if len(file_types) == 1 else 'mixed',
+            'page_count': len(pages),
+            'pages': pages
+        }), 200
             
+    except RequestEntityTooLarge:
+        # Answered by the app-level 413 handler
+        raise
+    except DeadlineExceeded as e:
+        return jsonify({
+            'success': False,
+            'error': f"Request timed out: {str(e)}"
+        }), 504
     except Exception as e:
         import traceback
         error_message = str(e)
@@ -4,20 +4,38 @@ Summarize Route - Handles medical report summarization
 
 from flask import Blueprint, request, jsonify
 from services.llm_service import LLMService
+from services.rate_limiter import Overloaded
+from utils.deadline import DeadlineExceeded
 from services.text_cleaner import TextCleaner
+from services.report_sections import ReportSegmenter
+from services.medication_extractor import medication_extractor
+from services.lab_parser import LabParser
+from services.patient_reports import (patient_store, plan_update, lab_snapshot, local_items,
+                                      incremental_summaries_total, incremental_tokens_saved_total)
+from config import Config
+from utils.metrics import track_stage
+from utils.idempotency import idempotent
+from utils.usage import current_usage
+from utils.token_counter import TokenCounter
 
 summarize_bp = Blueprint('summarize', __name__)
 llm_service = LLMService()
 text_cleaner = TextCleaner()
+report_segmenter = ReportSegmenter(text_cleaner=text_cleaner)
+lab_parser = LabParser()
 
 @summarize_bp.route('/summarize', methods=['POST'])
+@idempotent
 def summarize_report():
     """
     Summarize medical report text into patient-friendly and doctor-focused summaries
     
     Request Body:
         {
-            "text": str  # Medical report text
+            "text": str,         # Medical report text
+            "patient_id": str,   # Optional: follow-up reports of the same patient are summarized incrementally
+            "patient_key": str   # Required with patient_id: client-held secret (PATIENT_KEY_MIN_LENGTH+ characters);
+                                 # the history is only reachable with the same id and key
         }
     
     Response:
@@ -27,8 +45,36 @@ def summarize_report():
             "doctor_summary": str,
             "key_findings": [str],
             "medications": [str],
+            "medications_source": str,  # "extractor+llm" (local draft confirmed by the LLM), "llm", or "extractor" (LLM unavailable)
             "critical_warnings": [str],
-            "follow_up": str
+            "lab_results": [{  # Present when LAB_FAST_PATH is on; parsed and flagged locally
+                "analyte": str, "name": str, "value": float, "unit": str, "reference": str,
+                "reference_source": str,  # "report" or "default" (built-in adult range)
+                "normalized_value": float, "normalized_unit": str,
+                "flag": str  # normal, low, high, critical_low, critical_high or unknown
+            }],
+            "follow_up": str,
+            "degraded": bool,  # Present when answered without the LLM (circuit open)
+            "parse_failed": bool,  # Present when the LLM answer could not be parsed (placeholder text, not stored)
+            "token_savings": {  # Present when REPORT_SECTION_FILTER is on
+                "original_tokens": int,  # Whole report after cleaning
+                "prompt_tokens": int,    # Labeled sections actually sent
+                "saved_tokens": int,
+                "sections": [str],
+                "dropped": {str: int}    # Lines left out, per section
+            },
+            "incremental": {  # Present with a patient_id (INCREMENTAL_SUMMARY)
+                "mode": str,  # first, reused (unchanged report), incremental (changes only) or full
+                "version": int, "previous_version": int,
+                "changed_sections": [str], "removed_sections": [str], "lab_changes": [str],
+                "delta_tokens": int,  # Changed report content sent to the LLM
+                "prompt_tokens": int, "full_prompt_tokens": int, "saved_tokens": int
+            },
+            "usage": {  # LLM calls made for this request (retries, hedges and fallbacks included)
+                "llm_calls": int, "prompt_tokens": int, "completion_tokens": int, "total_tokens": int,
+                "cost_usd": float,  # Estimated from list prices or LLM_MODEL_PRICES
+                "estimated": bool   # Some counts are local estimates (provider reported none)
+            }
         }
     """
     try:
@@ -48,17 +94,127 @@ def summarize_report():
                 'error': 'Text cannot be empty'
             }), 400
         
-        # Clean and preprocess text
-        cleaned_text = text_cleaner.clean_text(text)
+        patient_id = data.get('patient_id')
+        patient_secret = data.get('patient_key')
+        if patient_id is not None and not isinstance(patient_id, (str, int)):
+            return jsonify({
+                'success': False,
+                'error': 'patient_id must be a string'
+            }), 400
+        if not Config.INCREMENTAL_SUMMARY:
+            patient_id = None
+        if patient_id is not None and (not isinstance(patient_secret, str)
+                                       or len(patient_secret) < Config.PATIENT_KEY_MIN_LENGTH):
+            return jsonify({
+                'success': False,
+                'error': f'patient_key (at least {Config.PATIENT_KEY_MIN_LENGTH} characters) is required with patient_id'
+            }), 400
         
-        # Generate summaries using LLM
-        result = llm_service.summarize_medical_report(cleaned_text)
+        # Lab rows become a compact flagged table instead of raw text in the prompt
+        lab_results = None
+        if Config.LAB_FAST_PATH:
+            with track_stage('parse_labs'):
+                lab_results = lab_parser.parse(text)
         
-        return jsonify({
+        # Segment before cleaning (cleaning collapses the line breaks headers rely on),
+        # then send only the relevant sections
+        token_savings = None
+        section_texts = None
+        original_text = None
+        with track_stage('clean_text'):
+            if Config.REPORT_SECTION_FILTER or patient_id:
+                if lab_results:
+                    condensed = report_segmenter.condense(text, extracted_spans=lab_results.spans,
+                                                          extra_sections={'labs': lab_results.prompt_text()})
+                else:
+                    condensed = report_segmenter.condense(text)
+                section_texts = condensed.pop('section_texts')
+                original_text = condensed.pop('original_text')
+            if Config.REPORT_SECTION_FILTER:
+                cleaned_text = condensed.pop('text')
+                token_savings = condensed
+            else:
+                cleaned_text = original_text if original_text is not None else text_cleaner.clean_text(text)
+        
+        # Locally extracted medications are a draft for the LLM to confirm (raw text keeps line structure)
+        medications = None
+        if Config.MEDICATION_FAST_PATH:
+            with track_stage('extract_medications'):
+                medications = medication_extractor.medication_list(text)
+        
+        # Follow-up reports: diff against the patient's last summarized version
+        plan = None
+        if patient_id:
+            with track_stage('diff_report'):
+                previous = patient_store.latest(patient_id, patient_secret)
+                labs = lab_snapshot(lab_results)
+                full_prompt_tokens = TokenCounter.estimate(cleaned_text)
+                plan = plan_update(previous, section_texts, original_text, labs, full_prompt_tokens)
+        
+        result = None
+        if plan and plan['mode'] == 'reused':
+            # Nothing changed since the last version: no LLM call at all
+            result = dict(previous['summary'])
+        elif plan and plan['mode'] == 'incremental':
+            try:
+                result = llm_service.summarize_medical_report(plan['delta_text'], medications=medications,
+                                                              lab_results=lab_results,
+                                                              previous_summary=plan['previous_summary'])
+            except (Overloaded, DeadlineExceeded):
+                raise
+            except Exception as e:
+                print(f"Incremental summary failed, summarizing the whole report: {str(e)}")
+                plan['mode'] = 'full'
+        
+        if result is None:
+            # Generate summaries using LLM
+            result = llm_service.summarize_medical_report(cleaned_text, medications=medications, lab_results=lab_results)
+        
+        response = {
             'success': True,
             **result
-        }), 200
+        }
+        if plan:
+            version = previous['version'] if plan['mode'] == 'reused' else None
+            if plan['mode'] != 'reused' and not result.get('degraded') and not result.get('parse_failed'):
+                with track_stage('store_report'):
+                    version = patient_store.save(patient_id, patient_secret, section_texts, original_text, labs,
+                                                 local_items(lab_results), result)
+            sent_tokens = {'reused': 0, 'incremental': plan['prompt_tokens']}.get(plan['mode'], full_prompt_tokens)
+            incremental_summaries_total.inc(mode=plan['mode'])
+            incremental_tokens_saved_total.inc(full_prompt_tokens - sent_tokens)
+            response['incremental'] = {
+                'mode': plan['mode'],
+                'version': version,
+                'previous_version': previous['version'] if previous else None,
+                'changed_sections': plan['changed_sections'],
+                'removed_sections': plan['removed_sections'],
+                'lab_changes': plan['lab_changes'],
+                'delta_tokens': plan['delta_tokens'],
+                'prompt_tokens': sent_tokens,
+                'full_prompt_tokens': full_prompt_tokens,
+                'saved_tokens': full_prompt_tokens - sent_tokens
+            }
+        if lab_results is not None:
+            response['lab_results'] = lab_results.rows()
+        if token_savings is not None:
+            response['token_savings'] = token_savings
+        usage = current_usage()
+        if usage is not None:
+            response['usage'] = usage.summary()
+        return jsonify(response), 200
         
+    except Overloaded as e:
+        # Shed early instead of queueing behind a saturated provider
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 503, {'Retry-After': str(e.retry_after)}
+    except DeadlineExceeded as e:
+        return jsonify({
+            'success': False,
+            'error': f"Request timed out: {str(e)}"
+        }), 504
     except Exception as e:
         return jsonify({
             'success': False,
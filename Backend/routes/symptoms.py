@@ -5,19 +5,28 @@ Symptoms Route - Handles AI-powered symptom checking
 from flask import Blueprint, request, jsonify
 from services.rag_service import RAGService
 from services.llm_service import LLMService
+from services.symptom_triage import symptom_triage, symptom_triage_total
+from config import Config
+from utils.metrics import track_stage
+from utils.idempotency import idempotent
+from utils.usage import current_usage
+from services.rate_limiter import Overloaded
+from utils.deadline import DeadlineExceeded
 
 symptoms_bp = Blueprint('symptoms', __name__)
 rag_service = RAGService()
 llm_service = LLMService()
 
 @symptoms_bp.route('/symptom-check', methods=['POST'])
+@idempotent
 def check_symptoms():
     """
     Analyze symptoms and provide possible conditions with RAG-based insights
     
     Request Body:
         {
-            "symptoms": str  # Comma-separated or natural language symptoms
+            "symptoms": str,  # Comma-separated or natural language symptoms
+            "explain": bool   # Optional: run the full analysis even when red flags are found
         }
     
     Response:
@@ -34,8 +43,23 @@ def check_symptoms():
             "explanation": str,
             "recommendations": [str],
             "citations": [str],
-            "seek_immediate_care_if": [str]
+            "seek_immediate_care_if": [str],
+            "sources": [{"id": str, "source": str, "category": str, "score": float}],
+            "triage": {  # Local symptom normalization and red-flag rules
+                "symptoms": [str],
+                "negated": [str],
+                "red_flags": [str],
+                "source": str  # 'rules' (answered instantly, no retrieval/LLM) or 'llm'
+            },
+            "degraded": bool,  # Present when answered without the LLM (circuit open)
+            "parse_failed": bool,  # Present when the LLM answer could not be parsed (generic advice)
+            "usage": {"llm_calls": int, "prompt_tokens": int, "completion_tokens": int,
+                      "total_tokens": int, "cost_usd": float, "estimated": bool}
         }
+
+    Red-flag symptoms (e.g. chest pain, stroke signs) are answered by local rules
+    with urgency 'high'; clients wanting the detailed explanation can repeat the
+    request with "explain": true. The LLM never lowers the rules' urgency.
     """
     try:
         data = request.get_json()
@@ -54,17 +78,53 @@ def check_symptoms():
                 'error': 'Symptoms cannot be empty'
             }), 400
         
+        with track_stage('triage_symptoms'):
+            triage = symptom_triage.triage(symptoms)
+        triage_info = {
+            'symptoms': triage['symptoms'],
+            'negated': triage['negated'],
+            'red_flags': triage['red_flags']
+        }
+        
+        # Obvious emergencies need no retrieval or LLM round trip
+        if triage['urgency'] == 'high' and Config.SYMPTOM_TRIAGE_FAST_PATH and not data.get('explain'):
+            symptom_triage_total.inc(path='rules')
+            return jsonify({
+                'success': True,
+                **symptom_triage.urgent_response(triage),
+                'sources': [],
+                'triage': {**triage_info, 'source': 'rules'}
+            }), 200
+        
         # Retrieve relevant medical context using RAG
-        relevant_context = rag_service.retrieve_medical_context(symptoms)
+        retrieved = rag_service.retrieve_context_with_sources(symptoms)
         
         # Analyze symptoms with LLM using retrieved context
-        result = llm_service.analyze_symptoms(symptoms, relevant_context)
+        result = symptom_triage.apply(llm_service.analyze_symptoms(symptoms, retrieved['context']), triage)
+        symptom_triage_total.inc(path='llm')
         
-        return jsonify({
+        response = {
             'success': True,
-            **result
-        }), 200
+            **result,
+            'sources': retrieved['sources'],
+            'triage': {**triage_info, 'source': 'llm'}
+        }
+        usage = current_usage()
+        if usage is not None:
+            response['usage'] = usage.summary()
+        return jsonify(response), 200
         
+    except Overloaded as e:
+        # Shed early instead of queueing behind a saturated provider
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 503, {'Retry-After': str(e.retry_after)}
+    except DeadlineExceeded as e:
+        return jsonify({
+            'success': False,
+            'error': f"Request timed out: {str(e)}"
+        }), 504
     except Exception as e:
         return jsonify({
             'success': False,
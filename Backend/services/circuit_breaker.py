@@ -0,0 +1,112 @@
+"""
+Circuit Breaker - Fail fast while an LLM provider is down, probe until it recovers
+"""
+
+import time
+import threading
+from config import Config
+from utils.metrics import registry
+from services.rate_limiter import Overloaded
+
+CLOSED, HALF_OPEN, OPEN = 'closed', 'half_open', 'open'
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+llm_circuit_state = registry.gauge(
+    'medisense_llm_circuit_state', 'Circuit breaker state per LLM provider (0 closed, 1 half-open, 2 open)', ('provider',)
+)
+llm_circuit_transitions_total = registry.counter(
+    'medisense_llm_circuit_transitions_total', 'Circuit breaker state changes', ('provider', 'state')
+)
+llm_circuit_rejections_total = registry.counter(
+    'medisense_llm_circuit_rejections_total', 'LLM calls rejected without contacting an open provider', ('provider',)
+)
+
+class CircuitOpen(Overloaded):
+    """The provider's circuit is open; the call was rejected without contacting it"""
+
+class CircuitBreaker:
+    """
+    Closed -> open after LLM_CIRCUIT_FAILURE_THRESHOLD consecutive failures.
+    Open -> half-open after LLM_CIRCUIT_RECOVERY_SECONDS, letting up to
+    LLM_CIRCUIT_HALF_OPEN_PROBES calls through; a successful probe closes the
+    circuit, a failed one re-opens it for another recovery period.
+    """
+
+    def __init__(self, provider, failure_threshold=None, recovery_seconds=None, half_open_probes=None, clock=time.monotonic):
+        self.provider = provider
+        self.failure_threshold = Config.LLM_CIRCUIT_FAILURE_THRESHOLD if failure_threshold is None else failure_threshold
+        self.recovery_seconds = Config.LLM_CIRCUIT_RECOVERY_SECONDS if recovery_seconds is None else recovery_seconds
+        self.half_open_probes = Config.LLM_CIRCUIT_HALF_OPEN_PROBES if half_open_probes is None else half_open_probes
+        self.clock = clock
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probes_in_flight = 0
+        self._lock = threading.Lock()
+        llm_circuit_state.set(0, provider=provider)
+
+    def _transition(self, state):
+        self.state = state
+        llm_circuit_state.set(_STATE_VALUES[state], provider=self.provider)
+        llm_circuit_transitions_total.inc(provider=self.provider, state=state)
+        print(f"LLM circuit for '{self.provider}' is now {state}")
+
+    def retry_after(self):
+        """Seconds until the next probe is allowed"""
+        return max(1.0, self.opened_at + self.recovery_seconds - self.clock())
+
+    def allow(self):
+        """
+        Reserve permission to call the provider
+
+        Returns:
+            True if this call is a half-open probe (pass it to record_*)
+
+        Raises:
+            CircuitOpen: The circuit is open, or all probe slots are taken
+        """
+        if self.failure_threshold <= 0:
+            return False
+        with self._lock:
+            if self.state == OPEN and self.clock() - self.opened_at >= self.recovery_seconds:
+                self._transition(HALF_OPEN)
+            if self.state == CLOSED:
+                return False
+            if self.state == HALF_OPEN and self.probes_in_flight < self.half_open_probes:
+                self.probes_in_flight += 1
+                return True
+        llm_circuit_rejections_total.inc(provider=self.provider)
+        raise CircuitOpen(f"LLM provider '{self.provider}' is unavailable (circuit {self.state})", self.retry_after())
+
+    def record_success(self, probe=False):
+        with self._lock:
+            if probe:
+                self.probes_in_flight -= 1
+            self.failures = 0
+            if self.state != CLOSED:
+                self._transition(CLOSED)
+
+    def record_failure(self, probe=False):
+        with self._lock:
+            if probe:
+                self.probes_in_flight -= 1
+            self.failures += 1
+            if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= self.failure_threshold):
+                self.opened_at = self.clock()
+                self._transition(OPEN)
+
+    def release(self, probe=False):
+        """Give back a probe slot without judging the provider (e.g. call shed locally)"""
+        if probe:
+            with self._lock:
+                self.probes_in_flight -= 1
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+def provider_breaker(provider):
+    """Process-wide circuit breaker for a provider (shared by every LLMService instance)"""
+    with _breakers_lock:
+        if provider not in _breakers:
+            _breakers[provider] = CircuitBreaker(provider)
+        return _breakers[provider]
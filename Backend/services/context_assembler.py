@@ -0,0 +1,168 @@
+"""
+Context Assembler Service - Builds compact, diverse RAG context for prompts
+"""
+
+import re
+from config import Config
+from utils.token_counter import TokenCounter
+
+_SENTENCE_SPLIT = re.compile(r'(?<=[.!?])\s+')
+_WORD = re.compile(r'\w+')
+
+class ContextAssembler:
+    """Deduplicates retrieved passages, selects them with MMR and packs them into a token budget"""
+
+    def __init__(self, token_budget=None, mmr_lambda=None, duplicate_threshold=None):
+        self.token_budget = token_budget if token_budget is not None else Config.CONTEXT_TOKEN_BUDGET
+        self.mmr_lambda = mmr_lambda if mmr_lambda is not None else Config.MMR_LAMBDA
+        self.duplicate_threshold = duplicate_threshold if duplicate_threshold is not None else Config.CONTEXT_DUPLICATE_THRESHOLD
+
+    def assemble(self, candidates, query_embedding=None, top_k=None):
+        """
+        Assemble prompt context from retrieved candidates
+
+        Args:
+            candidates: List of dicts with 'text' and optional 'id', 'metadata',
+                        'embedding' and 'score' (higher is more relevant), in
+                        retrieval order
+            query_embedding: Optional query embedding used for MMR relevance
+            top_k: Maximum number of passages to keep (default from config)
+
+        Returns:
+            Dictionary with 'context' text, 'sources' list, 'tokens' used and
+            'duplicates_removed' count
+        """
+        top_k = top_k or Config.TOP_K_RESULTS
+
+        unique, duplicates_removed = self._remove_duplicates(candidates)
+        selected = self._select_mmr(unique, query_embedding, top_k)
+
+        parts = []
+        sources = []
+        used_tokens = 0
+        for candidate in selected:
+            marker = f"[{len(sources) + 1}] "
+            remaining = self.token_budget - used_tokens - TokenCounter.estimate(marker)
+            if remaining <= 0:
+                break
+
+            text = candidate['text']
+            if TokenCounter.estimate(text) > remaining:
+                text = TokenCounter.truncate(text, remaining)
+                if not text:
+                    break
+
+            parts.append(marker + text)
+            used_tokens += TokenCounter.estimate(marker + text)
+
+            metadata = candidate.get('metadata') or {}
+            sources.append({
+                'id': candidate.get('id'),
+                'source': metadata.get('source', 'unknown'),
+                'category': metadata.get('category'),
+                'score': round(float(candidate.get('score', 0.0)), 4),
+                'metadata': metadata
+            })
+
+        return {
+            'context': "\n\n".join(parts),
+            'sources': sources,
+            'tokens': used_tokens,
+            'duplicates_removed': duplicates_removed
+        }
+
+    def _remove_duplicates(self, candidates):
+        """Drop repeated sentences and passages that are near-duplicates of earlier ones"""
+        seen_sentences = set()
+        kept = []
+        kept_shingles = []
+        removed = 0
+
+        for candidate in candidates:
+            text = (candidate.get('text') or '').strip()
+            if not text:
+                continue
+
+            # Overlapping chunks repeat whole sentences; keep only the first occurrence
+            sentences = []
+            for sentence in _SENTENCE_SPLIT.split(text):
+                key = ' '.join(_WORD.findall(sentence.lower()))
+                if not key or key in seen_sentences:
+                    continue
+                seen_sentences.add(key)
+                sentences.append(sentence.strip())
+
+            if not sentences:
+                removed += 1
+                continue
+
+            shingles = self._shingles(' '.join(sentences))
+            if any(self._jaccard(shingles, other) >= self.duplicate_threshold for other in kept_shingles):
+                removed += 1
+                continue
+
+            kept.append(dict(candidate, text=' '.join(sentences)))
+            kept_shingles.append(shingles)
+
+        return kept, removed
+
+    def _select_mmr(self, candidates, query_embedding, top_k):
+        """Pick up to top_k passages balancing relevance against redundancy (maximal marginal relevance)"""
+        if len(candidates) <= 1:
+            return candidates[:top_k]
+
+        relevance, similarity = self._similarities(candidates, query_embedding)
+
+        selected = []
+        remaining = list(range(len(candidates)))
+        while remaining and len(selected) < top_k:
+            best_index = None
+            best_score = None
+            for index in remaining:
+                redundancy = max((similarity[index][chosen] for chosen in selected), default=0.0)
+                score = self.mmr_lambda * relevance[index] - (1 - self.mmr_lambda) * redundancy
+                if best_score is None or score > best_score:
+                    best_index, best_score = index, score
+            selected.append(best_index)
+            remaining.remove(best_index)
+
+        return [candidates[index] for index in selected]
+
+    def _similarities(self, candidates, query_embedding):
+        """Compute query relevance and pairwise passage similarity"""
+        embeddings = [candidate.get('embedding') for candidate in candidates]
+
+        if query_embedding is not None and all(embedding is not None for embedding in embeddings):
+            try:
+                import numpy as np
+
+                matrix = np.array(embeddings, dtype=np.float32)
+                matrix /= np.linalg.norm(matrix, axis=1, keepdims=True) + 1e-12
+                query = np.array(query_embedding, dtype=np.float32)
+                query /= np.linalg.norm(query) + 1e-12
+
+                return (matrix @ query).tolist(), (matrix @ matrix.T).tolist()
+            except ImportError:
+                pass
+
+        # Without embeddings fall back to retrieval scores and lexical overlap
+        shingles = [self._shingles(candidate['text']) for candidate in candidates]
+        count = len(candidates)
+        relevance = [float(candidate.get('score', 1.0 - index / count)) for index, candidate in enumerate(candidates)]
+        similarity = [[self._jaccard(shingles[i], shingles[j]) for j in range(count)] for i in range(count)]
+        return relevance, similarity
+
+    @staticmethod
+    def _shingles(text, size=3):
+        """Word n-gram shingles of normalized text"""
+        words = _WORD.findall(text.lower())
+        if len(words) < size:
+            return {' '.join(words)} if words else set()
+        return {' '.join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+    @staticmethod
+    def _jaccard(first, second):
+        """Jaccard similarity of two sets"""
+        if not first or not second:
+            return 0.0
+        return len(first & second) / len(first | second)
@@ -0,0 +1,92 @@
+"""
+Degraded Responses - Local rule-based answers used while no LLM provider is reachable
+"""
+
+import re
+from utils.metrics import registry
+from services.medication_extractor import medication_extractor
+from services.lab_parser import LabParser
+from services.symptom_triage import symptom_triage
+
+degraded_responses_total = registry.counter(
+    'medisense_degraded_responses_total', 'Responses served without an LLM (circuit open)', ('kind', 'source')
+)
+
+_WARNING_TERMS = re.compile(
+    r'[^.;]*\b(critical|urgent|immediately|emergency|abnormal|positive for|malignan\w*|severe)\b[^.;]*',
+    re.IGNORECASE
+)
+_FOLLOW_UP = re.compile(r'\b(?:follow[- ]?up|recommendations?|return|repeat)\b[^.]*\.', re.IGNORECASE)
+
+_DEGRADED_NOTE = ("The AI assistant is temporarily unavailable, so this is an automated extract "
+                  "of the report rather than a full analysis.")
+
+def _unique(items, limit):
+    seen = []
+    for item in items:
+        item = ' '.join(item.split())
+        if item and item.lower() not in (existing.lower() for existing in seen):
+            seen.append(item)
+        if len(seen) >= limit:
+            break
+    return seen
+
+def rule_based_summary(text):
+    """
+    Extract medications, flagged lab values, warnings and follow-up sentences without an LLM
+
+    Args:
+        text: Medical report text
+
+    Returns:
+        Dictionary with the MedicalSummary fields
+    """
+    medications = medication_extractor.medication_list(text)[:10]
+    lab_results = LabParser().parse(text)
+    findings = lab_results.key_findings(include_normal=True, limit=10)
+    warnings = lab_results.critical_warnings() + _unique((match.group(0).strip() for match in _WARNING_TERMS.finditer(text)), 5)
+    follow_up = _unique((match.group(0) for match in _FOLLOW_UP.finditer(text)), 2)
+
+    excerpt = ' '.join(text.split()[:80])
+    return {
+        'patient_summary': f"{_DEGRADED_NOTE} Please review the listed results and medications with your "
+                           "healthcare provider, who can explain what they mean for you.",
+        'doctor_summary': f"Automated extract (LLM unavailable). Report excerpt: {excerpt}",
+        'key_findings': findings or ["No structured lab values detected"],
+        'medications': medications,
+        'critical_warnings': warnings,
+        'follow_up': ' '.join(follow_up) or "Consult with your healthcare provider to review this report"
+    }
+
+def rule_based_symptom_analysis(symptoms, context=""):
+    """
+    Conservative symptom triage without an LLM: red-flag rules set the urgency
+
+    Args:
+        symptoms: User's symptom description
+        context: Retrieved medical context (used for citations only)
+
+    Returns:
+        Dictionary with the SymptomAnalysis fields
+    """
+    triage = symptom_triage.triage(symptoms)
+    red_flags = triage['urgency'] == 'high'
+    urgency = 'high' if red_flags else 'medium'
+    explanation = ("The AI assistant is temporarily unavailable, so these symptoms could not be analysed in detail. ")
+    if red_flags:
+        explanation += f"Your description mentions {', '.join(triage['symptoms'])}, which can indicate a serious condition."
+    else:
+        explanation += "Please consult a healthcare provider for an assessment."
+    return {
+        'possible_conditions': [{
+            'name': "General Consultation Needed",
+            'probability': "medium",
+            'description': "A healthcare provider should assess these symptoms"
+        }],
+        'urgency': urgency,
+        'explanation': explanation,
+        'recommendations': (["Seek emergency care now or call your local emergency number"] if red_flags else [])
+                           + ["Consult with a healthcare provider", "Monitor your symptoms and note any changes"],
+        'citations': ["Retrieved medical knowledge base"] if context else [],
+        'seek_immediate_care_if': triage['seek_immediate_care_if']
+    }
@@ -0,0 +1,172 @@
+"""
+Embedding Cache Service - Content-addressed on-disk store of document embeddings
+"""
+
+import os
+import re
+import json
+import hashlib
+import threading
+from config import Config
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process development only
+    fcntl = None
+
+class EmbeddingCache:
+    """
+    Append-only embedding store keyed by the SHA-256 of the text.
+
+    Layout under Config.EMBEDDINGS_PATH/<model>/:
+        meta.json    - model name and vector dimension
+        vectors.f32  - raw float32 rows, memory-mapped for reads
+        index.tsv    - "<sha256>\t<row>" lines, appended after the row is written
+    """
+
+    def __init__(self, model_name=None, base_path=None):
+        import numpy as np
+
+        self.np = np
+        self.model_name = model_name or Config.EMBEDDING_MODEL
+        slug = re.sub(r'[^A-Za-z0-9_.-]+', '_', self.model_name)
+        self.path = os.path.join(base_path or Config.EMBEDDINGS_PATH, slug)
+        self.vectors_path = os.path.join(self.path, 'vectors.f32')
+        self.index_path = os.path.join(self.path, 'index.tsv')
+        self.meta_path = os.path.join(self.path, 'meta.json')
+
+        self.dimension = None
+        self.index = {}
+        self._index_offset = 0
+        self._vectors = None
+        self._lock = threading.Lock()
+
+        os.makedirs(self.path, exist_ok=True)
+        self._load()
+
+    @staticmethod
+    def content_hash(text):
+        """Stable key for a document text"""
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    def _load(self):
+        """Read metadata and any index lines not seen yet"""
+        if self.dimension is None and os.path.exists(self.meta_path):
+            with open(self.meta_path, 'r', encoding='utf-8') as meta_file:
+                meta = json.load(meta_file)
+            if meta.get('model') != self.model_name:
+                raise ValueError(f"Embedding cache at {self.path} belongs to model {meta.get('model')}")
+            self.dimension = int(meta['dimension'])
+
+        if not os.path.exists(self.index_path):
+            return
+
+        with open(self.index_path, 'r', encoding='utf-8') as index_file:
+            index_file.seek(self._index_offset)
+            for line in index_file:
+                # A torn final line from a crashed writer is ignored until completed
+                if not line.endswith('\n'):
+                    break
+                key, row = line.rstrip('\n').split('\t')
+                self.index[key] = int(row)
+                self._index_offset += len(line.encode('utf-8'))
+        self._vectors = None
+
+    def _matrix(self):
+        """Memory-map the vectors file (re-mapped after it grows)"""
+        if self._vectors is None and self.dimension and os.path.exists(self.vectors_path):
+            rows = os.path.getsize(self.vectors_path) // (self.dimension * 4)
+            if rows:
+                self._vectors = self.np.memmap(self.vectors_path, dtype=self.np.float32, mode='r',
+                                               shape=(rows, self.dimension))
+        return self._vectors
+
+    def get(self, text):
+        """Return the cached embedding for text or None"""
+        with self._lock:
+            row = self.index.get(self.content_hash(text))
+            matrix = self._matrix()
+            if row is None or matrix is None or row >= len(matrix):
+                return None
+            return self.np.array(matrix[row])
+
+    def put_many(self, texts, vectors):
+        """
+        Append embeddings for texts that are not cached yet
+
+        Args:
+            texts: List of document texts
+            vectors: Matching 2-D array of embeddings
+        """
+        vectors = self.np.asarray(vectors, dtype=self.np.float32)
+        if len(texts) == 0:
+            return
+
+        with self._lock:
+            if self.dimension is None:
+                self.dimension = int(vectors.shape[1])
+                with open(self.meta_path, 'w', encoding='utf-8') as meta_file:
+                    json.dump({'model': self.model_name, 'dimension': self.dimension}, meta_file)
+            elif vectors.shape[1] != self.dimension:
+                raise ValueError(f"Expected {self.dimension}-d embeddings, got {vectors.shape[1]}-d")
+
+            with open(self.vectors_path, 'ab') as vectors_file, open(self.index_path, 'a', encoding='utf-8') as index_file:
+                if fcntl:
+                    fcntl.flock(vectors_file, fcntl.LOCK_EX)
+                try:
+                    # Pick up rows appended by other workers before numbering ours
+                    self._load()
+                    vectors_file.seek(0, os.SEEK_END)
+                    row = vectors_file.tell() // (self.dimension * 4)
+
+                    lines = []
+                    for text, vector in zip(texts, vectors):
+                        key = self.content_hash(text)
+                        if key in self.index:
+                            continue
+                        vectors_file.write(vector.tobytes())
+                        lines.append(f"{key}\t{row}\n")
+                        self.index[key] = row
+                        row += 1
+
+                    vectors_file.flush()
+                    os.fsync(vectors_file.fileno())
+                    index_file.write(''.join(lines))
+                    index_file.flush()
+                    self._index_offset = index_file.tell()
+                finally:
+                    if fcntl:
+                        fcntl.flock(vectors_file, fcntl.LOCK_UN)
+            self._vectors = None
+
+    def encode(self, texts, encoder):
+        """
+        Embed texts, encoding only those missing from the cache
+
+        Args:
+            texts: List of document texts
+            encoder: Callable taking a list of texts and returning a 2-D array
+
+        Returns:
+            Tuple of (2-D float32 array aligned with texts, number of texts encoded)
+        """
+        cached = [self.get(text) for text in texts]
+        missing = [index for index, vector in enumerate(cached) if vector is None]
+        encoded_count = 0
+
+        if missing:
+            # Encode each distinct missing text once
+            unique_texts = list(dict.fromkeys(texts[index] for index in missing))
+            encoded = self.np.asarray(encoder(unique_texts), dtype=self.np.float32)
+            encoded_count = len(unique_texts)
+            self.put_many(unique_texts, encoded)
+            by_text = dict(zip(unique_texts, encoded))
+            for index in missing:
+                cached[index] = by_text[texts[index]]
+
+        if not cached:
+            return self.np.zeros((0, self.dimension or 0), dtype=self.np.float32), 0
+        return self.np.vstack(cached), encoded_count
+
+    def __len__(self):
+        return len(self.index)
@@ -0,0 +1,277 @@
+"""
+Knowledge Base Snapshot Service - Single-file export/import of the RAG knowledge base
+"""
+
+import os
+import re
+import json
+import math
+import struct
+import hashlib
+from datetime import datetime, timezone
+from collections import Counter
+
+MAGIC = b'MSKBSNAP'
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+
+_PREAMBLE = struct.Struct('<8sII')  # magic, format version, header length
+_TOKEN = re.compile(r'[a-z0-9]+')
+_STOPWORDS = frozenset(
+    'a an and are as at be by for from has in is it of on or that the to with'.split()
+)
+
+class SnapshotError(Exception):
+    """Raised when a snapshot file is missing, corrupt or incompatible"""
+
+def tokenize(text):
+    """Lowercased word tokens used by the lexical index"""
+    return [token for token in _TOKEN.findall(text.lower()) if len(token) > 1 and token not in _STOPWORDS]
+
+def _pad(length):
+    return (ALIGNMENT - length % ALIGNMENT) % ALIGNMENT
+
+class KnowledgeBaseSnapshot:
+    """
+    Versioned, memory-mappable snapshot of documents, metadata, embeddings and a lexical index.
+
+    File layout:
+        preamble   - magic, format version, header length
+        header     - JSON with counts, model, section offsets and payload SHA-256
+        embeddings - float32 matrix (count x dimension), 64-byte aligned for np.memmap
+        documents  - JSON list of {"id", "text", "metadata"}
+        lexical    - JSON inverted index (term -> [[doc, tf], ...]) with document lengths
+    """
+
+    def __init__(self, path, header, embeddings, records, lexical):
+        self.path = path
+        self.header = header
+        self.embeddings = embeddings
+        self.ids = [record['id'] for record in records]
+        self.documents = [record['text'] for record in records]
+        self.metadatas = [record.get('metadata') or {} for record in records]
+        self.lexical = lexical
+        self._normalized = None
+
+    @property
+    def embedding_model(self):
+        return self.header.get('embedding_model')
+
+    def __len__(self):
+        return len(self.ids)
+
+    @staticmethod
+    def build_lexical_index(documents):
+        """Build an inverted index with term frequencies for BM25 scoring"""
+        postings = {}
+        lengths = []
+        for doc_index, text in enumerate(documents):
+            counts = Counter(tokenize(text))
+            lengths.append(sum(counts.values()))
+            for term, frequency in counts.items():
+                postings.setdefault(term, []).append([doc_index, frequency])
+        return {
+            'postings': postings,
+            'doc_lengths': lengths,
+            'avg_length': (sum(lengths) / len(lengths)) if lengths else 0.0
+        }
+
+    @classmethod
+    def export(cls, path, ids, documents, metadatas, embeddings, embedding_model):
+        """
+        Write a snapshot file atomically
+
+        Args:
+            path: Destination file path
+            ids: Document ids
+            documents: Document texts
+            metadatas: Metadata dictionaries aligned with documents
+            embeddings: 2-D array-like of embeddings aligned with documents
+            embedding_model: Name of the model that produced the embeddings
+
+        Returns:
+            Header dictionary written to the file
+        """
+        import numpy as np
+
+        matrix = np.ascontiguousarray(np.asarray(embeddings, dtype=np.float32))
+        if len(documents) and matrix.shape[0] != len(documents):
+            raise SnapshotError(f"Got {matrix.shape[0]} embeddings for {len(documents)} documents")
+        dimension = int(matrix.shape[1]) if matrix.ndim == 2 else 0
+
+        records = [
+            {'id': doc_id, 'text': text, 'metadata': metadata or {}}
+            for doc_id, text, metadata in zip(ids, documents, metadatas)
+        ]
+        sections = [
+            ('embeddings', matrix.tobytes()),
+            ('documents', json.dumps(records, ensure_ascii=False).encode('utf-8')),
+            ('lexical', json.dumps(cls.build_lexical_index(documents), separators=(',', ':')).encode('utf-8'))
+        ]
+
+        checksum = hashlib.sha256()
+        layout = {}
+        offset = 0
+        for name, blob in sections:
+            layout[name] = {'offset': offset, 'length': len(blob)}
+            offset += len(blob) + _pad(len(blob))
+
+        header = {
+            'format_version': FORMAT_VERSION,
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'embedding_model': embedding_model,
+            'count': len(records),
+            'dimension': dimension,
+            'sections': layout
+        }
+
+        for name, blob in sections:
+            checksum.update(blob)
+            checksum.update(b'\0' * _pad(len(blob)))
+        header['sha256'] = checksum.hexdigest()
+
+        header_bytes = json.dumps(header).encode('utf-8')
+        header_bytes += b' ' * _pad(_PREAMBLE.size + len(header_bytes))
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'wb') as snapshot_file:
+            snapshot_file.write(_PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(header_bytes)))
+            snapshot_file.write(header_bytes)
+            for name, blob in sections:
+                snapshot_file.write(blob)
+                snapshot_file.write(b'\0' * _pad(len(blob)))
+            snapshot_file.flush()
+            os.fsync(snapshot_file.fileno())
+        os.replace(temp_path, path)
+
+        return header
+
+    @classmethod
+    def read_header(cls, path):
+        """Read and validate the preamble and header; returns (header, payload_offset)"""
+        if not os.path.exists(path):
+            raise SnapshotError(f"Snapshot not found: {path}")
+
+        with open(path, 'rb') as snapshot_file:
+            preamble = snapshot_file.read(_PREAMBLE.size)
+            if len(preamble) < _PREAMBLE.size:
+                raise SnapshotError("Snapshot is truncated")
+            magic, version, header_length = _PREAMBLE.unpack(preamble)
+            if magic != MAGIC:
+                raise SnapshotError("Not a knowledge base snapshot")
+            if version != FORMAT_VERSION:
+                raise SnapshotError(f"Unsupported snapshot version {version} (expected {FORMAT_VERSION})")
+            try:
+                header = json.loads(snapshot_file.read(header_length).decode('utf-8'))
+            except ValueError as e:
+                raise SnapshotError(f"Corrupt snapshot header: {str(e)}")
+
+        return header, _PREAMBLE.size + header_length
+
+    @classmethod
+    def verify(cls, path):
+        """Stream the payload and compare against the header checksum"""
+        header, payload_offset = cls.read_header(path)
+        cls._check_payload(path, header, payload_offset)
+        return header
+
+    @staticmethod
+    def _check_payload(path, header, payload_offset):
+        checksum = hashlib.sha256()
+        with open(path, 'rb') as snapshot_file:
+            snapshot_file.seek(payload_offset)
+            for block in iter(lambda: snapshot_file.read(1 << 20), b''):
+                checksum.update(block)
+        if checksum.hexdigest() != header.get('sha256'):
+            raise SnapshotError("Snapshot checksum mismatch")
+
+    @classmethod
+    def load(cls, path, verify=True):
+        """
+        Map a snapshot file; embeddings stay on disk behind np.memmap
+
+        Args:
+            path: Snapshot file path
+            verify: Validate the payload checksum before use
+
+        Returns:
+            KnowledgeBaseSnapshot instance
+        """
+        import numpy as np
+
+        header, payload_offset = cls.read_header(path)
+        if verify:
+            cls._check_payload(path, header, payload_offset)
+        sections = header['sections']
+
+        count, dimension = header['count'], header['dimension']
+        if count and dimension:
+            embeddings = np.memmap(path, dtype=np.float32, mode='r',
+                                   offset=payload_offset + sections['embeddings']['offset'],
+                                   shape=(count, dimension))
+        else:
+            embeddings = np.zeros((0, dimension), dtype=np.float32)
+
+        with open(path, 'rb') as snapshot_file:
+            def read_section(name):
+                snapshot_file.seek(payload_offset + sections[name]['offset'])
+                return json.loads(snapshot_file.read(sections[name]['length']).decode('utf-8'))
+
+            try:
+                records = read_section('documents')
+                lexical = read_section('lexical')
+            except ValueError as e:
+                raise SnapshotError(f"Corrupt snapshot section: {str(e)}")
+
+        if len(records) != count:
+            raise SnapshotError(f"Snapshot header says {count} documents, found {len(records)}")
+
+        return cls(path, header, embeddings, records, lexical)
+
+    def _result(self, index, score):
+        return {
+            'id': self.ids[index],
+            'text': self.documents[index],
+            'metadata': self.metadatas[index],
+            'embedding': self.embeddings[index] if len(self.embeddings) else None,
+            'score': float(score)
+        }
+
+    def search(self, query_embedding, top_k):
+        """Brute-force cosine search over the mapped embeddings"""
+        import numpy as np
+
+        if not len(self.embeddings):
+            return []
+        if self._normalized is None:
+            norms = np.linalg.norm(self.embeddings, axis=1, keepdims=True) + 1e-12
+            self._normalized = np.asarray(self.embeddings) / norms
+
+        query = np.array(query_embedding, dtype=np.float32)
+        query /= np.linalg.norm(query) + 1e-12
+        scores = self._normalized @ query
+        top_k = min(top_k, len(scores))
+        best = np.argpartition(-scores, top_k - 1)[:top_k]
+        best = best[np.argsort(-scores[best])]
+        return [self._result(int(index), scores[index]) for index in best]
+
+    def lexical_search(self, query, top_k, k1=1.5, b=0.75):
+        """BM25 search over the stored inverted index (no embedding model required)"""
+        postings = self.lexical.get('postings', {})
+        lengths = self.lexical.get('doc_lengths', [])
+        avg_length = self.lexical.get('avg_length') or 1.0
+        total = len(lengths)
+
+        scores = {}
+        for term in set(tokenize(query)):
+            term_postings = postings.get(term)
+            if not term_postings:
+                continue
+            idf = math.log(1 + (total - len(term_postings) + 0.5) / (len(term_postings) + 0.5))
+            for doc_index, frequency in term_postings:
+                norm = frequency * (k1 + 1) / (frequency + k1 * (1 - b + b * lengths[doc_index] / avg_length))
+                scores[doc_index] = scores.get(doc_index, 0.0) + idf * norm
+
+        best = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top_k]
+        return [self._result(doc_index, score) for doc_index, score in best]
@@ -0,0 +1,406 @@
+"""
+Lab Parser Service - Extracts lab results into columns and flags out-of-range values locally
+"""
+
+import re
+from utils.patterns import trie_pattern
+
+# analyte: (display name, aliases, canonical unit, {unit: factor to canonical}, default range, critical range)
+# Ranges are (low, high) in the canonical unit; None means unbounded. Adult reference values.
+_ANALYTES = {
+    'glucose': ('Glucose', ('glucose', 'blood glucose', 'fasting glucose', 'fasting blood glucose', 'fasting blood sugar',
+                            'fbs', 'fasting plasma glucose', 'fpg', 'blood sugar'),
+                'mg/dl', {'mmol/l': 18.016}, (70, 99), (40, 450)),
+    'hba1c': ('HbA1c', ('hba1c', 'hemoglobin a1c', 'haemoglobin a1c', 'a1c', 'glycated hemoglobin', 'glycosylated hemoglobin'),
+              '%', {}, (4.0, 5.6), (None, None)),
+    'total_cholesterol': ('Total Cholesterol', ('total cholesterol', 'cholesterol', 'serum cholesterol'),
+                          'mg/dl', {'mmol/l': 38.67}, (None, 200), (None, None)),
+    'ldl': ('LDL Cholesterol', ('ldl', 'ldl cholesterol', 'ldl c', 'ldl-c'), 'mg/dl', {'mmol/l': 38.67}, (None, 100), (None, None)),
+    'hdl': ('HDL Cholesterol', ('hdl', 'hdl cholesterol', 'hdl c', 'hdl-c'), 'mg/dl', {'mmol/l': 38.67}, (40, None), (None, None)),
+    'triglycerides': ('Triglycerides', ('triglycerides', 'triglyceride', 'tg'), 'mg/dl', {'mmol/l': 88.57}, (None, 150), (None, 1000)),
+    'creatinine': ('Creatinine', ('creatinine', 'serum creatinine', 's creatinine', 'creat'),
+                   'mg/dl', {'umol/l': 1 / 88.42}, (0.6, 1.2), (None, 10.0)),
+    'bun': ('BUN', ('bun', 'blood urea nitrogen', 'urea nitrogen'), 'mg/dl', {'mmol/l': 2.801}, (7, 20), (None, 100)),
+    'egfr': ('eGFR', ('egfr', 'estimated gfr', 'gfr'), 'ml/min/1.73m2', {'ml/min': 1}, (60, None), (15, None)),
+    'sodium': ('Sodium', ('sodium', 'serum sodium', 'na+'), 'mmol/l', {'meq/l': 1}, (135, 145), (120, 160)),
+    'potassium': ('Potassium', ('potassium', 'serum potassium', 'k+'), 'mmol/l', {'meq/l': 1}, (3.5, 5.1), (2.5, 6.5)),
+    'chloride': ('Chloride', ('chloride', 'cl-'), 'mmol/l', {'meq/l': 1}, (98, 107), (80, 120)),
+    'bicarbonate': ('Bicarbonate', ('bicarbonate', 'hco3', 'total co2'), 'mmol/l', {'meq/l': 1}, (22, 29), (10, 40)),
+    'calcium': ('Calcium', ('calcium', 'serum calcium', 'total calcium'), 'mg/dl', {'mmol/l': 4.008}, (8.5, 10.5), (6.0, 13.0)),
+    'magnesium': ('Magnesium', ('magnesium', 'serum magnesium'), 'mg/dl', {'mmol/l': 2.431}, (1.7, 2.2), (1.0, 4.9)),
+    'hemoglobin': ('Hemoglobin', ('hemoglobin', 'haemoglobin', 'hb', 'hgb'), 'g/dl', {'g/l': 0.1, 'mmol/l': 1.611},
+                   (12.0, 17.5), (7.0, 20.0)),
+    'hematocrit': ('Hematocrit', ('hematocrit', 'haematocrit', 'hct', 'pcv'), '%', {}, (36, 52), (20, 60)),
+    'wbc': ('WBC', ('wbc', 'white blood cells', 'white blood cell count', 'white cell count', 'leukocytes',
+                    'total leukocyte count', 'tlc'), '10^9/l', {'/ul': 0.001}, (4.0, 11.0), (2.0, 30.0)),
+    'rbc': ('RBC', ('rbc', 'red blood cells', 'red blood cell count', 'red cell count'), '10^12/l', {}, (4.2, 5.9), (None, None)),
+    'platelets': ('Platelets', ('platelets', 'platelet count', 'plt'), '10^9/l', {'/ul': 0.001}, (150, 400), (50, 1000)),
+    'mcv': ('MCV', ('mcv', 'mean corpuscular volume'), 'fl', {}, (80, 100), (None, None)),
+    'alt': ('ALT', ('alt', 'sgpt', 'alanine aminotransferase'), 'u/l', {'iu/l': 1}, (7, 56), (None, 1000)),
+    'ast': ('AST', ('ast', 'sgot', 'aspartate aminotransferase'), 'u/l', {'iu/l': 1}, (10, 40), (None, 1000)),
+    'alp': ('Alkaline Phosphatase', ('alkaline phosphatase', 'alp'), 'u/l', {'iu/l': 1}, (44, 147), (None, None)),
+    'bilirubin': ('Total Bilirubin', ('bilirubin', 'total bilirubin', 'serum bilirubin'), 'mg/dl', {'umol/l': 1 / 17.1},
+                  (0.1, 1.2), (None, 15.0)),
+    'albumin': ('Albumin', ('albumin', 'serum albumin'), 'g/dl', {'g/l': 0.1}, (3.5, 5.0), (1.5, None)),
+    'tsh': ('TSH', ('tsh', 'thyroid stimulating hormone'), 'miu/l', {'uiu/ml': 1}, (0.4, 4.0), (0.01, 50)),
+    'free_t4': ('Free T4', ('free t4', 'ft4', 'free thyroxine'), 'ng/dl', {'pmol/l': 1 / 12.87}, (0.8, 1.8), (None, None)),
+    'crp': ('CRP', ('crp', 'c reactive protein', 'c-reactive protein', 'hs crp', 'hs-crp'), 'mg/l', {'mg/dl': 10},
+            (None, 10), (None, None)),
+    'esr': ('ESR', ('esr', 'erythrocyte sedimentation rate'), 'mm/hr', {}, (0, 20), (None, None)),
+    'inr': ('INR', ('inr',), '', {}, (0.8, 1.2), (None, 5.0)),
+    'troponin': ('Troponin', ('troponin', 'troponin i', 'troponin t', 'hs troponin', 'hs-troponin', 'ctni', 'ctnt'),
+                 'ng/ml', {'ng/l': 0.001, 'pg/ml': 0.001}, (None, 0.04), (None, 0.04)),
+    'vitamin_d': ('Vitamin D', ('vitamin d', '25 oh vitamin d', '25-oh vitamin d', '25 hydroxy vitamin d'),
+                  'ng/ml', {'nmol/l': 1 / 2.496}, (30, 100), (10, None)),
+    'vitamin_b12': ('Vitamin B12', ('vitamin b12', 'b12', 'cobalamin'), 'pg/ml', {'pmol/l': 1.355}, (200, 900), (None, None)),
+    'ferritin': ('Ferritin', ('ferritin', 'serum ferritin'), 'ng/ml', {'ug/l': 1}, (30, 400), (None, None)),
+    'uric_acid': ('Uric Acid', ('uric acid', 'serum uric acid', 'urate'), 'mg/dl', {'umol/l': 1 / 59.48}, (3.5, 7.2), (None, None)),
+    'psa': ('PSA', ('psa', 'prostate specific antigen'), 'ng/ml', {'ug/l': 1}, (None, 4.0), (None, None))
+}
+
+# Adult reference ranges as labs print them in SI units; a plain conversion of the
+# canonical range gives odd bounds (glucose 70-99 mg/dL is 3.89-5.495 mmol/L, but
+# labs report 3.9-5.5). Other units use the converted range at 3 significant digits.
+_UNIT_RANGES = {
+    ('glucose', 'mmol/l'): (3.9, 5.5),
+    ('total_cholesterol', 'mmol/l'): (None, 5.2),
+    ('ldl', 'mmol/l'): (None, 2.6),
+    ('hdl', 'mmol/l'): (1.0, None),
+    ('triglycerides', 'mmol/l'): (None, 1.7),
+    ('creatinine', 'umol/l'): (53, 106),
+    ('bun', 'mmol/l'): (2.5, 7.1),
+    ('calcium', 'mmol/l'): (2.12, 2.62),
+    ('magnesium', 'mmol/l'): (0.7, 0.9),
+    ('hemoglobin', 'g/l'): (120, 175),
+    ('bilirubin', 'umol/l'): (2, 21),
+    ('albumin', 'g/l'): (35, 50),
+    ('free_t4', 'pmol/l'): (10, 23),
+    ('vitamin_d', 'nmol/l'): (75, 250),
+    ('vitamin_b12', 'pmol/l'): (148, 664),
+    ('uric_acid', 'umol/l'): (208, 428)
+}
+
+# Units that are the same quantity under another name
+_UNIT_ALIASES = {
+    'x10^9/l': '10^9/l', '10^3/ul': '10^9/l', 'x10^3/ul': '10^9/l', 'k/ul': '10^9/l', 'thou/ul': '10^9/l',
+    'x10^12/l': '10^12/l', '10^6/ul': '10^12/l', 'x10^6/ul': '10^12/l', 'm/ul': '10^12/l', 'mill/ul': '10^12/l',
+    'cells/ul': '/ul', 'ml/min/1.73m²': 'ml/min/1.73m2', 'mm/h': 'mm/hr', 'iu/ml': 'miu/l', 'uiu/ml': 'uiu/ml'
+}
+
+_UNIT_DISPLAY = {
+    'mg/dl': 'mg/dL', 'mmol/l': 'mmol/L', 'g/dl': 'g/dL', 'mg/l': 'mg/L', '10^9/l': 'x10^9/L', '10^12/l': 'x10^12/L',
+    'u/l': 'U/L', 'miu/l': 'mIU/L', 'ng/ml': 'ng/mL', 'ng/dl': 'ng/dL', 'pg/ml': 'pg/mL', 'fl': 'fL',
+    'ml/min/1.73m2': 'mL/min/1.73m2'
+}
+
+# Non-linear unit conversions to the canonical unit
+_NONLINEAR = {
+    ('hba1c', 'mmol/mol'): lambda value: 0.09148 * value + 2.152
+}
+
+_ALIAS_TO_ANALYTE = {alias: key for key, spec in _ANALYTES.items() for alias in spec[1]}
+
+_NUMBER = r'\d{1,3}(?:,\d{3})+(?:\.\d+)?|\d+(?:\.\d+)?'
+_UNIT = (
+    r'x?[ \t]?10[ \t]?\^?[ \t]?(?:9|12|3|6)[ \t]?/[ \t]?[lµu]l?|[km]/[uµ]l|thou/[uµ]l|mill/[uµ]l|cells/[uµ]l|/[uµ]l|'
+    r'ml/min(?:/1\.73[ \t]?m(?:2|²))?|mmol/mol|mmol/l|[uµ]mol/l|nmol/l|pmol/l|meq/l|mg/dl|mg/l|g/dl|g/l|'
+    r'ng/ml|ng/dl|ng/l|pg/ml|[uµ]g/l|[uµ]g/dl|[uµ]iu/ml|miu/l|m?iu/ml|iu/l|u/l|mm/hr?|fl|pg|%'
+)
+_RANGE = (
+    rf'(?P<low>{_NUMBER})[ \t]*(?:-|–|to)[ \t]*(?P<high>{_NUMBER})'
+    rf'|(?P<bound_op>[<>≤≥]=?)[ \t]*(?P<bound>{_NUMBER})'
+)
+_FLAG = r'(?P<{name}>\b(?:hh|ll|h|l|high|low|crit(?:ical)?|abn(?:ormal)?)\b|\*+)'
+
+_ROW = re.compile(
+    r'(?<![\w-])(?P<name>' + trie_pattern(_ALIAS_TO_ANALYTE) + r')(?![\w])'
+    r'[ \t]*(?:\([^)\n]{0,20}\)[ \t]*)?(?:[:=][ \t]*)?'
+    rf'(?P<op>[<>≤≥])?[ \t]*(?P<value>{_NUMBER})(?![\d/]|\.\d)'
+    rf'(?:[ \t]*(?P<unit>{_UNIT})(?![\w/]))?'
+    rf'(?:[ \t]*{_FLAG.format(name="flag")})?'
+    rf'(?:[ \t,;]*[\[(]?[ \t]*(?:ref(?:erence)?(?:[ \t]*range)?[ \t]*:?[ \t]*)?(?:{_RANGE})[ \t]*[\])]?)?'
+    rf'(?:[ \t]*{_FLAG.format(name="flag_after")})?',
+    re.IGNORECASE
+)
+
+# A word right after a value without a unit: a dose ("20 mEq PO", "600 mg", "1000 IU")
+# or prose ("3 times upper limit"), not a lab result. Connectives are allowed.
+_TRAILING_WORD = re.compile(r'[ \t]*(?!(?:and|or|on|at|in|was|were|vs)\b)[a-zµ]', re.IGNORECASE)
+
+_FLAG_WORDS = {'hh': 'high', 'h': 'high', 'high': 'high', 'll': 'low', 'l': 'low', 'low': 'low'}
+
+def _number(text):
+    return float(text.replace(',', '')) if text else None
+
+def _unit_key(unit):
+    """Canonical spelling of a unit: lower-case, µ as u, no spaces"""
+    key = unit.lower().replace('µ', 'u').replace(' ', '').replace('\t', '')
+    if key[:1] == 'x' or key[:2] == '10':
+        key = 'x' + key.lstrip('x').replace('^', '')
+        key = key.replace('x10', 'x10^', 1)
+    return _UNIT_ALIASES.get(key, key)
+
+def _format_number(value):
+    """Three significant digits without exponents (converted ranges are not exact anyway)"""
+    if abs(value) >= 1000:
+        return f"{value:,.0f}"
+    text = f"{float(f'{value:.3g}')}"
+    return text[:-2] if text.endswith('.0') else text
+
+class LabResults:
+    """
+    Parsed lab rows stored column-wise (one list/array per field)
+
+    'flag' is one of normal, low, high, critical_low, critical_high or unknown
+    (no reference range in the report or the built-in table).
+    """
+
+    COLUMNS = ('analyte', 'name', 'value', 'unit', 'low', 'high', 'reference_source',
+               'normalized_value', 'normalized_unit', 'flag')
+
+    def __init__(self, columns, spans=()):
+        self.columns = columns
+        # Character spans of every matched row in the source text, repeats included
+        self.spans = list(spans)
+
+    def __len__(self):
+        return len(self.columns['analyte'])
+
+    def __getitem__(self, column):
+        return self.columns[column]
+
+    def rows(self):
+        """Rows as JSON-friendly dicts"""
+        rows = []
+        for index in range(len(self)):
+            row = {}
+            for column in self.COLUMNS:
+                value = self.columns[column][index]
+                if hasattr(value, 'item'):
+                    value = value.item()
+                if isinstance(value, float) and value != value:
+                    value = None
+                row[column] = value
+            row['reference'] = self._reference(index)
+            rows.append(row)
+        return rows
+
+    def _reference(self, index):
+        low, high = self.columns['low'][index], self.columns['high'][index]
+        low = None if low != low else float(low)
+        high = None if high != high else float(high)
+        if low is not None and high is not None:
+            return f"{_format_number(low)}-{_format_number(high)}"
+        if high is not None:
+            return f"< {_format_number(high)}"
+        if low is not None:
+            return f"> {_format_number(low)}"
+        return None
+
+    def _describe(self, index):
+        name = self.columns['name'][index]
+        value = f"{_format_number(float(self.columns['value'][index]))} {self.columns['unit'][index]}".strip()
+        reference = self._reference(index)
+        return name, value, reference
+
+    def abnormal_indices(self):
+        return [index for index, flag in enumerate(self.columns['flag']) if flag not in ('normal', 'unknown')]
+
+    def key_findings(self, include_normal=False, limit=None):
+        """
+        Findings for MedicalSummary.key_findings, abnormal values first
+
+        Args:
+            include_normal: Also list values within range
+            limit: Maximum number of findings
+
+        Returns:
+            List of strings such as "HbA1c 7.2 % (high, ref 4-5.6)"
+        """
+        order = self.abnormal_indices()
+        if include_normal:
+            order += [index for index in range(len(self)) if index not in order]
+        findings = []
+        for index in order:
+            name, value, reference = self._describe(index)
+            flag = self.columns['flag'][index].replace('critical_', 'critically ')
+            details = ', '.join(part for part in (flag, f"ref {reference}" if reference else None) if part)
+            findings.append(f"{name} {value} ({details})")
+        return findings[:limit] if limit else findings
+
+    def critical_warnings(self):
+        """Critical values, for MedicalSummary.critical_warnings"""
+        warnings = []
+        for index, flag in enumerate(self.columns['flag']):
+            if flag.startswith('critical_'):
+                name, value, reference = self._describe(index)
+                direction = flag.split('_', 1)[1]
+                warnings.append(f"{name} is critically {direction} at {value}"
+                                + (f" (reference {reference})" if reference else "")
+                                + "; contact your healthcare provider promptly")
+        return warnings
+
+    def prompt_text(self):
+        """Compact lab section for the LLM: abnormal values in full, normal ones by name only"""
+        abnormal = self.abnormal_indices()
+        lines = []
+        for index in abnormal:
+            name, value, reference = self._describe(index)
+            lines.append(f"{name} {value} {self.columns['flag'][index].upper()}" + (f" (ref {reference})" if reference else ""))
+        normal = [self.columns['name'][index] for index in range(len(self))
+                  if index not in abnormal and self.columns['flag'][index] == 'normal']
+        if normal:
+            lines.append("Within reference range: " + ', '.join(dict.fromkeys(normal)))
+        unknown = [index for index in range(len(self)) if self.columns['flag'][index] == 'unknown']
+        for index in unknown:
+            name, value, _ = self._describe(index)
+            lines.append(f"{name} {value}")
+        return '\n'.join(lines)
+
+class LabParser:
+    """Finds analyte/value/unit/range rows in report text and flags them against reference ranges"""
+
+    def __init__(self):
+        import numpy as np
+
+        self.np = np
+
+    def parse(self, text):
+        """
+        Parse lab results from report text (raw or cleaned)
+
+        Rows are collected in one regex pass; unit conversion and range flagging
+        then run on whole columns at once. A range printed in the report wins over
+        the built-in adult reference range; critical limits always come from the
+        built-in table. A value without a unit is only flagged against a range
+        printed in the report, and one followed by a dose unit or another word
+        ("Potassium 20 mEq PO daily") is not a result at all.
+
+        Args:
+            text: Report text
+
+        Returns:
+            LabResults (empty when nothing was found)
+        """
+        np = self.np
+        analytes, names, units, unit_keys = [], [], [], []
+        values, report_low, report_high, report_flags, unitless = [], [], [], [], []
+        seen = set()
+        spans = []
+
+        for match in _ROW.finditer(text or ''):
+            alias = ' '.join(match.group('name').lower().replace('-', ' ').split())
+            analyte = _ALIAS_TO_ANALYTE.get(alias) or _ALIAS_TO_ANALYTE.get(match.group('name').lower())
+            if analyte is None:
+                continue
+            spec = _ANALYTES[analyte]
+            value = _number(match.group('value'))
+            unit = match.group('unit') or ''
+            if not unit and spec[2] and _TRAILING_WORD.match(text, match.end()):
+                continue
+            unit_key = _unit_key(unit) if unit else spec[2]
+
+            low = _number(match.group('low'))
+            high = _number(match.group('high'))
+            if match.group('bound'):
+                bound = _number(match.group('bound'))
+                if match.group('bound_op')[0] in '<≤':
+                    high = bound
+                else:
+                    low = bound
+
+            convert = _NONLINEAR.get((analyte, unit_key))
+            if convert:
+                value, low, high = (convert(number) if number is not None else None for number in (value, low, high))
+                unit, unit_key = '%', spec[2]
+
+            spans.append(match.span())
+            key = (analyte, value, unit_key)
+            if key in seen:
+                # Same result printed again (e.g. on every page of the report)
+                continue
+            seen.add(key)
+
+            flag = (match.group('flag') or match.group('flag_after') or '').lower()
+            analytes.append(analyte)
+            names.append(' '.join(match.group('name').split()) if len(match.group('name')) > 4 else spec[0])
+            units.append(unit)
+            unit_keys.append(unit_key)
+            unitless.append(not unit and bool(spec[2]))
+            values.append(value)
+            report_low.append(np.nan if low is None else low)
+            report_high.append(np.nan if high is None else high)
+            report_flags.append(_FLAG_WORDS.get(flag, 'abnormal' if flag else ''))
+
+        value_array = np.array(values, dtype=np.float64)
+        low_array = np.array(report_low, dtype=np.float64)
+        high_array = np.array(report_high, dtype=np.float64)
+
+        # Factor from the reported unit to the canonical one (NaN when it cannot be converted)
+        factors = np.array([
+            1.0 if unit_key == _ANALYTES[analyte][2] else _ANALYTES[analyte][3].get(unit_key, np.nan)
+            for analyte, unit_key in zip(analytes, unit_keys)
+        ], dtype=np.float64)
+        default_low = np.array([_bound(_ANALYTES[analyte][4][0]) for analyte in analytes], dtype=np.float64)
+        default_high = np.array([_bound(_ANALYTES[analyte][4][1]) for analyte in analytes], dtype=np.float64)
+        unit_ranges = [_UNIT_RANGES.get((analyte, unit_key)) for analyte, unit_key in zip(analytes, unit_keys)]
+        has_unit_range = np.array([unit_range is not None for unit_range in unit_ranges], dtype=bool)
+        unit_low = np.array([_bound(unit_range[0]) if unit_range else np.nan for unit_range in unit_ranges], dtype=np.float64)
+        unit_high = np.array([_bound(unit_range[1]) if unit_range else np.nan for unit_range in unit_ranges], dtype=np.float64)
+        critical_low = np.array([_bound(_ANALYTES[analyte][5][0]) for analyte in analytes], dtype=np.float64)
+        critical_high = np.array([_bound(_ANALYTES[analyte][5][1]) for analyte in analytes], dtype=np.float64)
+
+        # A value printed without a unit may be in any unit: it is only compared with a
+        # range printed next to it, and never normalized or checked against critical limits
+        unitless_array = np.array(unitless, dtype=bool)
+        normalized = np.where(unitless_array, np.nan, value_array * factors)
+        has_report_range = ~(np.isnan(low_array) & np.isnan(high_array))
+        # Compare in the reported unit: report ranges as printed, then the unit's own
+        # default range, else the canonical default converted back and rounded as printed
+        default_low = np.where(has_unit_range, unit_low, _round_significant(np, default_low / factors))
+        default_high = np.where(has_unit_range, unit_high, _round_significant(np, default_high / factors))
+        default_low = np.where(unitless_array, np.nan, default_low)
+        default_high = np.where(unitless_array, np.nan, default_high)
+        low_array = np.where(has_report_range, low_array, default_low)
+        high_array = np.where(has_report_range, high_array, default_high)
+
+        with np.errstate(invalid='ignore'):
+            is_low = value_array < low_array
+            is_high = value_array > high_array
+            is_critical_low = normalized < critical_low
+            is_critical_high = normalized > critical_high
+        no_range = np.isnan(low_array) & np.isnan(high_array)
+        flags = np.select(
+            [is_critical_low, is_critical_high, is_low, is_high, no_range],
+            ['critical_low', 'critical_high', 'low', 'high', 'unknown'],
+            default='normal'
+        ).astype(object)
+
+        # Without any range, trust an H/L flag printed in the report (next to a unit)
+        for index in np.flatnonzero(no_range):
+            if report_flags[index] in ('high', 'low') and not unitless[index]:
+                flags[index] = report_flags[index]
+
+        reference_source = np.where(has_report_range, 'report', np.where(no_range, '', 'default')).astype(object)
+        return LabResults({
+            'analyte': analytes,
+            'name': names,
+            'value': value_array,
+            'unit': units,
+            'low': low_array,
+            'high': high_array,
+            'reference_source': [source or None for source in reference_source],
+            'normalized_value': normalized,
+            'normalized_unit': [_UNIT_DISPLAY.get(_ANALYTES[analyte][2], _ANALYTES[analyte][2]) for analyte in analytes],
+            'flag': [str(flag) for flag in flags]
+        }, spans)
+
+def _bound(value):
+    return float('nan') if value is None else value
+
+def _round_significant(np, values, digits=3):
+    """Round an array to significant digits (NaN and zero pass through)"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        magnitude = np.floor(np.log10(np.abs(values)))
+        scale = np.where(np.isfinite(magnitude), 10.0 ** (digits - 1 - magnitude), 1.0)
+        return np.round(values * scale) / scale
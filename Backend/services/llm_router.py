@@ -0,0 +1,201 @@
+"""
+LLM Router - Hedged requests and failover across LLM providers
+"""
+
+import time
+import threading
+import contextvars
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from config import Config
+from utils.deadline import DeadlineExceeded
+from utils.metrics import registry
+from services.llm_transport import shared_client
+
+llm_hedges_total = registry.counter(
+    'medisense_llm_hedges_total', 'Hedged LLM requests by outcome (sent, won, lost, skipped_budget)', ('primary', 'secondary', 'outcome')
+)
+llm_failovers_total = registry.counter(
+    'medisense_llm_failovers_total', 'LLM calls re-sent to a secondary provider after the primary failed', ('primary', 'secondary')
+)
+llm_hedge_delay = registry.gauge(
+    'medisense_llm_hedge_delay_seconds', 'Current hedge threshold (primary latency percentile)', ('provider',)
+)
+
+class ProviderStats:
+    """Rolling latency window and error counts for one provider"""
+
+    def __init__(self, window=None):
+        self.latencies = deque(maxlen=window or Config.LLM_STATS_WINDOW)
+        self.outcomes = deque(maxlen=window or Config.LLM_STATS_WINDOW)
+        self.calls = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def record(self, latency, ok):
+        with self._lock:
+            self.calls += 1
+            self.outcomes.append(ok)
+            if ok:
+                # Failed calls are often fast rejections and would drag the percentile down
+                self.latencies.append(latency)
+            else:
+                self.errors += 1
+
+    def percentile(self, fraction):
+        """Latency percentile (seconds) over the window, or None without enough samples"""
+        with self._lock:
+            ordered = sorted(self.latencies)
+        if len(ordered) < Config.LLM_HEDGE_MIN_SAMPLES:
+            return None
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    def error_rate(self):
+        with self._lock:
+            return (self.outcomes.count(False) / len(self.outcomes)) if self.outcomes else 0.0
+
+    def snapshot(self):
+        p50, p95 = self.percentile(0.50), self.percentile(0.95)
+        return {
+            'calls': self.calls,
+            'errors': self.errors,
+            'error_rate': round(self.error_rate(), 4),
+            'p50_ms': round(p50 * 1000, 2) if p50 is not None else None,
+            'p95_ms': round(p95 * 1000, 2) if p95 is not None else None
+        }
+
+_stats = {}
+_stats_lock = threading.Lock()
+
+def provider_stats(provider):
+    """Process-wide statistics for a provider (shared by every LLMService instance)"""
+    with _stats_lock:
+        if provider not in _stats:
+            _stats[provider] = ProviderStats()
+        return _stats[provider]
+
+def all_provider_stats():
+    with _stats_lock:
+        providers = list(_stats.items())
+    return {provider: stats.snapshot() for provider, stats in providers}
+
+def _executor():
+    return shared_client(('llm-hedge-pool',), lambda: ThreadPoolExecutor(
+        max_workers=Config.LLM_HEDGE_WORKERS, thread_name_prefix='llm-hedge'
+    ))
+
+class LLMRouter:
+    """
+    Send a prompt to the primary provider and hedge to secondaries when it is slow
+
+    If the primary has not answered within its p95 latency (LLM_HEDGE_PERCENTILE),
+    the same prompt goes to the next secondary and the first successful answer wins.
+    A primary that fails outright fails over to the secondaries in order. Hedges are
+    capped at LLM_HEDGE_BUDGET extra calls per primary call, so the extra provider
+    spend stays bounded.
+    """
+
+    def __init__(self, primary, secondaries):
+        """
+        Args:
+            primary: (provider name, callable(prompt, deadline) -> text)
+            secondaries: List of (provider name, callable) in preference order
+        """
+        self.primary = primary
+        self.secondaries = list(secondaries)
+        self.primary_calls = 0
+        self.hedges_sent = 0
+        self._lock = threading.Lock()
+
+    def hedge_delay(self):
+        """Seconds to wait for the primary before hedging"""
+        name = self.primary[0]
+        observed = provider_stats(name).percentile(Config.LLM_HEDGE_PERCENTILE)
+        delay = Config.LLM_HEDGE_DEFAULT_DELAY if observed is None else max(observed, Config.LLM_HEDGE_MIN_DELAY)
+        llm_hedge_delay.set(delay, provider=name)
+        return delay
+
+    def _take_hedge_budget(self):
+        with self._lock:
+            if self.hedges_sent + 1 > Config.LLM_HEDGE_BUDGET * self.primary_calls:
+                return False
+            self.hedges_sent += 1
+            return True
+
+    def _submit(self, target, prompt, deadline):
+        name, call = target
+        stats = provider_stats(name)
+
+        def run():
+            started = time.perf_counter()
+            try:
+                result = call(prompt, deadline)
+            except BaseException:
+                stats.record(time.perf_counter() - started, False)
+                raise
+            stats.record(time.perf_counter() - started, True)
+            return result
+
+        # Carry the request deadline and profile into the worker thread
+        context = contextvars.copy_context()
+        return _executor().submit(context.run, run)
+
+    def call(self, prompt, deadline=None):
+        """
+        Return the first successful response across providers
+
+        Raises:
+            DeadlineExceeded when time runs out, otherwise the primary's error when every provider fails
+        """
+        with self._lock:
+            self.primary_calls += 1
+
+        primary_name = self.primary[0]
+        pending = {self._submit(self.primary, prompt, deadline): primary_name}
+        remaining = list(self.secondaries)
+        errors = {}
+        hedged_to = None
+        hedge_at = time.monotonic() + self.hedge_delay() if Config.LLM_HEDGE_ENABLED and remaining else None
+
+        while pending:
+            timeout = None if hedge_at is None else max(0.0, hedge_at - time.monotonic())
+            if deadline is not None:
+                timeout = deadline.remaining() if timeout is None else min(timeout, deadline.remaining())
+            done, _ = wait(list(pending), timeout=timeout, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                name = pending.pop(future)
+                error = future.exception()
+                if error is None:
+                    if hedged_to is not None:
+                        # The slower request keeps running in the background; its answer is discarded
+                        llm_hedges_total.inc(primary=primary_name, secondary=hedged_to,
+                                             outcome='won' if name == hedged_to else 'lost')
+                    return future.result()
+                errors[name] = error
+                if not pending and remaining and not isinstance(error, DeadlineExceeded):
+                    # Everything in flight failed: fail over to the next provider now
+                    secondary = remaining.pop(0)
+                    llm_failovers_total.inc(primary=primary_name, secondary=secondary[0])
+                    pending[self._submit(secondary, prompt, deadline)] = secondary[0]
+                    hedge_at = None
+
+            if done:
+                continue
+            if deadline is not None and deadline.expired():
+                raise DeadlineExceeded(f"Deadline of {deadline.budget:.1f}s exceeded waiting for LLM providers")
+            if hedge_at is not None and time.monotonic() >= hedge_at:
+                hedge_at = None
+                secondary = remaining[0]
+                if not self._take_hedge_budget():
+                    llm_hedges_total.inc(primary=primary_name, secondary=secondary[0], outcome='skipped_budget')
+                    continue
+                remaining.pop(0)
+                hedged_to = secondary[0]
+                llm_hedges_total.inc(primary=primary_name, secondary=hedged_to, outcome='sent')
+                pending[self._submit(secondary, prompt, deadline)] = hedged_to
+
+        for error in errors.values():
+            if isinstance(error, DeadlineExceeded):
+                raise error
+        raise errors.get(primary_name) or next(iter(errors.values()))
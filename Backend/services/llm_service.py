@@ -4,15 +4,50 @@ LLM Service - Handles interactions with Large Language Models using LangChain
 
 import os
 import json
+import time
 from config import Config
+from utils.metrics import track_stage
+from utils.deadline import DeadlineExceeded, current_deadline
+from services.llm_transport import shared_client, http_client, http_timeout, call_with_retries
+from services.llm_router import LLMRouter
+from services.llm_transport import is_rate_limited, is_retryable, retry_after
+from services.rate_limiter import Overloaded, provider_limiter
+from services.circuit_breaker import CircuitOpen, provider_breaker
+from services.response_cache import ResponseCache, response_cache
+from services.degraded_responses import rule_based_summary, rule_based_symptom_analysis, degraded_responses_total
+from services.model_tiers import ModelTierPolicy, model_for, record_tier_call
+from utils.token_counter import TokenCounter
+from utils.usage import record_llm_usage
+
+# Errors that must not trigger another prompt: the fallback would either run past the
+# request deadline or add load to a provider that is already rejecting requests
+_NO_FALLBACK = (DeadlineExceeded, Overloaded)
 
 class LLMService:
-    """Service for LLM interactions using LangChain (Gemini, OpenAI, Groq)"""
+    """Service for LLM interactions using LangChain (Gemini, OpenAI, Groq, offline mock)"""
     
-    def __init__(self):
-        self.provider = Config.LLM_PROVIDER.lower()
+    def __init__(self, provider=None, fallbacks=True, tier='large', tiering=True):
+        """
+        Args:
+            provider: Provider name (defaults to LLM_PROVIDER)
+            fallbacks: Route through LLM_FALLBACK_PROVIDERS for hedging/failover
+            tier: Model tier this instance calls ('large' = <PROVIDER>_MODEL, 'small' = <PROVIDER>_SMALL_MODEL)
+            tiering: Build the small-tier sibling for short prompts (LLM_TIERING_ENABLED)
+        """
+        self.provider = (provider or Config.LLM_PROVIDER).lower()
+        self.tier = tier
+        self.model_name = None
         self.llm = None
+        # Whether llm.invoke() accepts a per-call timeout (OpenAI-compatible SDKs)
+        self.per_call_timeout = False
+        self.router = None
+        self.tiers = {tier: self}
+        self.tier_policy = None
         self._init_llm()
+        if fallbacks:
+            self._init_router()
+        if tiering and tier == 'large' and Config.LLM_TIERING_ENABLED:
+            self._init_tiers(fallbacks)
     
     def _init_llm(self):
         """Initialize LLM based on provider using LangChain"""
@@ -22,6 +57,8 @@ class LLMService:
             self._init_openai_langchain()
         elif self.provider == 'groq':
             self._init_groq_langchain()
+        elif self.provider == 'mock':
+            self._init_mock()
         else:
             raise ValueError(f"Unsupported LLM provider: {self.provider}")
     
@@ -30,8 +67,9 @@ class LLMService:
         if not Config.GEMINI_API_KEY:
             raise ValueError("GEMINI_API_KEY not found in environment variables")
         
-        # Use the model from config, or default to gemini-pro
-        model_name = Config.GEMINI_MODEL if Config.GEMINI_MODEL else "gemini-pro"
+        # Use the tier's model from config, or default to gemini-pro
+        model_name = model_for(self.provider, self.tier) or "gemini-pro"
+        self.model_name = model_name
         
         # Check if using newer model (2.0+, 2.5+, etc.) that might not work with langchain-google-genai
         use_direct_api = any(x in model_name.lower() for x in ['2.0', '2.5', '1.5-flash', '1.5-pro'])
@@ -41,7 +79,8 @@ class LLMService:
             try:
                 import google.generativeai as genai
                 genai.configure(api_key=Config.GEMINI_API_KEY)
-                self.model = genai.GenerativeModel(model_name)
+                # One gRPC channel per process, shared by every LLMService instance
+                self.model = shared_client(('gemini-direct', model_name), lambda: genai.GenerativeModel(model_name))
                 self.use_direct_api = True
                 self.genai = genai
                 print(f"Using direct Google Generative AI API for model: {model_name}")
@@ -56,11 +95,14 @@ class LLMService:
         if not use_direct_api:
             try:
                 from langchain_google_genai import ChatGoogleGenerativeAI
-                self.llm = ChatGoogleGenerativeAI(
+                # Retries are handled by call_with_retries so they respect the request deadline
+                self.llm = shared_client(('gemini', model_name), lambda: ChatGoogleGenerativeAI(
                     model=model_name,
                     google_api_key=Config.GEMINI_API_KEY,
-                    temperature=0.7
-                )
+                    temperature=0.7,
+                    timeout=Config.LLM_READ_TIMEOUT,
+                    max_retries=0
+                ))
                 self.use_direct_api = False
             except ImportError:
                 raise ImportError("langchain-google-genai is required. Install with: pip install langchain-google-genai")
@@ -70,7 +112,7 @@ class LLMService:
                 try:
                     import google.generativeai as genai
                     genai.configure(api_key=Config.GEMINI_API_KEY)
-                    self.model = genai.GenerativeModel(model_name)
+                    self.model = shared_client(('gemini-direct', model_name), lambda: genai.GenerativeModel(model_name))
                     self.use_direct_api = True
                     self.genai = genai
                     print(f"Using direct Google Generative AI API (fallback) for model: {model_name}")
@@ -85,11 +127,17 @@ class LLMService:
             if not Config.OPENAI_API_KEY:
                 raise ValueError("OPENAI_API_KEY not found in environment variables")
             
-            self.llm = ChatOpenAI(
-                model="gpt-3.5-turbo",
+            self.model_name = model_for(self.provider, self.tier) or "gpt-3.5-turbo"
+            # Pooled keep-alive connections; retries are handled by call_with_retries
+            self.llm = shared_client(('openai', self.model_name), lambda: ChatOpenAI(
+                model=self.model_name,
                 api_key=Config.OPENAI_API_KEY,
-                temperature=0.7
-            )
+                temperature=0.7,
+                timeout=http_timeout(),
+                max_retries=0,
+                http_client=http_client()
+            ))
+            self.per_call_timeout = True
         except ImportError:
             raise ImportError("langchain-openai is required. Install with: pip install langchain-openai")
     
@@ -101,39 +149,326 @@ class LLMService:
             if not Config.GROQ_API_KEY:
                 raise ValueError("GROQ_API_KEY not found in environment variables")
             
-            self.llm = ChatGroq(
-                model_name="llama-3.1-70b-versatile",
+            self.model_name = model_for(self.provider, self.tier) or "llama-3.1-70b-versatile"
+            # Pooled keep-alive connections; retries are handled by call_with_retries
+            self.llm = shared_client(('groq', self.model_name), lambda: ChatGroq(
+                model_name=self.model_name,
                 groq_api_key=Config.GROQ_API_KEY,
-                temperature=0.7
-            )
+                temperature=0.7,
+                timeout=http_timeout(),
+                max_retries=0,
+                http_client=http_client()
+            ))
+            self.per_call_timeout = True
         except ImportError:
             raise ImportError("langchain-groq is required. Install with: pip install langchain-groq")
     
-    def _call_llm_with_prompt(self, prompt):
-        """Call LLM with a prompt using LangChain or direct API"""
+    def _init_mock(self):
+        """Initialize the offline mock provider (load testing, no API key or network needed)"""
+        from services.mock_llm import MockLLM
+        
+        self.model_name = model_for(self.provider, self.tier) or Config.MOCK_LLM_MODEL
+        # Exposes generate_content() like the direct Gemini API, so the same prompt and parsing paths run
+        if self.tier == 'small':
+            # A smaller model answers sooner and streams faster
+            speedup = max(Config.MOCK_LLM_SMALL_SPEEDUP, 1e-6)
+            self.model = MockLLM(latency_ms=Config.MOCK_LLM_LATENCY_MS / speedup,
+                                 tokens_per_second=Config.MOCK_LLM_TOKENS_PER_SECOND * speedup)
+        else:
+            self.model = MockLLM()
+        self.use_direct_api = True
+        if self.tier != 'large':
+            return
+        print(f"Using mock LLM provider (latency ~{Config.MOCK_LLM_LATENCY_MS}ms, "
+              f"error rate {Config.MOCK_LLM_ERROR_RATE}, malformed rate {Config.MOCK_LLM_MALFORMED_RATE})")
+    
+    def _init_router(self):
+        """Set up hedging/failover to the secondary providers in LLM_FALLBACK_PROVIDERS"""
+        # Small-tier routes keep their own latency statistics, so fast small-model
+        # calls do not lower the large tier's hedge threshold
+        suffix = '' if self.tier == 'large' else f":{self.tier}"
+        secondaries = []
+        for name in Config.LLM_FALLBACK_PROVIDERS:
+            if name == self.provider:
+                continue
+            try:
+                secondary = LLMService(provider=name, fallbacks=False, tier=self.tier, tiering=False)
+                secondaries.append((secondary.provider + suffix, secondary._call_provider))
+            except Exception as e:
+                print(f"Warning: Fallback LLM provider '{name}' unavailable: {str(e)}")
+        if secondaries:
+            self.router = LLMRouter((self.provider + suffix, self._call_provider), secondaries)
+            print(f"LLM routing: primary {self.provider}, secondaries {', '.join(name for name, _ in secondaries)}")
+    
+    def _init_tiers(self, fallbacks):
+        """Add the small-model sibling that serves prompts under LLM_SMALL_TIER_MAX_TOKENS_*"""
+        small_model = model_for(self.provider, 'small')
+        if not small_model or small_model == self.model_name:
+            return
         try:
-            if hasattr(self, 'use_direct_api') and self.use_direct_api:
-                # Use direct Google Generative AI API
-                response = self.model.generate_content(prompt)
-                return response.text
+            self.tiers['small'] = LLMService(provider=self.provider, fallbacks=fallbacks, tier='small', tiering=False)
+        except Exception as e:
+            print(f"Warning: Small model tier '{small_model}' unavailable, using {self.model_name} for all requests: {str(e)}")
+            return
+        self.tier_policy = ModelTierPolicy()
+        print(f"LLM tiering: short prompts -> {small_model}, others -> {self.model_name}")
+    
+    def _metric_labels(self):
+        """Provider/model labels attached to pipeline metrics"""
+        return {'provider': self.provider, 'model': self.model_name or ''}
+    
+    def _call_llm_once(self, prompt, timeout, deadline=None):
+        """Single provider call bounded by timeout (seconds), inside the provider's rate/concurrency limits"""
+        limiter = provider_limiter(self.provider)
+        estimated_tokens = TokenCounter.estimate(prompt) + Config.LLM_EXPECTED_OUTPUT_TOKENS
+        with limiter.slot(estimated_tokens, deadline) as mark_rate_limited:
+            if deadline is not None:
+                # Time spent queueing for a slot comes out of this attempt
+                timeout = min(timeout, deadline.remaining())
+            try:
+                return self._invoke_provider(prompt, timeout)
+            except Exception as e:
+                if is_rate_limited(e):
+                    mark_rate_limited()
+                raise
+    
+    def _invoke_provider(self, prompt, timeout):
+        """Send the prompt to the provider SDK, accounting for its token usage"""
+        started = time.perf_counter()
+        try:
+            with track_stage('llm_call', **self._metric_labels()):
+                if hasattr(self, 'use_direct_api') and self.use_direct_api:
+                    # Use direct Google Generative AI API (or the mock, which mirrors it)
+                    if self.provider == 'mock':
+                        response = self.model.generate_content(prompt, timeout=timeout)
+                    else:
+                        response = self.model.generate_content(prompt, request_options={'timeout': timeout})
+                    text = response.text
+                else:
+                    # Use LangChain
+                    if not self.llm:
+                        raise ValueError("LLM not initialized")
+                    if self.per_call_timeout:
+                        response = self.llm.invoke(prompt, timeout=timeout)
+                    else:
+                        response = self.llm.invoke(prompt)
+                    # LangChain returns AIMessage object, extract content
+                    text = response.content if hasattr(response, 'content') else str(response)
+        except Exception:
+            record_llm_usage(self.provider, self.model_name or '', 0, 0, time.perf_counter() - started, False, ok=False)
+            raise
+        
+        latency = time.perf_counter() - started
+        reported = self._reported_usage(response)
+        prompt_tokens, completion_tokens = reported or (TokenCounter.estimate(prompt), TokenCounter.estimate(text))
+        record_llm_usage(self.provider, self.model_name or '', prompt_tokens, completion_tokens,
+                         latency, reported=reported is not None)
+        return text
+    
+    @staticmethod
+    def _reported_usage(response):
+        """(prompt_tokens, completion_tokens) reported by the provider, or None"""
+        # Gemini (and the mock): usage_metadata with prompt/candidates token counts
+        metadata = getattr(response, 'usage_metadata', None)
+        if metadata is not None and hasattr(metadata, 'prompt_token_count'):
+            return int(metadata.prompt_token_count or 0), int(getattr(metadata, 'candidates_token_count', 0) or 0)
+        # LangChain AIMessage (langchain-core 0.2+): usage_metadata dict
+        if isinstance(metadata, dict) and 'input_tokens' in metadata:
+            return int(metadata['input_tokens'] or 0), int(metadata.get('output_tokens') or 0)
+        # Older LangChain OpenAI/Groq messages: response_metadata['token_usage']
+        token_usage = (getattr(response, 'response_metadata', None) or {}).get('token_usage') or {}
+        if 'prompt_tokens' in token_usage:
+            return int(token_usage['prompt_tokens'] or 0), int(token_usage.get('completion_tokens') or 0)
+        return None
+    
+    def _call_provider(self, prompt, deadline=None):
+        """
+        Call this instance's provider with timeouts and retries (errors are not wrapped)
+        
+        Raises:
+            CircuitOpen: The provider's circuit breaker is open
+            Overloaded: Shed by the local limiter, or still rate limited after retries
+        """
+        breaker = provider_breaker(self.provider)
+        probe = breaker.allow()
+        try:
+            result = call_with_retries(
+                lambda timeout: self._call_llm_once(prompt, timeout, deadline),
+                deadline=deadline,
+                labels=self._metric_labels()
+            )
+        except Exception as e:
+            if self._provider_down(e):
+                breaker.record_failure(probe)
+            elif isinstance(e, Overloaded):
+                # Shed locally: the provider was never asked
+                breaker.release(probe)
             else:
-                # Use LangChain
-                if not self.llm:
-                    raise ValueError("LLM not initialized")
-                response = self.llm.invoke(prompt)
-                # LangChain returns AIMessage object, extract content
-                if hasattr(response, 'content'):
-                    return response.content
-                return str(response)
+                # The provider answered (e.g. bad request, rate limit), so it is up
+                breaker.record_success(probe)
+            if not isinstance(e, Overloaded) and is_rate_limited(e):
+                hint = retry_after(e) or provider_limiter(self.provider).concurrency.retry_after()
+                raise Overloaded(f"LLM provider '{self.provider}' is rate limiting requests", hint) from e
+            raise
+        breaker.record_success(probe)
+        return result
+    
+    @staticmethod
+    def _provider_down(error):
+        """Whether an error counts against the provider's circuit breaker"""
+        if isinstance(error, DeadlineExceeded):
+            # Only deadlines that ran out during a provider call (chained to its error),
+            # not requests that arrived with no time left
+            return error.__cause__ is not None
+        if isinstance(error, Overloaded) or is_rate_limited(error):
+            return False
+        return is_retryable(error)
+    
+    def _call_llm_with_prompt(self, prompt, deadline=None, task=None):
+        """
+        Call LLM with a prompt using LangChain or direct API
+        
+        Transient provider errors are retried with jittered exponential backoff,
+        and every attempt is bounded by the request deadline. With fallback
+        providers configured, slow calls are hedged and failed calls fail over.
+        With model tiering on, short prompts for a known task go to the small model.
+        
+        Args:
+            prompt: Prompt text
+            deadline: Deadline for this call (defaults to the current request's)
+            task: Task type ('summary', 'symptoms') used to pick the model tier
+        """
+        deadline = deadline or current_deadline()
+        input_tokens = TokenCounter.estimate(prompt)
+        tier = self.tier_policy.choose(task, input_tokens) if self.tier_policy is not None else self.tier
+        target = self.tiers.get(tier, self)
+        started = time.perf_counter()
+        try:
+            if target.router is not None:
+                # Hedge to / fail over to secondary providers
+                response = target.router.call(prompt, deadline)
+            else:
+                response = target._call_provider(prompt, deadline)
+        except _NO_FALLBACK:
+            record_tier_call(task, target.tier, target.model_name, time.perf_counter() - started, input_tokens, ok=False)
+            raise
         except Exception as e:
+            record_tier_call(task, target.tier, target.model_name, time.perf_counter() - started, input_tokens, ok=False)
             raise Exception(f"LLM call failed: {str(e)}")
+        record_tier_call(task, target.tier, target.model_name, time.perf_counter() - started,
+                         input_tokens, TokenCounter.estimate(response))
+        return response
+    
+    def _parse_json_response(self, response):
+        """Strip Markdown code fences from an LLM response and parse it as JSON"""
+        with track_stage('json_parse', **self._metric_labels()):
+            response = response.strip()
+            if response.startswith('```json'):
+                response = response[7:]
+            if response.startswith('```'):
+                response = response[3:]
+            if response.endswith('```'):
+                response = response[:-3]
+            response = response.strip()
+            return json.loads(response)
+    
+    def _parse_with(self, parser, response):
+        """Run a LangChain output parser, recording it as the JSON parsing stage"""
+        with track_stage('json_parse', **self._metric_labels()):
+            return parser.parse(response)
+    
+    def _build_chain(self, prompt_template, parser, task=None):
+        """
+        Compose prompt -> LLM -> parser with the model step routed through
+        _call_llm_with_prompt so every provider call is instrumented (and tiered) the same way
+        """
+        try:
+            from langchain_core.runnables import RunnableLambda
+        except ImportError:
+            from langchain.schema.runnable import RunnableLambda
+        
+        call_llm = RunnableLambda(lambda prompt_value: self._call_llm_with_prompt(prompt_value.to_string(), task=task))
+        parse = RunnableLambda(lambda response: self._parse_with(parser, response))
+        return prompt_template | call_llm | parse
+    
+    def _degraded_response(self, kind, cache_key, build):
+        """Answer without the LLM: the last cached answer for the same input, else local rules"""
+        result = response_cache.get(cache_key)
+        source = 'cache'
+        if result is None:
+            result = build()
+            source = 'rules'
+        degraded_responses_total.inc(kind=kind, source=source)
+        result.update({'degraded': True, 'degraded_source': source})
+        return result
+    
+    def summarize_medical_report(self, text, medications=None, lab_results=None, previous_summary=None):
+        """
+        Generate patient-friendly and doctor-focused summaries
+        
+        While every provider's circuit is open the answer comes from the response
+        cache or a rule-based extract, flagged with degraded: true.
+        
+        Args:
+            text: Medical report text, or only what changed when previous_summary is given
+            medications: Medications already extracted locally; the LLM gets them as
+                         a draft to confirm and complete, and they are returned
+                         as-is only when the LLM is unavailable
+            lab_results: LabResults parsed locally; abnormal values lead key_findings
+                         and critical values lead critical_warnings
+            previous_summary: Summary of the patient's previous report; the LLM
+                              updates it with the changes in text instead of
+                              summarizing from scratch
+            
+        Returns:
+            Dictionary with summaries and key information
+        """
+        has_labs = lab_results is not None and len(lab_results) > 0
+        cache_parts = [json.dumps(previous_summary, sort_keys=True)] if previous_summary else []
+        cache_key = ResponseCache.key('summary', text, *(medications or ()), *cache_parts)
+        try:
+            result = self._summarize_medical_report(text, medications, has_labs, previous_summary)
+        except CircuitOpen:
+            if not previous_summary:
+                return self._degraded_response('summary', cache_key, lambda: rule_based_summary(text))
+            # The previous summary, refreshed below with this report's local extracts
+            degraded_responses_total.inc(kind='summary', source='previous')
+            result = dict(previous_summary, degraded=True, degraded_source='previous')
+        if medications and (result.get('degraded') or 'medications' not in result):
+            result['medications'] = list(medications)
+            result['medications_source'] = 'extractor'
+        else:
+            result['medications_source'] = 'extractor+llm' if medications else 'llm'
+        if has_labs:
+            result['key_findings'] = self._merge_items(lab_results.key_findings(), result.get('key_findings'))
+            result['critical_warnings'] = self._merge_items(lab_results.critical_warnings(), result.get('critical_warnings'))
+        # Placeholders from an unparseable LLM answer are not cached, so the next request retries
+        if not result.get('degraded') and not result.get('parse_failed'):
+            response_cache.put(cache_key, result)
+        return result
     
-    def summarize_medical_report(self, text):
+    @staticmethod
+    def _merge_items(local, generated):
+        """Local items first, then generated ones not already present (case-insensitive)"""
+        merged = list(local)
+        seen = {item.lower() for item in merged}
+        for item in generated or []:
+            if item.lower() not in seen:
+                seen.add(item.lower())
+                merged.append(item)
+        return merged
+    
+    def _summarize_medical_report(self, text, medications=None, has_labs=False, previous_summary=None):
         """
         Generate patient-friendly and doctor-focused summaries using LangChain
         
         Args:
-            text: Medical report text
+            text: Medical report text (or the changes since the previous report)
+            medications: Locally extracted medications, given to the LLM to confirm and complete
+            has_labs: Lab values were already flagged locally
+            previous_summary: Summary to update instead of starting from scratch; errors
+                              are raised instead of falling back, so the caller can
+                              summarize the whole report
             
         Returns:
             Dictionary with summaries and key information
@@ -153,56 +488,86 @@ class LLMService:
             from typing import List
             
             # Define output structure
-            class MedicalSummary(BaseModel):
+            class ReportSummary(BaseModel):
                 patient_summary: str = Field(description="Clear, simple explanation in plain language for patients (2-3 paragraphs)")
                 doctor_summary: str = Field(description="Technical summary for healthcare professionals with medical terminology (2-3 paragraphs)")
                 key_findings: List[str] = Field(description="List of key medical findings")
-                medications: List[str] = Field(description="List of medications with dosages")
                 critical_warnings: List[str] = Field(description="List of critical warnings or alerts")
                 follow_up: str = Field(description="Follow-up recommendations")
             
-            # Create output parser
-            parser = PydanticOutputParser(pydantic_object=MedicalSummary)
+            class MedicalSummary(ReportSummary):
+                medications: List[str] = Field(description="List of medications with dosages")
+            
+            # Locally extracted medications are a draft the LLM checks (negations, combinations,
+            # names it missed); lab flags are context only and not repeated
+            summary_model = MedicalSummary
+            known_facts = ""
+            if medications:
+                known_facts += ("\n\nMedications found in the report by a keyword extractor (may be incomplete or wrong): "
+                                + "; ".join(medications) + ". In medications, list only drugs the patient is currently "
+                                "taking: keep correct entries, remove denied, stopped or misread ones, and add any missing.")
+            if has_labs:
+                known_facts += ("\n\nLab values were checked against reference ranges and abnormal ones are "
+                                "already listed for the user; use key_findings for other findings.")
+            
+            # Create output parser and its schema instructions
+            with track_stage('prompt_build', **self._metric_labels()):
+                parser = PydanticOutputParser(pydantic_object=summary_model)
+                format_instructions = parser.get_format_instructions()
             
             # Create prompt template
-            prompt_template = PromptTemplate(
-                input_variables=["text"],
-                template="""You are a medical AI assistant. Analyze the following medical report and provide a comprehensive summary.
+            if previous_summary:
+                fields = getattr(summary_model, 'model_fields', None) or summary_model.__fields__
+                previous = {name: value for name, value in previous_summary.items() if name in fields}
+                prompt_template = PromptTemplate(
+                    input_variables=["text"],
+                    template="""You are a medical AI assistant. This patient's previous medical report was already summarized. Update that summary with the changes found in their new report.
+
+Previous Summary:
+{previous}
+
+Changes in the new report:
+{text}{known_facts}
+
+{format_instructions}
+
+Keep everything in the previous summary that the changes do not affect. Revise findings, warnings and follow-up where the changes require it, and mention notable changes (for example values that improved or worsened) in both summaries. For patient_summary, use simple language that non-medical professionals can understand. For doctor_summary, use proper medical terminology and technical details.""",
+                    partial_variables={"format_instructions": format_instructions, "known_facts": known_facts,
+                                       "previous": json.dumps(previous, indent=1)}
+                )
+            else:
+                prompt_template = PromptTemplate(
+                    input_variables=["text"],
+                    template="""You are a medical AI assistant. Analyze the following medical report and provide a comprehensive summary.
 
 Medical Report:
-{text}
+{text}{known_facts}
 
 {format_instructions}
 
 Provide detailed, accurate, and helpful summaries. For patient_summary, use simple language that non-medical professionals can understand. For doctor_summary, use proper medical terminology and technical details.""",
-                partial_variables={"format_instructions": parser.get_format_instructions()}
-            )
+                    partial_variables={"format_instructions": format_instructions, "known_facts": known_facts}
+                )
             
             # Check if using direct API (for newer models)
             if hasattr(self, 'use_direct_api') and self.use_direct_api:
                 # Use direct API - format prompt and call directly
-                formatted_prompt = prompt_template.format(text=text)
-                formatted_prompt += f"\n\n{parser.get_format_instructions()}"
-                llm_response = self._call_llm_with_prompt(formatted_prompt)
+                with track_stage('prompt_build', **self._metric_labels()):
+                    formatted_prompt = prompt_template.format(text=text)
+                    formatted_prompt += f"\n\n{format_instructions}"
+                llm_response = self._call_llm_with_prompt(formatted_prompt, task='summary')
                 # Parse JSON from response
-                import json
-                llm_response = llm_response.strip()
-                if llm_response.startswith('```json'):
-                    llm_response = llm_response[7:]
-                if llm_response.startswith('```'):
-                    llm_response = llm_response[3:]
-                if llm_response.endswith('```'):
-                    llm_response = llm_response[:-3]
-                llm_response = llm_response.strip()
-                result_dict = json.loads(llm_response)
+                result_dict = self._parse_json_response(llm_response)
                 # Convert to Pydantic model for consistency
-                result = MedicalSummary(**result_dict)
+                result = summary_model(**result_dict)
             else:
                 # Use LangChain pattern
                 try:
                     # Try new pattern first (LangChain 0.2.x) - using pipe operator
-                    chain = prompt_template | self.llm | parser
+                    chain = self._build_chain(prompt_template, parser, task='summary')
                     result = chain.invoke({"text": text})
+                except _NO_FALLBACK:
+                    raise
                 except (TypeError, AttributeError, Exception) as e:
                     # Fallback: use LLMChain with invoke method
                     try:
@@ -211,14 +576,16 @@ Provide detailed, accurate, and helpful summaries. For patient_summary, use simp
                             result = chain.invoke({"text": text})
                         else:
                             result = chain.run(text=text)
+                    except _NO_FALLBACK:
+                        raise
                     except Exception:
                         # Last resort: call LLM directly and parse manually
                         formatted_prompt = prompt_template.format(text=text)
-                        llm_response = self._call_llm_with_prompt(formatted_prompt)
-                        result = parser.parse(llm_response)
+                        llm_response = self._call_llm_with_prompt(formatted_prompt, task='summary')
+                        result = self._parse_with(parser, llm_response)
             
             # Convert Pydantic model to dict
-            if isinstance(result, MedicalSummary):
+            if isinstance(result, ReportSummary):
                 # Pydantic v2 uses model_dump() instead of dict()
                 if hasattr(result, 'model_dump'):
                     return result.model_dump()
@@ -227,9 +594,17 @@ Provide detailed, accurate, and helpful summaries. For patient_summary, use simp
             return result
             
         except ImportError as e:
+            if previous_summary:
+                raise
             # Fallback to JSON-based approach if Pydantic not available
             return self._summarize_with_json(text)
+        except _NO_FALLBACK:
+            # No time left, or the provider is shedding load: skip the fallback prompt
+            raise
         except Exception as e:
+            if previous_summary:
+                # The fallback prompt only handles whole reports; the caller retries with one
+                raise
             # Fallback on any error
             print(f"LangChain summarization failed, using fallback: {str(e)}")
             return self._summarize_with_json(text)
@@ -254,20 +629,10 @@ Please provide a JSON response with the following structure:
 Only return valid JSON, no additional text."""
         
         try:
-            response = self._call_llm_with_prompt(prompt)
+            response = self._call_llm_with_prompt(prompt, task='summary')
             
             # Parse JSON response
-            response = response.strip()
-            if response.startswith('```json'):
-                response = response[7:]
-            if response.startswith('```'):
-                response = response[3:]
-            if response.endswith('```'):
-                response = response[:-3]
-            response = response.strip()
-            
-            result = json.loads(response)
-            return result
+            return self._parse_json_response(response)
             
         except json.JSONDecodeError:
             # Fallback if JSON parsing fails
@@ -277,12 +642,38 @@ Only return valid JSON, no additional text."""
                 "key_findings": ["Report analysis in progress"],
                 "medications": [],
                 "critical_warnings": [],
-                "follow_up": "Consult with healthcare provider"
+                "follow_up": "Consult with healthcare provider",
+                "parse_failed": True
             }
+        except _NO_FALLBACK:
+            raise
         except Exception as e:
             raise Exception(f"LLM summarization failed: {str(e)}")
     
     def analyze_symptoms(self, symptoms, context=""):
+        """
+        Analyze symptoms and provide possible conditions
+        
+        While every provider's circuit is open the answer comes from the response
+        cache or rule-based triage, flagged with degraded: true.
+        
+        Args:
+            symptoms: User's symptom description
+            context: Retrieved medical context from RAG
+            
+        Returns:
+            Dictionary with analysis results
+        """
+        cache_key = ResponseCache.key('symptoms', symptoms, context)
+        try:
+            result = self._analyze_symptoms(symptoms, context)
+        except CircuitOpen:
+            return self._degraded_response('symptoms', cache_key, lambda: rule_based_symptom_analysis(symptoms, context))
+        if not result.get('parse_failed'):
+            response_cache.put(cache_key, result)
+        return result
+    
+    def _analyze_symptoms(self, symptoms, context=""):
         """
         Analyze symptoms and provide possible conditions using LangChain
         
@@ -321,8 +712,10 @@ Only return valid JSON, no additional text."""
                 citations: List[str] = Field(description="List of source citations")
                 seek_immediate_care_if: List[str] = Field(description="Red flag symptoms requiring immediate care")
             
-            # Create output parser
-            parser = PydanticOutputParser(pydantic_object=SymptomAnalysis)
+            # Create output parser and its schema instructions
+            with track_stage('prompt_build', **self._metric_labels()):
+                parser = PydanticOutputParser(pydantic_object=SymptomAnalysis)
+                format_instructions = parser.get_format_instructions()
             
             # Build context text
             context_text = f"\n\nRelevant Medical Information:\n{context}" if context else ""
@@ -337,34 +730,28 @@ Symptoms: {symptoms}{context}
 {format_instructions}
 
 Provide accurate, helpful analysis based on medical knowledge. Include possible conditions with probability assessments, urgency level, and clear recommendations.""",
-                partial_variables={"format_instructions": parser.get_format_instructions()}
+                partial_variables={"format_instructions": format_instructions}
             )
             
             # Check if using direct API (for newer models)
             if hasattr(self, 'use_direct_api') and self.use_direct_api:
                 # Use direct API - format prompt and call directly
-                formatted_prompt = prompt_template.format(symptoms=symptoms, context=context_text)
-                formatted_prompt += f"\n\n{parser.get_format_instructions()}"
-                llm_response = self._call_llm_with_prompt(formatted_prompt)
+                with track_stage('prompt_build', **self._metric_labels()):
+                    formatted_prompt = prompt_template.format(symptoms=symptoms, context=context_text)
+                    formatted_prompt += f"\n\n{format_instructions}"
+                llm_response = self._call_llm_with_prompt(formatted_prompt, task='symptoms')
                 # Parse JSON from response
-                import json
-                llm_response = llm_response.strip()
-                if llm_response.startswith('```json'):
-                    llm_response = llm_response[7:]
-                if llm_response.startswith('```'):
-                    llm_response = llm_response[3:]
-                if llm_response.endswith('```'):
-                    llm_response = llm_response[:-3]
-                llm_response = llm_response.strip()
-                result_dict = json.loads(llm_response)
+                result_dict = self._parse_json_response(llm_response)
                 # Convert to Pydantic model for consistency
                 result = SymptomAnalysis(**result_dict)
             else:
                 # Use LangChain pattern
                 try:
                     # Try new pattern first (LangChain 0.2.x) - using pipe operator
-                    chain = prompt_template | self.llm | parser
+                    chain = self._build_chain(prompt_template, parser, task='symptoms')
                     result = chain.invoke({"symptoms": symptoms, "context": context_text})
+                except _NO_FALLBACK:
+                    raise
                 except (TypeError, AttributeError, Exception) as e:
                     # Fallback: use LLMChain with invoke method
                     try:
@@ -373,11 +760,13 @@ Provide accurate, helpful analysis based on medical knowledge. Include possible
                             result = chain.invoke({"symptoms": symptoms, "context": context_text})
                         else:
                             result = chain.run(symptoms=symptoms, context=context_text)
+                    except _NO_FALLBACK:
+                        raise
                     except Exception:
                         # Last resort: call LLM directly and parse manually
                         formatted_prompt = prompt_template.format(symptoms=symptoms, context=context_text)
-                        llm_response = self._call_llm_with_prompt(formatted_prompt)
-                        result = parser.parse(llm_response)
+                        llm_response = self._call_llm_with_prompt(formatted_prompt, task='symptoms')
+                        result = self._parse_with(parser, llm_response)
             
             # Convert Pydantic model to dict
             if isinstance(result, SymptomAnalysis):
@@ -391,6 +780,9 @@ Provide accurate, helpful analysis based on medical knowledge. Include possible
         except ImportError:
             # Fallback to JSON-based approach
             return self._analyze_symptoms_with_json(symptoms, context)
+        except _NO_FALLBACK:
+            # No time left, or the provider is shedding load: skip the fallback prompt
+            raise
         except Exception as e:
             # Fallback on any error
             print(f"LangChain symptom analysis failed, using fallback: {str(e)}")
@@ -423,20 +815,10 @@ Please provide a JSON response with the following structure:
 Only return valid JSON, no additional text."""
         
         try:
-            response = self._call_llm_with_prompt(prompt)
+            response = self._call_llm_with_prompt(prompt, task='symptoms')
             
             # Parse JSON response
-            response = response.strip()
-            if response.startswith('```json'):
-                response = response[7:]
-            if response.startswith('```'):
-                response = response[3:]
-            if response.endswith('```'):
-                response = response[:-3]
-            response = response.strip()
-            
-            result = json.loads(response)
-            return result
+            return self._parse_json_response(response)
             
         except json.JSONDecodeError:
             # Fallback if JSON parsing fails
@@ -452,7 +834,10 @@ Only return valid JSON, no additional text."""
                 "explanation": "Symptom analysis is being processed. Please consult with a healthcare professional for accurate diagnosis.",
                 "recommendations": ["Consult with healthcare provider", "Monitor symptoms"],
                 "citations": [],
-                "seek_immediate_care_if": ["Severe pain", "Difficulty breathing", "Loss of consciousness"]
+                "seek_immediate_care_if": ["Severe pain", "Difficulty breathing", "Loss of consciousness"],
+                "parse_failed": True
             }
+        except _NO_FALLBACK:
+            raise
         except Exception as e:
             raise Exception(f"LLM symptom analysis failed: {str(e)}")
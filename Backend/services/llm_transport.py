@@ -0,0 +1,185 @@
+"""
+LLM Transport - Shared keep-alive provider clients, per-call timeouts and retry policy
+"""
+
+import os
+import re
+import time
+import random
+import threading
+from config import Config
+from utils.deadline import DeadlineExceeded
+from utils.metrics import registry
+
+# HTTP statuses worth retrying: timeouts, rate limits, transient server errors
+RETRYABLE_STATUS = {408, 409, 425, 429, 500, 502, 503, 504}
+
+# Exception class names (httpx, openai, groq, google.api_core, grpc, mock) that signal transient failures
+_RETRYABLE_NAMES = (
+    'Timeout', 'TimedOut', 'ConnectError', 'ConnectionError', 'APIConnectionError', 'RemoteProtocolError',
+    'RateLimitError', 'TooManyRequests', 'ResourceExhausted', 'ServiceUnavailable', 'InternalServerError',
+    'BadGateway', 'GatewayTimeout', 'DeadlineExceeded'
+)
+_STATUS_IN_MESSAGE = re.compile(r'\b(408|429|500|502|503|504)\b')
+
+llm_retries_total = registry.counter(
+    'medisense_llm_retries_total', 'LLM provider calls retried after a transient error', ('provider', 'model', 'reason')
+)
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+def shared_client(key, factory):
+    """
+    Return the process-wide client for key, building it on first use
+
+    Clients are keyed by process id as well, so a worker forked from a preloaded
+    master never reuses the parent's sockets.
+
+    Args:
+        key: Hashable identity (provider, model, ...)
+        factory: Zero-argument callable building the client
+    """
+    key = (os.getpid(),) + tuple(key)
+    client = _clients.get(key)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(key)
+            if client is None:
+                client = _clients[key] = factory()
+    return client
+
+def http_timeout():
+    """Connect/read timeouts for provider HTTP clients (httpx.Timeout when httpx is installed)"""
+    try:
+        import httpx
+        return httpx.Timeout(Config.LLM_READ_TIMEOUT, connect=Config.LLM_CONNECT_TIMEOUT)
+    except ImportError:
+        return Config.LLM_READ_TIMEOUT
+
+def http_client():
+    """
+    Pooled keep-alive httpx client shared by the OpenAI-compatible SDKs in this process
+
+    Returns:
+        httpx.Client, or None when httpx is not installed (SDK defaults are used)
+    """
+    try:
+        import httpx
+    except ImportError:
+        return None
+
+    def build():
+        return httpx.Client(
+            timeout=http_timeout(),
+            limits=httpx.Limits(
+                max_connections=Config.LLM_POOL_MAX_CONNECTIONS,
+                max_keepalive_connections=Config.LLM_POOL_MAX_KEEPALIVE,
+                keepalive_expiry=Config.LLM_KEEPALIVE_EXPIRY
+            )
+        )
+    return shared_client(('httpx',), build)
+
+def _status_code(error):
+    for candidate in (error, getattr(error, 'response', None)):
+        for attribute in ('status_code', 'code', 'status'):
+            value = getattr(candidate, attribute, None)
+            if isinstance(value, int):
+                return value
+    return None
+
+def is_retryable(error):
+    """
+    Whether a provider error is transient (timeout, connection, 429, 5xx)
+
+    Client errors such as bad requests, authentication or schema problems are
+    not retried: repeating them only burns the request deadline.
+    """
+    if isinstance(error, (DeadlineExceeded, ValueError, ImportError)):
+        return False
+    status = _status_code(error)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    for cls in type(error).__mro__:
+        if any(name in cls.__name__ for name in _RETRYABLE_NAMES):
+            return True
+    return bool(_STATUS_IN_MESSAGE.search(str(error)))
+
+def is_rate_limited(error):
+    """Whether a provider error is a rate-limit / quota rejection (HTTP 429)"""
+    if _status_code(error) == 429:
+        return True
+    for cls in type(error).__mro__:
+        if any(name in cls.__name__ for name in ('RateLimit', 'TooManyRequests', 'ResourceExhausted')):
+            return True
+    return bool(re.search(r'\b429\b', str(error)))
+
+def retry_after(error):
+    """Retry-After hint in seconds from an HTTP error response, if any"""
+    headers = getattr(getattr(error, 'response', None), 'headers', None)
+    if not headers:
+        return None
+    try:
+        return float(headers.get('retry-after'))
+    except (TypeError, ValueError):
+        return None
+
+def backoff_delay(attempt, base=None, cap=None, rng=random):
+    """
+    Exponential backoff with full jitter: uniform(0, min(cap, base * 2^attempt))
+
+    Args:
+        attempt: Zero-based retry number
+    """
+    base = Config.LLM_RETRY_BASE_DELAY if base is None else base
+    cap = Config.LLM_RETRY_MAX_DELAY if cap is None else cap
+    return rng.uniform(0, min(cap, base * (2 ** attempt)))
+
+def call_with_retries(call, deadline=None, max_retries=None, labels=None, sleep=time.sleep):
+    """
+    Invoke a provider call with a per-attempt timeout and jittered retries
+
+    Args:
+        call: Callable taking the timeout (seconds) for this attempt
+        deadline: Optional utils.deadline.Deadline bounding all attempts and waits
+        max_retries: Retries after the first attempt (default LLM_MAX_RETRIES)
+        labels: provider/model labels for the retry counter
+
+    Returns:
+        Whatever call returns
+
+    Raises:
+        DeadlineExceeded: No time left for another attempt
+    """
+    max_retries = Config.LLM_MAX_RETRIES if max_retries is None else max_retries
+    labels = labels or {}
+    attempt = 0
+    while True:
+        timeout = Config.LLM_READ_TIMEOUT
+        if deadline is not None:
+            deadline.check('LLM call')
+            timeout = min(timeout, deadline.remaining())
+        try:
+            return call(timeout)
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            if deadline is not None and deadline.expired():
+                # The attempt consumed the rest of the budget; callers must not start fallbacks
+                raise DeadlineExceeded(f"Deadline of {deadline.budget:.1f}s exceeded during LLM call: {str(e)}") from e
+            if attempt >= max_retries or not is_retryable(e):
+                raise
+            delay = backoff_delay(attempt)
+            hint = retry_after(e)
+            if hint is not None:
+                delay = min(max(delay, hint), Config.LLM_RETRY_MAX_DELAY)
+            if deadline is not None and deadline.remaining() <= delay:
+                # Waiting would leave no time for the retry itself
+                raise
+            llm_retries_total.inc(reason=type(e).__name__, **labels)
+            print(f"Retrying LLM call after {type(e).__name__} (attempt {attempt + 1}/{max_retries}, "
+                  f"waiting {delay:.2f}s): {str(e)[:200]}")
+            sleep(delay)
+            attempt += 1
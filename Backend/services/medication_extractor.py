@@ -0,0 +1,356 @@
+"""
+Medication Extractor - Finds drugs, doses and frequencies in report text without an LLM
+"""
+
+import re
+import os
+from config import Config
+from utils.patterns import trie_pattern
+
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
+# Generic names (lower-case). Multi-word names are matched with any whitespace, hyphen or slash between words.
+_GENERICS = (
+    'acetaminophen', 'paracetamol', 'ibuprofen', 'naproxen', 'diclofenac', 'celecoxib', 'aspirin', 'tramadol',
+    'codeine', 'morphine', 'oxycodone', 'hydrocodone', 'fentanyl', 'buprenorphine', 'methadone', 'ketorolac',
+    'metformin', 'glipizide', 'glyburide', 'glimepiride', 'gliclazide', 'sitagliptin', 'linagliptin',
+    'saxagliptin', 'empagliflozin', 'dapagliflozin', 'canagliflozin', 'pioglitazone', 'liraglutide',
+    'semaglutide', 'dulaglutide', 'exenatide', 'insulin', 'insulin glargine', 'insulin lispro', 'insulin aspart',
+    'insulin detemir', 'insulin degludec', 'nph insulin', 'regular insulin',
+    'lisinopril', 'enalapril', 'ramipril', 'captopril', 'perindopril', 'benazepril', 'losartan', 'valsartan',
+    'irbesartan', 'candesartan', 'telmisartan', 'olmesartan', 'amlodipine', 'nifedipine', 'diltiazem',
+    'verapamil', 'metoprolol', 'atenolol', 'bisoprolol', 'carvedilol', 'propranolol', 'labetalol', 'nebivolol',
+    'hydrochlorothiazide', 'chlorthalidone', 'indapamide', 'furosemide', 'torsemide', 'bumetanide',
+    'spironolactone', 'eplerenone', 'hydralazine', 'clonidine', 'doxazosin', 'prazosin', 'isosorbide mononitrate',
+    'isosorbide dinitrate', 'nitroglycerin', 'digoxin', 'amiodarone', 'sacubitril valsartan', 'ivabradine',
+    'atorvastatin', 'rosuvastatin', 'simvastatin', 'pravastatin', 'lovastatin', 'pitavastatin', 'ezetimibe',
+    'fenofibrate', 'gemfibrozil', 'niacin',
+    'warfarin', 'heparin', 'enoxaparin', 'apixaban', 'rivaroxaban', 'dabigatran', 'edoxaban', 'clopidogrel',
+    'ticagrelor', 'prasugrel',
+    'amoxicillin', 'amoxicillin clavulanate', 'ampicillin', 'penicillin', 'cephalexin', 'cefuroxime',
+    'ceftriaxone', 'cefixime', 'cefdinir', 'azithromycin', 'clarithromycin', 'erythromycin', 'doxycycline',
+    'minocycline', 'ciprofloxacin', 'levofloxacin', 'moxifloxacin', 'metronidazole', 'clindamycin',
+    'nitrofurantoin', 'trimethoprim', 'sulfamethoxazole trimethoprim', 'vancomycin', 'linezolid', 'gentamicin',
+    'piperacillin tazobactam', 'meropenem', 'rifampicin', 'rifampin', 'isoniazid', 'ethambutol', 'pyrazinamide',
+    'fluconazole', 'itraconazole', 'terbinafine', 'nystatin', 'acyclovir', 'valacyclovir', 'oseltamivir',
+    'ivermectin', 'albendazole', 'hydroxychloroquine', 'chloroquine', 'artemether lumefantrine',
+    'omeprazole', 'esomeprazole', 'pantoprazole', 'lansoprazole', 'rabeprazole', 'famotidine', 'ranitidine',
+    'ondansetron', 'metoclopramide', 'domperidone', 'loperamide', 'lactulose', 'polyethylene glycol',
+    'bisacodyl', 'senna', 'docusate', 'mesalamine', 'sucralfate',
+    'levothyroxine', 'methimazole', 'propylthiouracil', 'prednisone', 'prednisolone', 'methylprednisolone',
+    'dexamethasone', 'hydrocortisone', 'fludrocortisone', 'alendronate', 'calcitriol', 'cholecalciferol',
+    'vitamin d', 'vitamin b12', 'cyanocobalamin', 'folic acid', 'ferrous sulfate', 'iron sucrose',
+    'calcium carbonate', 'potassium chloride', 'magnesium oxide', 'allopurinol', 'febuxostat', 'colchicine',
+    'salbutamol', 'albuterol', 'ipratropium', 'tiotropium', 'salmeterol', 'formoterol', 'budesonide',
+    'fluticasone', 'beclomethasone', 'montelukast', 'theophylline', 'cetirizine', 'loratadine',
+    'fexofenadine', 'diphenhydramine', 'chlorpheniramine', 'pseudoephedrine', 'guaifenesin', 'dextromethorphan',
+    'sertraline', 'fluoxetine', 'escitalopram', 'citalopram', 'paroxetine', 'venlafaxine', 'duloxetine',
+    'bupropion', 'mirtazapine', 'trazodone', 'amitriptyline', 'nortriptyline', 'quetiapine', 'olanzapine',
+    'risperidone', 'aripiprazole', 'haloperidol', 'lithium', 'lorazepam', 'alprazolam', 'diazepam',
+    'clonazepam', 'zolpidem', 'melatonin', 'methylphenidate',
+    'levetiracetam', 'lamotrigine', 'valproate', 'valproic acid', 'carbamazepine', 'phenytoin',
+    'topiramate', 'gabapentin', 'pregabalin', 'donepezil', 'memantine', 'levodopa', 'carbidopa levodopa',
+    'sumatriptan', 'baclofen', 'cyclobenzaprine', 'tamsulosin', 'finasteride', 'oxybutynin', 'sildenafil',
+    'tadalafil', 'methotrexate', 'tacrolimus', 'cyclosporine', 'mycophenolate', 'azathioprine',
+    'tamoxifen', 'letrozole', 'anastrozole', 'estradiol', 'medroxyprogesterone', 'norethindrone',
+    'epinephrine', 'naloxone', 'adalimumab', 'etanercept', 'infliximab', 'rituximab', 'erythropoietin'
+)
+
+# Brand names -> generic
+_BRANDS = {
+    'tylenol': 'acetaminophen', 'panadol': 'paracetamol', 'advil': 'ibuprofen', 'motrin': 'ibuprofen',
+    'aleve': 'naproxen', 'voltaren': 'diclofenac', 'glucophage': 'metformin', 'januvia': 'sitagliptin',
+    'jardiance': 'empagliflozin', 'farxiga': 'dapagliflozin', 'ozempic': 'semaglutide',
+    'victoza': 'liraglutide', 'trulicity': 'dulaglutide', 'lantus': 'insulin glargine',
+    'humalog': 'insulin lispro', 'novolog': 'insulin aspart', 'zestril': 'lisinopril',
+    'prinivil': 'lisinopril', 'cozaar': 'losartan', 'diovan': 'valsartan', 'norvasc': 'amlodipine',
+    'lopressor': 'metoprolol', 'toprol': 'metoprolol', 'tenormin': 'atenolol', 'coreg': 'carvedilol',
+    'lasix': 'furosemide', 'aldactone': 'spironolactone', 'entresto': 'sacubitril valsartan',
+    'lipitor': 'atorvastatin', 'crestor': 'rosuvastatin', 'zocor': 'simvastatin', 'zetia': 'ezetimibe',
+    'coumadin': 'warfarin', 'lovenox': 'enoxaparin', 'eliquis': 'apixaban', 'xarelto': 'rivaroxaban',
+    'pradaxa': 'dabigatran', 'plavix': 'clopidogrel', 'brilinta': 'ticagrelor',
+    'augmentin': 'amoxicillin clavulanate', 'keflex': 'cephalexin', 'zithromax': 'azithromycin',
+    'cipro': 'ciprofloxacin', 'levaquin': 'levofloxacin', 'flagyl': 'metronidazole',
+    'bactrim': 'sulfamethoxazole trimethoprim', 'diflucan': 'fluconazole', 'tamiflu': 'oseltamivir',
+    'prilosec': 'omeprazole', 'nexium': 'esomeprazole', 'protonix': 'pantoprazole', 'pepcid': 'famotidine',
+    'zofran': 'ondansetron', 'synthroid': 'levothyroxine', 'eltroxin': 'levothyroxine',
+    'ventolin': 'salbutamol', 'proair': 'albuterol', 'spiriva': 'tiotropium', 'singulair': 'montelukast',
+    'zyrtec': 'cetirizine', 'claritin': 'loratadine', 'allegra': 'fexofenadine', 'benadryl': 'diphenhydramine',
+    'zoloft': 'sertraline', 'prozac': 'fluoxetine', 'lexapro': 'escitalopram', 'effexor': 'venlafaxine',
+    'cymbalta': 'duloxetine', 'wellbutrin': 'bupropion', 'seroquel': 'quetiapine', 'ativan': 'lorazepam',
+    'xanax': 'alprazolam', 'valium': 'diazepam', 'ambien': 'zolpidem', 'keppra': 'levetiracetam',
+    'lamictal': 'lamotrigine', 'neurontin': 'gabapentin', 'lyrica': 'pregabalin', 'flomax': 'tamsulosin',
+    'viagra': 'sildenafil', 'cialis': 'tadalafil', 'humira': 'adalimumab', 'epipen': 'epinephrine',
+    'narcan': 'naloxone', 'zyloprim': 'allopurinol'
+}
+
+# Strength: "500 mg", "0.5mg", "5 mg/5 mL", "100 units", "24/26 mg" (combination products).
+# Lab units such as mg/dL never match.
+_STRENGTH = re.compile(
+    r'\b\d+(?:[.,]\d+)?(?:[ \t]*[-/][ \t]*\d+(?:[.,]\d+)?)*[ \t]*'
+    r'(?:mg|mcg|µg|ug|g|ml|units?|iu|meq|%)(?:[ \t]*/[ \t]*(?:\d+(?:\.\d+)?[ \t]*)?(?:ml|dose|actuation|hr|h))?(?![/\w])',
+    re.IGNORECASE
+)
+_FORM = re.compile(
+    r'\b(?:\d+(?:\.\d+)?[ \t]*)?(?:tablets?|tabs?|capsules?|caps?|puffs?|drops|inhaler|injection|cream|ointment|'
+    r'syrup|suspension|patch|solution|spray|suppository|nebuli[sz]er|pen)\b',
+    re.IGNORECASE
+)
+_ROUTE = re.compile(
+    r'\b(?:p\.o\.|po|by mouth|orally|oral|i\.v\.|iv|intravenous(?:ly)?|im|intramuscular(?:ly)?|sc|'
+    r'subcutaneous(?:ly)?|subcut|sl|sublingual(?:ly)?|topical(?:ly)?|inhaled|nebuli[sz]ed|rectal(?:ly)?|pr)\b',
+    re.IGNORECASE
+)
+_FREQUENCY = re.compile(
+    r'\b(?:(?:once|twice|three times|four times|[1-4][ \t]*x|\d+[ \t]+times)(?:[ \t]+(?:a|per))?[ \t]+'
+    r'(?:day|daily|week|weekly)|daily|nightly|weekly|monthly|'
+    r'every[ \t]+(?:other[ \t]+)?(?:\d+(?:-\d+)?[ \t]+)?(?:hours?|hrs?|days?|weeks?|morning|evening|night)|'
+    r'q\.?[ \t]?\d+[ \t]?h(?:rs?|ours?)?|q\.?d\.?|b\.?i\.?d\.?|t\.?i\.?d\.?|q\.?i\.?d\.?|od|qhs|qam|qpm|hs|'
+    r'prn|p\.r\.n\.|stat|at bedtime|at night|in the (?:morning|evening)|as needed|as required|'
+    r'with (?:meals|food)|before (?:meals|breakfast|bed)|after meals)(?![\w])',
+    re.IGNORECASE
+)
+_DURATION = re.compile(
+    r'\b(?:for[ \t]+\d+(?:-\d+)?[ \t]+(?:days?|weeks?|months?)|x[ \t]?\d+[ \t]?(?:days?|d|weeks?|wks?))\b',
+    re.IGNORECASE
+)
+
+_UNIT_GAP = re.compile(r'(\d)[ \t]*([a-zµ%])', re.IGNORECASE)
+
+# Context before a drug name that means it is not currently taken
+_STATUS_BEFORE = re.compile(
+    r'(?:(?P<allergy>allerg\w*|intoleran\w*|reaction to|anaphylaxis)|'
+    r'(?P<stopped>discontinu\w*|stop(?:ped)?|ceased?|held|hold|no longer(?: on| taking)?|off))[^\n.;]{0,25}$',
+    re.IGNORECASE
+)
+_STATUS_AFTER = re.compile(
+    r'^[^\n.;]{0,30}\b(?:(?:was |were )?(?P<stopped>discontinued|stopped|held|ceased)|(?P<negated>not tak(?:en|ing)|declined|refused))\b',
+    re.IGNORECASE
+)
+# Negation right before a drug name (NegEx-style, a few words at most): "no aspirin",
+# "denies taking metformin", "not on warfarin or apixaban"
+_NEGATED_BEFORE = re.compile(
+    r'(?:\b(?:no|nil)(?:[ \t]+(?:any|regular|current))?'
+    r'|\b(?:denie[sd]|not[ \t]+(?:on|taking|using)|never[ \t]+(?:took|taken|used|been[ \t]+on)|without)'
+    r'(?:[ \t]+(?:taking|using|any|use[ \t]+of|current|regular))*'
+    r'(?:[ \t]+[\w-]+(?:[ \t]*,|[ \t]+or|[ \t]+and|[ \t]+nor)){0,2})[ \t]+$',
+    re.IGNORECASE
+)
+
+# Drug-like "Name 500 mg" phrases for names missing from the lexicon
+_CANDIDATE = re.compile(r'\b([A-Z][a-z]{3,})[ \t]+(?=\d+(?:\.\d+)?[ \t]*(?:mg|mcg|units?|iu)\b(?![/\w]))')
+# A capitalized word after a title or "Patient" is a person's name ("Dr Smith 5 mg")
+_PERSON_BEFORE = re.compile(r'\b(?:dr|mr|mrs|ms|miss|prof|patient|pt|nurse|sister)\.?[ \t]+$', re.IGNORECASE)
+# Two lexicon names joined by a slash are one combination product ("amlodipine/benazepril")
+_COMBINATION_JOIN = re.compile(r'[ \t]*/[ \t]*$')
+_NOT_DRUGS = {
+    'patient',
+    'take', 'taking', 'give', 'given', 'start', 'started', 'increase', 'increased', 'decrease', 'reduce',
+    'continue', 'dose', 'dosage', 'total', 'daily', 'each', 'then', 'with', 'over', 'glucose', 'cholesterol',
+    'creatinine', 'hemoglobin', 'haemoglobin', 'potassium', 'sodium', 'calcium', 'protein', 'albumin',
+    'bilirubin', 'urea', 'ferritin', 'triglycerides', 'intake', 'weight', 'loading', 'maximum', 'minimum',
+    'tablet', 'tablets', 'capsule', 'capsules', 'injection', 'morning', 'evening', 'night'
+}
+
+# Text following a drug name that belongs to it ends at a line break, a semicolon or a sentence end
+_CLAUSE_END = re.compile(r'\n|;|\.(?:\s|$)')
+_WINDOW = 120
+
+class MedicationExtractor:
+    """Lexicon + grammar medication extraction: drug, dose, form, route, frequency and status"""
+
+    def __init__(self, lexicon_path=None):
+        self.generics = set(_GENERICS)
+        self.brands = dict(_BRANDS)
+        lexicon_path = Config.MEDICATION_LEXICON_PATH if lexicon_path is None else lexicon_path
+        if lexicon_path:
+            self._load_lexicon(lexicon_path)
+
+        names = self.generics | set(self.brands)
+        self._automaton = None
+        if AHOCORASICK_AVAILABLE:
+            self._automaton = ahocorasick.Automaton()
+            for name in names:
+                self._automaton.add_word(name, name)
+                if ' ' in name:
+                    self._automaton.add_word(name.replace(' ', '-'), name)
+                    self._automaton.add_word(name.replace(' ', '/'), name)
+            self._automaton.make_automaton()
+        # Greedy optional continuations make the trie leftmost-longest, like the automaton
+        self._pattern = re.compile(r'(?<![\w-])(?:' + trie_pattern(names, separator=r'[\s/-]+') + r')(?![\w])', re.IGNORECASE)
+
+    def _load_lexicon(self, path):
+        """Extra names from a file: one generic per line, or "brand=generic" """
+        if not os.path.exists(path):
+            print(f"Warning: medication lexicon {path} not found; using the built-in lexicon")
+            return
+        with open(path, encoding='utf-8') as lexicon:
+            for line in lexicon:
+                line = line.split('#', 1)[0].strip().lower()
+                if not line:
+                    continue
+                if '=' in line:
+                    brand, generic = (part.strip() for part in line.split('=', 1))
+                    self.brands[brand] = generic
+                    self.generics.add(generic)
+                else:
+                    self.generics.add(' '.join(line.split()))
+
+    def _find_names(self, text):
+        """Non-overlapping (start, end) spans of lexicon names, leftmost-longest"""
+        lowered = text.lower()
+        if self._automaton is None or len(lowered) != len(text):
+            return [match.span() for match in self._pattern.finditer(text)]
+
+        spans = []
+        for end, key in self._automaton.iter_long(lowered):
+            start = end - len(key) + 1
+            if (start > 0 and (lowered[start - 1].isalnum() or lowered[start - 1] in '_-')) or \
+                    (end + 1 < len(lowered) and (lowered[end + 1].isalnum() or lowered[end + 1] == '_')):
+                continue
+            spans.append((start, end + 1))
+        return spans
+
+    @staticmethod
+    def _merge_combinations(text, spans):
+        """Join lexicon names separated only by a slash into one span"""
+        merged = []
+        for start, end in spans:
+            if merged and _COMBINATION_JOIN.match(text[merged[-1][1]:start]):
+                merged[-1] = (merged[-1][0], end)
+            else:
+                merged.append((start, end))
+        return merged
+
+    def _generic(self, mention):
+        """Generic name of a lexicon mention; combination parts are mapped one by one"""
+        lowered = ' '.join(mention.lower().replace('-', ' ').replace('/', ' ').split())
+        if lowered in self.brands or lowered in self.generics or '/' not in mention:
+            return self.brands.get(lowered, lowered)
+        parts = (' '.join(part.lower().replace('-', ' ').split()) for part in mention.split('/'))
+        return '/'.join(self.brands.get(part, part) for part in parts)
+
+    def extract(self, text):
+        """
+        Extract every medication mention with its dose details
+
+        Args:
+            text: Report text (raw or cleaned)
+
+        Returns:
+            List of dicts with 'name' (generic), 'brand', 'dose', 'form', 'route',
+            'frequency', 'duration', 'status' ('active', 'discontinued', 'allergy' or
+            'negated' for drugs the patient is not taking),
+            'source' ('lexicon' or 'pattern') and 'display'; one entry per drug and dose
+        """
+        if not text:
+            return []
+
+        spans = [(start, end, 'lexicon') for start, end in self._merge_combinations(text, self._find_names(text))]
+        covered = [(start, end) for start, end, _ in spans]
+        for match in _CANDIDATE.finditer(text):
+            word = match.group(1)
+            if word.lower() in _NOT_DRUGS:
+                continue
+            if _PERSON_BEFORE.search(text[max(0, match.start(1) - 12):match.start(1)]):
+                continue
+            if any(start < match.end(1) and match.start(1) < end for start, end in covered):
+                continue
+            spans.append((match.start(1), match.end(1), 'pattern'))
+        spans.sort()
+
+        medications = []
+        by_key = {}
+        for index, (start, end, source) in enumerate(spans):
+            limit = min(end + _WINDOW, spans[index + 1][0] if index + 1 < len(spans) else len(text))
+            window = text[end:limit]
+            clause_end = _CLAUSE_END.search(window)
+            if clause_end:
+                window = window[:clause_end.start()]
+
+            mention = ' '.join(text[start:end].split())
+            lowered = ' '.join(mention.lower().replace('-', ' ').replace('/', ' ').split())
+            generic = self._generic(mention) if source == 'lexicon' else mention
+            brand = mention if lowered in self.brands else None
+
+            dose = self._first(_STRENGTH, window)
+            entry = {
+                'name': generic,
+                'brand': brand,
+                'dose': _UNIT_GAP.sub(r'\1 \2', dose) if dose else None,
+                'form': self._first(_FORM, window),
+                'route': self._first(_ROUTE, window),
+                'frequency': ' '.join(dict.fromkeys(' '.join(found.split()).lower() for found in _FREQUENCY.findall(window))) or None,
+                'duration': self._first(_DURATION, window),
+                'status': self._status(text, start, window),
+                'source': source
+            }
+            if source == 'pattern' and not entry['dose']:
+                continue
+
+            key = (generic.lower(), (entry['dose'] or '').lower().replace(' ', ''))
+            existing = by_key.get(key)
+            if existing:
+                # Repeated mention (e.g. on another page): fill in details the first one lacked
+                for field, value in entry.items():
+                    if value and not existing[field]:
+                        existing[field] = value
+                continue
+            by_key[key] = entry
+            medications.append(entry)
+
+        # A bare name is redundant next to a mention of the same drug with a dose
+        dosed = {entry['name'].lower() for entry in medications if entry['dose']}
+        medications = [entry for entry in medications if entry['dose'] or entry['name'].lower() not in dosed]
+        for entry in medications:
+            entry['display'] = self._display(entry)
+        return medications
+
+    def medication_list(self, text):
+        """
+        Display strings of the medications currently taken, for MedicalSummary.medications
+
+        Args:
+            text: Report text
+
+        Returns:
+            List of strings such as "Metformin 500 mg twice daily with meals"
+        """
+        return [entry['display'] for entry in self.extract(text) if entry['status'] == 'active']
+
+    @staticmethod
+    def _first(pattern, window):
+        match = pattern.search(window)
+        return ' '.join(match.group(0).split()) if match else None
+
+    @staticmethod
+    def _status(text, start, window):
+        line_start = text.rfind('\n', 0, start) + 1
+        preceding = text[max(line_start, start - 60):start]
+        before = _STATUS_BEFORE.search(preceding)
+        if before:
+            return 'allergy' if before.group('allergy') else 'discontinued'
+        if _NEGATED_BEFORE.search(preceding):
+            return 'negated'
+        after = _STATUS_AFTER.search(window)
+        if after:
+            return 'discontinued' if after.group('stopped') else 'negated'
+        return 'active'
+
+    @staticmethod
+    def _display(entry):
+        name = entry['name']
+        name = name[:1].upper() + name[1:]
+        if entry['brand']:
+            name = f"{entry['brand'][:1].upper()}{entry['brand'][1:]} ({entry['name']})"
+        # The form adds information only without a strength, or as a count ("2 puffs")
+        form = entry['form'] if entry['form'] and (not entry['dose'] or entry['form'][:1].isdigit()) else None
+        parts = [name, entry['dose'], form, entry['route'], entry['frequency'], entry['duration']]
+        return ' '.join(part for part in parts if part)
+
+# Shared by the summarize and medications routes and the degraded-mode extract
+medication_extractor = MedicationExtractor()
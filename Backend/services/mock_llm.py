@@ -0,0 +1,215 @@
+"""
+Mock LLM Service - Offline, deterministic provider for load testing
+"""
+
+import re
+import time
+import json
+import random
+import hashlib
+import itertools
+import threading
+from collections import deque
+from config import Config
+
+_MEDICATION = re.compile(r'\b([A-Z][a-z]{3,})\s+(\d+(?:\.\d+)?\s?(?:mg|mcg|g|ml|units?))\b', re.IGNORECASE)
+_FINDING = re.compile(r'([A-Za-z][A-Za-z0-9 ]{2,40}):\s*([\d.]+\s*[A-Za-z/%]*)')
+
+class MockProviderError(Exception):
+    """Simulated provider failure"""
+
+class MockTimeoutError(MockProviderError, TimeoutError):
+    """Simulated call that did not finish within its timeout"""
+
+class MockRateLimitError(MockProviderError):
+    """Simulated HTTP 429 once more than MOCK_LLM_RATE_LIMIT_RPM calls arrive within a minute"""
+
+    status_code = 429
+
+class MockUsage:
+    """Token usage in the shape Gemini responses expose"""
+
+    def __init__(self, prompt_tokens, completion_tokens):
+        self.prompt_token_count = prompt_tokens
+        self.candidates_token_count = completion_tokens
+        self.total_token_count = prompt_tokens + completion_tokens
+
+class MockResponse:
+    """Minimal stand-in for a generate_content() response"""
+
+    def __init__(self, text, usage):
+        self.text = text
+        self.usage_metadata = usage
+
+class MockLLM:
+    """
+    Generates schema-valid MedicalSummary / SymptomAnalysis JSON without network access.
+
+    Every call draws from a random stream seeded by MOCK_LLM_SEED, the prompt and
+    a per-instance call counter, so a replayed workload behaves identically.
+    """
+
+    def __init__(self, seed=None, latency_ms=None, latency_sigma=None, tokens_per_second=None,
+                 malformed_rate=None, error_rate=None, rate_limit_rpm=None, sleep=time.sleep):
+        self.seed = Config.MOCK_LLM_SEED if seed is None else seed
+        self.latency_ms = Config.MOCK_LLM_LATENCY_MS if latency_ms is None else latency_ms
+        self.latency_sigma = Config.MOCK_LLM_LATENCY_SIGMA if latency_sigma is None else latency_sigma
+        self.tokens_per_second = Config.MOCK_LLM_TOKENS_PER_SECOND if tokens_per_second is None else tokens_per_second
+        self.malformed_rate = Config.MOCK_LLM_MALFORMED_RATE if malformed_rate is None else malformed_rate
+        self.error_rate = Config.MOCK_LLM_ERROR_RATE if error_rate is None else error_rate
+        self.rate_limit_rpm = Config.MOCK_LLM_RATE_LIMIT_RPM if rate_limit_rpm is None else rate_limit_rpm
+        self._recent_calls = deque()
+        self.sleep = sleep
+        self._calls = itertools.count()
+        self._lock = threading.Lock()
+
+    def _rng(self, prompt):
+        with self._lock:
+            call_index = next(self._calls)
+        digest = hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:16]
+        return random.Random(f"{self.seed}:{digest}:{call_index}")
+
+    def _check_rate_limit(self):
+        if self.rate_limit_rpm <= 0:
+            return
+        now = time.monotonic()
+        with self._lock:
+            while self._recent_calls and now - self._recent_calls[0] > 60.0:
+                self._recent_calls.popleft()
+            if len(self._recent_calls) >= self.rate_limit_rpm:
+                raise MockRateLimitError("429 Too Many Requests (simulated mock provider quota)")
+            self._recent_calls.append(now)
+
+    def _first_token_delay(self, rng):
+        """Log-normal time to first token around the configured median (seconds)"""
+        if self.latency_ms <= 0:
+            return 0.0
+        return rng.lognormvariate(0.0, self.latency_sigma) * self.latency_ms / 1000.0
+
+    @staticmethod
+    def _estimate_tokens(text):
+        return max(1, len(text) // 4)
+
+    def stream(self, prompt, timeout=None):
+        """
+        Yield the response in token-sized chunks at the configured streaming rate
+
+        Args:
+            prompt: Prompt text
+            timeout: Seconds before the call gives up (None = no limit)
+
+        Yields:
+            Text chunks
+        """
+        self._check_rate_limit()
+        rng = self._rng(prompt)
+        budget = float('inf') if timeout is None else timeout
+        first_token = self._first_token_delay(rng)
+        if first_token > budget:
+            self.sleep(budget)
+            raise MockTimeoutError(f"Mock provider timed out after {timeout:.2f}s")
+        self.sleep(first_token)
+        budget -= first_token
+
+        if rng.random() < self.error_rate:
+            raise MockProviderError("503 Service Unavailable (simulated mock provider error)")
+
+        text = self._render(prompt, rng)
+        chunk_size = 16  # ~4 tokens per chunk
+        delay = (chunk_size / 4) / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+        for start in range(0, len(text), chunk_size):
+            if delay:
+                if delay > budget:
+                    raise MockTimeoutError(f"Mock provider timed out after {timeout:.2f}s while streaming")
+                self.sleep(delay)
+                budget -= delay
+            yield text[start:start + chunk_size]
+
+    def generate_content(self, prompt, timeout=None):
+        """
+        Produce a complete response, mirroring google.generativeai's GenerativeModel API
+
+        Args:
+            prompt: Prompt text
+            timeout: Seconds before the call gives up (None = no limit)
+
+        Returns:
+            MockResponse with .text and .usage_metadata
+        """
+        text = ''.join(self.stream(prompt, timeout=timeout))
+        return MockResponse(text, MockUsage(self._estimate_tokens(prompt), self._estimate_tokens(text)))
+
+    def invoke(self, prompt):
+        """LangChain-style call returning an object with .content"""
+        response = self.generate_content(prompt)
+        response.content = response.text
+        return response
+
+    def _render(self, prompt, rng):
+        if 'Analyze the following symptoms' in prompt:
+            payload = self._symptom_analysis(prompt, rng)
+        else:
+            payload = self._medical_summary(prompt, rng)
+        text = json.dumps(payload, indent=2)
+
+        if rng.random() < self.malformed_rate:
+            # Exercise the parsing fallbacks: truncated JSON or prose around it
+            if rng.random() < 0.5:
+                return text[:max(1, int(len(text) * rng.uniform(0.3, 0.9)))]
+            return f"Here is the analysis you asked for:\n{text}\nLet me know if you need anything else."
+        if rng.random() < 0.3:
+            return f"```json\n{text}\n```"
+        return text
+
+    @staticmethod
+    def _section(prompt, marker, ends=('\n\n',)):
+        start = prompt.find(marker)
+        if start < 0:
+            return prompt
+        body = prompt[start + len(marker):]
+        found = [position for position in (body.find(end) for end in ends) if position > 0]
+        return body[:min(found)] if found else body
+
+    def _medical_summary(self, prompt, rng):
+        # Condensed reports contain blank lines between labeled sections; follow-up
+        # reports only carry their changes
+        marker = 'Changes in the new report:' if 'Changes in the new report:' in prompt else 'Medical Report:'
+        report = self._section(prompt, marker, ends=('\n\nMedications found in the report', '\n\nThe output should',
+                                                      '\n\nPlease provide'))
+        medications = list(dict.fromkeys(f"{name} {dose}" for name, dose in _MEDICATION.findall(report)))[:5]
+        findings = [f"{label.strip()}: {value.strip()}" for label, value in _FINDING.findall(report)][:5]
+        return {
+            'patient_summary': "This is a simulated summary generated offline for load testing. "
+                               "Your report was reviewed and the main results are listed below.",
+            'doctor_summary': f"Mock clinical summary of a {len(report.split())}-word report. "
+                              "No clinical inference was performed.",
+            'key_findings': findings or ["No structured findings detected"],
+            'medications': medications,
+            'critical_warnings': ["Simulated warning for load testing"] if rng.random() < 0.2 else [],
+            'follow_up': rng.choice([
+                "Follow up with your physician in 2 weeks",
+                "Repeat laboratory tests in 3 months",
+                "Routine follow-up as scheduled"
+            ])
+        }
+
+    def _symptom_analysis(self, prompt, rng):
+        symptoms = self._section(prompt, 'Symptoms:').strip()
+        conditions = [
+            ("Viral Upper Respiratory Infection", "A common, usually self-limiting viral infection."),
+            ("Tension Headache", "Headache related to stress or muscle tension."),
+            ("Gastroenteritis", "Inflammation of the stomach and intestines."),
+            ("Seasonal Allergies", "Immune response to environmental allergens.")
+        ]
+        picked = rng.sample(conditions, 2)
+        return {
+            'possible_conditions': [
+                {'name': name, 'probability': probability, 'description': description}
+                for (name, description), probability in zip(picked, ('medium', 'low'))
+            ],
+            'urgency': rng.choice(['low', 'low', 'medium']),
+            'explanation': f"Simulated analysis of: {symptoms[:200]}",
+            'recommendations': ["Rest and stay hydrated", "Consult a healthcare provider if symptoms persist"],
+            'citations': ["Mock knowledge base"],
+            'seek_immediate_care_if': ["Difficulty breathing", "Chest pain", "Confusion"]
+        }
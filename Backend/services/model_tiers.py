@@ -0,0 +1,84 @@
+"""
+Model Tiers - Routes LLM requests to a small or large model by task and prompt size
+"""
+
+from config import Config
+from utils.metrics import registry
+from utils.usage import call_cost
+
+llm_tier_requests_total = registry.counter(
+    'medisense_llm_tier_requests_total', 'LLM requests by model tier and outcome', ('task', 'tier', 'status')
+)
+llm_tier_latency = registry.histogram(
+    'medisense_llm_tier_latency_seconds', 'End-to-end LLM latency per model tier (retries and hedges included)', ('task', 'tier')
+)
+llm_tier_tokens_total = registry.counter(
+    'medisense_llm_tier_tokens_total', 'Estimated LLM tokens per model tier', ('task', 'tier', 'direction')
+)
+llm_tier_cost_total = registry.counter(
+    'medisense_llm_tier_cost_usd_total', 'Estimated LLM spend in USD per model tier', ('task', 'tier', 'model')
+)
+
+def model_for(provider, tier):
+    """
+    Model name a provider uses for a tier
+
+    Args:
+        provider: Provider name (gemini, openai, groq, mock)
+        tier: 'small' or 'large'
+
+    Returns:
+        Model name from the provider's <PROVIDER>_MODEL / <PROVIDER>_SMALL_MODEL
+        setting ('' when the provider has no small model configured)
+    """
+    prefix = 'MOCK_LLM' if provider == 'mock' else provider.upper()
+    return getattr(Config, f"{prefix}_SMALL_MODEL" if tier == 'small' else f"{prefix}_MODEL", '')
+
+class ModelTierPolicy:
+    """
+    Choose a model tier from the task type and the estimated prompt tokens
+
+    A prompt at or under its task's LLM_SMALL_TIER_MAX_TOKENS_<TASK> threshold goes
+    to the small (fast, cheap) model; longer prompts and unknown tasks go to the
+    large one.
+    """
+
+    def __init__(self, thresholds=None):
+        self.thresholds = thresholds if thresholds is not None else {
+            'symptoms': Config.LLM_SMALL_TIER_MAX_TOKENS_SYMPTOMS,
+            'summary': Config.LLM_SMALL_TIER_MAX_TOKENS_SUMMARY
+        }
+
+    def choose(self, task, prompt_tokens):
+        """
+        Args:
+            task: Task type ('summary', 'symptoms') or None
+            prompt_tokens: Estimated tokens in the prompt
+
+        Returns:
+            'small' or 'large'
+        """
+        limit = self.thresholds.get(task, 0)
+        return 'small' if prompt_tokens <= limit else 'large'
+
+def record_tier_call(task, tier, model, latency, input_tokens, output_tokens=0, ok=True):
+    """
+    Record one tiered LLM request so thresholds can be tuned from /metrics
+
+    Args:
+        task: Task type
+        tier: Tier that served the request
+        model: Model name of that tier (prices the request)
+        latency: Seconds from dispatch to answer
+        input_tokens: Estimated prompt tokens
+        output_tokens: Estimated response tokens
+        ok: Whether the request succeeded (failed requests are counted, not timed or priced)
+    """
+    task = task or 'other'
+    llm_tier_requests_total.inc(task=task, tier=tier, status='ok' if ok else 'error')
+    if not ok:
+        return
+    llm_tier_latency.observe(latency, task=task, tier=tier)
+    llm_tier_tokens_total.inc(input_tokens, task=task, tier=tier, direction='input')
+    llm_tier_tokens_total.inc(output_tokens, task=task, tier=tier, direction='output')
+    llm_tier_cost_total.inc(call_cost(model, input_tokens, output_tokens), task=task, tier=tier, model=model)
@@ -0,0 +1,132 @@
+"""
+Near-Duplicate Detection Service - MinHash signatures with an LSH index
+"""
+
+import re
+import zlib
+import threading
+from config import Config
+
+_WORD = re.compile(r'\w+')
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+class MinHashDeduplicator:
+    """Detects passages whose estimated Jaccard similarity exceeds a threshold"""
+
+    def __init__(self, threshold=None, num_perm=None, shingle_size=None, seed=1):
+        import numpy as np
+
+        self.np = np
+        self.threshold = threshold if threshold is not None else Config.NEAR_DUP_THRESHOLD
+        self.num_perm = num_perm or Config.MINHASH_PERMUTATIONS
+        self.shingle_size = shingle_size or Config.MINHASH_SHINGLE_SIZE
+
+        generator = np.random.RandomState(seed)
+        self._a = generator.randint(1, _MERSENNE_PRIME, size=self.num_perm, dtype=np.uint64)
+        self._b = generator.randint(0, _MERSENNE_PRIME, size=self.num_perm, dtype=np.uint64)
+
+        self.bands, self.rows = self._optimal_bands(self.threshold, self.num_perm)
+        self._buckets = [{} for _ in range(self.bands)]
+        self._signatures = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _optimal_bands(threshold, num_perm):
+        """Pick (bands, rows) whose S-curve inflection sits closest to the threshold"""
+        best = None
+        for bands in range(1, num_perm + 1):
+            if num_perm % bands:
+                continue
+            rows = num_perm // bands
+            inflection = (1.0 / bands) ** (1.0 / rows)
+            error = abs(inflection - threshold)
+            if best is None or error < best[0]:
+                best = (error, bands, rows)
+        return best[1], best[2]
+
+    def _shingle_hashes(self, text):
+        words = _WORD.findall(text.lower())
+        size = self.shingle_size
+        if len(words) <= size:
+            shingles = [' '.join(words)]
+        else:
+            shingles = [' '.join(words[i:i + size]) for i in range(len(words) - size + 1)]
+        return self.np.fromiter(
+            (zlib.crc32(shingle.encode('utf-8')) for shingle in set(shingles)),
+            dtype=self.np.uint64
+        )
+
+    def signature(self, text):
+        """
+        Compute the MinHash signature of a passage
+
+        Args:
+            text: Passage text
+
+        Returns:
+            1-D uint64 array of length num_perm
+        """
+        hashes = self._shingle_hashes(text)
+        with self.np.errstate(over='ignore'):
+            permuted = (self.np.outer(hashes, self._a) + self._b) % _MERSENNE_PRIME & _MAX_HASH
+        return permuted.min(axis=0)
+
+    def _band_keys(self, signature):
+        rows = self.rows
+        return [signature[band * rows:(band + 1) * rows].tobytes() for band in range(self.bands)]
+
+    def similarity(self, first, second):
+        """Estimated Jaccard similarity of two signatures"""
+        return float(self.np.mean(first == second))
+
+    def find_duplicate(self, signature, exclude=None):
+        """Return the key of an indexed passage similar to signature (other than exclude), or None"""
+        candidates = set()
+        for band, key in enumerate(self._band_keys(signature)):
+            candidates.update(self._buckets[band].get(key, ()))
+        candidates.discard(exclude)
+
+        for candidate in candidates:
+            if self.similarity(signature, self._signatures[candidate]) >= self.threshold:
+                return candidate
+        return None
+
+    def add(self, key, signature):
+        """Index a passage signature under key"""
+        if key in self._signatures:
+            # Same key means same content, already indexed
+            return
+        self._signatures[key] = signature
+        for band, band_key in enumerate(self._band_keys(signature)):
+            self._buckets[band].setdefault(band_key, []).append(key)
+
+    def __len__(self):
+        return len(self._signatures)
+
+    def filter(self, texts, keys=None):
+        """
+        Split passages into unique ones and near-duplicates, indexing the unique ones
+
+        Args:
+            texts: Passage texts in ingestion order
+            keys: Optional identifiers aligned with texts (default: list positions)
+
+        Returns:
+            Tuple of (kept positions, list of (dropped position, duplicate-of key));
+            a passage is never a duplicate of its own key, so re-ingesting stored
+            content is kept (and upserted) rather than dropped
+        """
+        keys = keys if keys is not None else list(range(len(texts)))
+        kept = []
+        dropped = []
+        with self._lock:
+            for position, (key, text) in enumerate(zip(keys, texts)):
+                signature = self.signature(text)
+                duplicate_of = self.find_duplicate(signature, exclude=key)
+                if duplicate_of is not None:
+                    dropped.append((position, duplicate_of))
+                    continue
+                self.add(key, signature)
+                kept.append(position)
+        return kept, dropped
@@ -3,18 +3,102 @@ OCR Service - Handles text extraction from images
 """
 
 import os
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
 from config import Config
+from utils.deadline import current_deadline, DeadlineExceeded
+from services.llm_transport import shared_client
+from services.upload_validator import UploadRejected
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+_pool_service = None  # OCRService inside an OCR process
+
+def _init_pool_process():
+    """Load the OCR engine once per OCR process"""
+    global _pool_service
+    _pool_service = OCRService(use_pool=False)
+
+def _pooled_extract(image_path, frame):
+    return _pool_service.extract_frame(image_path, frame)
+
+def _page_executor():
+    """Threads OCRing pages in this process (Tesseract itself runs as a subprocess)"""
+    return shared_client(('ocr-page-pool',), lambda: ThreadPoolExecutor(
+        max_workers=Config.OCR_PAGE_WORKERS, thread_name_prefix='ocr-page'
+    ))
+
+def join_pages(pages):
+    """Text of all pages in order, blank pages skipped, separated by form feeds (page breaks)"""
+    return '\n\f\n'.join(page['text'] for page in pages if page['text'].strip())
+
+def aggregate_confidence(pages):
+    """
+    Confidence of a multi-page result
+
+    Pages are weighted by the amount of text recognised on them, so a blank
+    separator page does not drag the score of a document down.
+
+    Args:
+        pages: Dicts with 'text' and 'confidence'
+
+    Returns:
+        Weighted mean confidence (0.0 when no text was recognised)
+    """
+    weights = [len(page['text'].strip()) for page in pages]
+    total = sum(weights)
+    if not total:
+        return 0.0
+    return sum(weight * page['confidence'] for weight, page in zip(weights, pages)) / total
+
+def _ocr_pool():
+    """
+    Process pool for OCR, owned by the server worker that created it
+
+    A worker forked from a preloaded master builds its own pool. OCR processes
+    are started with forkserver (spawn where unavailable), never forked from a
+    threaded worker.
+    """
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+            _pool = ProcessPoolExecutor(max_workers=Config.OCR_PROCESS_WORKERS, mp_context=context,
+                                        initializer=_init_pool_process)
+            _pool_pid = os.getpid()
+        return _pool
+
+def shutdown_ocr_pool():
+    """Stop this process's OCR pool (called when a server worker exits)"""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+        owned = _pool_pid == os.getpid()
+    if pool is not None and owned:
+        pool.shutdown(wait=False, cancel_futures=True)
 
 class OCRService:
     """Service for Optical Character Recognition from medical document images"""
     
-    def __init__(self):
+    def __init__(self, use_pool=None):
+        """
+        Args:
+            use_pool: Run OCR in a separate process pool (defaults to OCR_PROCESS_WORKERS > 0);
+                      the engine is then loaded by the OCR processes only
+        """
         self.use_easyocr = Config.USE_EASYOCR
+        self.use_pool = Config.OCR_PROCESS_WORKERS > 0 if use_pool is None else use_pool
+        self._reader_lock = threading.Lock()
         
         if self.use_easyocr:
             try:
                 import easyocr
-                self.reader = easyocr.Reader(['en'], gpu=False)
+                if not self.use_pool:
+                    self.reader = easyocr.Reader(['en'], gpu=False)
                 self.ocr_method = 'easyocr'
             except ImportError:
                 self.ocr_method = 'tesseract'
@@ -44,6 +128,8 @@ class OCRService:
                         pytesseract.pytesseract.tesseract_cmd = path
                         break
             
+            # Second line of defence behind the upload validator's pixel budget
+            Image.MAX_IMAGE_PIXELS = Config.UPLOAD_MAX_PIXELS
             self.pytesseract = pytesseract
             self.Image = Image
         except ImportError:
@@ -51,7 +137,7 @@ class OCRService:
     
     def extract_text_from_image(self, image_path):
         """
-        Extract text from image file using OCR
+        Extract text from image file using OCR (every frame of a multi-frame TIFF/GIF)
         
         Args:
             image_path: Path to image file
@@ -59,17 +145,126 @@ class OCRService:
         Returns:
             Tuple of (extracted_text, confidence_score)
         """
-        if not os.path.exists(image_path):
-            raise FileNotFoundError(f"Image file not found: {image_path}")
+        pages = self.extract_pages(self.page_jobs([image_path]))
+        return join_pages(pages), aggregate_confidence(pages)
+    
+    def page_jobs(self, image_paths, max_pages=None):
+        """
+        Pages to OCR: one (path, frame) per frame of each image, in order
+        
+        Every frame's header is checked against UPLOAD_MAX_PIXELS (the upload
+        validator only sees the first one). Nothing is decoded.
         
+        Args:
+            image_paths: Paths to image files
+            max_pages: Stop counting once there are more pages than this
+            
+        Returns:
+            List of (image_path, frame index); longer than max_pages when the limit is exceeded
+            
+        Raises:
+            UploadRejected: A frame is over the pixel budget
+        """
+        from PIL import Image
+        jobs = []
+        for image_path in image_paths:
+            if not os.path.exists(image_path):
+                raise FileNotFoundError(f"Image file not found: {image_path}")
+            with Image.open(image_path) as image:
+                frame = 0
+                while True:
+                    width, height = image.size
+                    if width * height > Config.UPLOAD_MAX_PIXELS:
+                        raise UploadRejected(
+                            'pixels', f"Page {frame + 1} is {width}x{height} pixels; "
+                                      f"the limit is {Config.UPLOAD_MAX_PIXELS // 1_000_000} megapixels", 413
+                        )
+                    jobs.append((image_path, frame))
+                    if max_pages is not None and len(jobs) > max_pages:
+                        return jobs
+                    # Seeking reads the next frame's header only (n_frames would walk every frame up front)
+                    try:
+                        image.seek(frame + 1)
+                    except EOFError:
+                        break
+                    frame += 1
+        return jobs
+    
+    def extract_pages(self, jobs):
+        """
+        OCR pages concurrently (OCR process pool, or OCR_PAGE_WORKERS threads)
+        
+        Args:
+            jobs: page_jobs() result
+            
+        Returns:
+            List of dicts with 'path', 'frame', 'text' and 'confidence', in job order
+        """
+        global _pool
+        deadline = current_deadline()
+        pool = None
+        futures = []
+        results = []
+        try:
+            if self.use_pool:
+                pool = _ocr_pool()
+                futures = [pool.submit(_pooled_extract, path, frame) for path, frame in jobs]
+            elif len(jobs) > 1:
+                executor = _page_executor()
+                futures = [executor.submit(self.extract_frame, path, frame) for path, frame in jobs]
+            else:
+                results = [self.extract_frame(path, frame) for path, frame in jobs]
+            if futures:
+                results = [future.result(timeout=deadline.remaining() if deadline else None) for future in futures]
+        except FutureTimeout:
+            for future in futures:
+                future.cancel()
+            raise DeadlineExceeded("Deadline exceeded during OCR")
+        except BrokenProcessPool:
+            # An OCR process died (e.g. out of memory); start a fresh pool for the next request
+            with _pool_lock:
+                if _pool is pool:
+                    _pool = None
+            raise Exception("OCR extraction failed: the OCR process exited unexpectedly")
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+        
+        return [
+            {'path': path, 'frame': frame, 'text': text, 'confidence': confidence}
+            for (path, frame), (text, confidence) in zip(jobs, results)
+        ]
+    
+    def extract_frame(self, image_path, frame=0):
+        """
+        OCR one frame of an image
+        
+        Returns:
+            Tuple of (extracted_text, confidence_score)
+        """
         if self.ocr_method == 'easyocr':
-            return self._extract_with_easyocr(image_path)
-        else:
-            return self._extract_with_tesseract(image_path)
+            return self._extract_with_easyocr(image_path, frame)
+        return self._extract_with_tesseract(image_path, frame)
+    
+    @staticmethod
+    def _load_frame(image_path, frame):
+        """Decode one frame, re-checking the pixel budget (frames of a TIFF can differ in size)"""
+        from PIL import Image
+        with Image.open(image_path) as image:
+            image.seek(frame)
+            width, height = image.size
+            if width * height > Config.UPLOAD_MAX_PIXELS:
+                raise Exception(f"OCR extraction failed: page {frame + 1} is {width}x{height} pixels, over the pixel limit")
+            return image.copy()
     
-    def _extract_with_easyocr(self, image_path):
+    def _extract_with_easyocr(self, image_path, frame=0):
         """Extract text using EasyOCR"""
-        results = self.reader.readtext(image_path)
+        import numpy as np
+        image = np.array(self._load_frame(image_path, frame).convert('RGB'))
+        # One inference at a time per reader; torch already uses several cores per call
+        with self._reader_lock:
+            results = self.reader.readtext(image)
         
         # Combine all detected text
         extracted_text = ' '.join([result[1] for result in results])
@@ -82,7 +277,7 @@ class OCRService:
         
         return extracted_text, confidence
     
-    def _extract_with_tesseract(self, image_path):
+    def _extract_with_tesseract(self, image_path, frame=0):
         """Extract text using Tesseract OCR"""
         try:
             # Check if Tesseract is available
@@ -91,7 +286,7 @@ class OCRService:
             except Exception as e:
                 raise Exception(f"Tesseract OCR not found. Please install Tesseract OCR. Error: {str(e)}")
             
-            image = self.Image.open(image_path)
+            image = self._load_frame(image_path, frame)
             
             # Extract text
             extracted_text = self.pytesseract.image_to_string(image)
@@ -100,7 +295,7 @@ class OCRService:
             data = self.pytesseract.image_to_data(image, output_type=self.pytesseract.Output.DICT)
             
             # Calculate average confidence
-            confidences = [int(conf) for conf in data['conf'] if int(conf) > 0]
+            confidences = [float(conf) for conf in data['conf'] if float(conf) > 0]
             confidence = sum(confidences) / len(confidences) / 100.0 if confidences else 0.0
             
             return extracted_text, confidence
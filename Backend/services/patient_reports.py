@@ -0,0 +1,261 @@
+"""
+Patient Reports - Per-patient report history and section diffs for incremental summaries
+"""
+
+import os
+import hmac
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from config import Config
+from utils.metrics import registry
+from utils.token_counter import TokenCounter
+from services.report_sections import section_label
+
+incremental_summaries_total = registry.counter(
+    'medisense_incremental_summaries_total', 'Follow-up report summaries by mode (reused, incremental, full, first)', ('mode',)
+)
+incremental_tokens_saved_total = registry.counter(
+    'medisense_incremental_tokens_saved_total', 'Report prompt tokens not sent thanks to incremental summaries', ()
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS patient_reports (
+    patient_key TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    section_hashes TEXT NOT NULL,
+    report_hash TEXT NOT NULL,
+    labs TEXT NOT NULL,
+    local_items TEXT NOT NULL,
+    summary TEXT NOT NULL,
+    PRIMARY KEY (patient_key, version)
+)
+"""
+
+# Summary fields that describe how an answer was produced, not the patient
+_META_FIELDS = ('medications_source', 'degraded', 'degraded_source')
+
+def _digest(text):
+    """Whitespace- and case-insensitive content hash"""
+    return hashlib.sha256(' '.join(text.lower().split()).encode('utf-8')).hexdigest()[:32]
+
+def _format_value(value, unit):
+    return f"{value:g} {unit}".strip() if isinstance(value, (int, float)) else f"{value} {unit}".strip()
+
+def lab_snapshot(lab_results):
+    """
+    Compact per-analyte view of parsed lab rows (the last row wins for repeated analytes)
+
+    Args:
+        lab_results: LabResults or None
+
+    Returns:
+        Dictionary of analyte to [name, value, unit, flag]
+    """
+    if not lab_results:
+        return {}
+    return {row['analyte']: [row['name'], row['value'], row['unit'], row['flag']] for row in lab_results.rows()}
+
+def local_items(lab_results):
+    """Findings and warnings the lab parser contributes to a summary (kept out of the LLM's copy)"""
+    if not lab_results:
+        return []
+    return lab_results.key_findings() + lab_results.critical_warnings()
+
+class PatientReportStore:
+    """
+    SQLite history of summarized reports per patient
+
+    A history is addressed by the patient id together with a client-held secret
+    (patient_key), stored as an HMAC with SECRET_KEY: a caller without the secret
+    lands in an empty history and cannot read anyone's summary. Report text is never
+    stored: only content hashes, parsed lab values and the summary. Each patient keeps the newest PATIENT_STORE_MAX_VERSIONS versions, and
+    versions older than PATIENT_STORE_TTL_DAYS are ignored and pruned.
+    """
+
+    def __init__(self, path=None, max_versions=None, ttl_days=None):
+        self.path = path or Config.PATIENT_STORE_PATH
+        self.max_versions = Config.PATIENT_STORE_MAX_VERSIONS if max_versions is None else max_versions
+        self.ttl_seconds = (Config.PATIENT_STORE_TTL_DAYS if ttl_days is None else ttl_days) * 86400
+        self._local = threading.local()
+
+    def _connection(self):
+        """Per-thread connection, reopened after a fork"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=5)
+            # WAL lets gunicorn workers read while another one writes
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute(_SCHEMA)
+            columns = {row[1] for row in connection.execute('PRAGMA table_info(patient_reports)')}
+            if 'report_hash' not in columns:
+                # Stores created before whole-report hashes: old rows never count as unchanged
+                connection.execute("ALTER TABLE patient_reports ADD COLUMN report_hash TEXT NOT NULL DEFAULT ''")
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    @staticmethod
+    def patient_key(patient_id, secret):
+        """Pseudonymous key for a patient id and the client's secret for it"""
+        message = f"{patient_id}\x1f{secret}".encode('utf-8')
+        return hmac.new(Config.SECRET_KEY.encode('utf-8'), message, hashlib.sha256).hexdigest()
+
+    def _cutoff(self):
+        return time.time() - self.ttl_seconds if self.ttl_seconds > 0 else 0.0
+
+    def latest(self, patient_id, secret):
+        """
+        Most recent summarized version for a patient
+
+        Args:
+            patient_id: Client-supplied patient identifier
+            secret: Client-held patient_key for that patient
+
+        Returns:
+            Dictionary with 'version', 'created_at', 'section_hashes', 'report_hash',
+            'labs', 'local_items' and 'summary', or None
+        """
+        row = self._connection().execute(
+            'SELECT version, created_at, section_hashes, report_hash, labs, local_items, summary FROM patient_reports '
+            'WHERE patient_key = ? AND created_at >= ? ORDER BY version DESC LIMIT 1',
+            (self.patient_key(patient_id, secret), self._cutoff())
+        ).fetchone()
+        if row is None:
+            return None
+        version, created_at, section_hashes, report_hash, labs, items, summary = row
+        return {
+            'version': version,
+            'created_at': created_at,
+            'section_hashes': json.loads(section_hashes),
+            'report_hash': report_hash,
+            'labs': json.loads(labs),
+            'local_items': json.loads(items),
+            'summary': json.loads(summary)
+        }
+
+    def save(self, patient_id, secret, section_texts, report_text, labs, items, summary):
+        """
+        Store a newly summarized version
+
+        Args:
+            patient_id: Client-supplied patient identifier
+            secret: Client-held patient_key for that patient
+            section_texts: Cleaned content per section (only hashes are stored)
+            report_text: The whole cleaned report (only its hash is stored)
+            labs: lab_snapshot() of the report
+            items: local_items() merged into the summary
+            summary: Final summary returned to the client
+
+        Returns:
+            The new version number
+        """
+        key = self.patient_key(patient_id, secret)
+        stored_summary = {name: value for name, value in summary.items() if name not in _META_FIELDS}
+        connection = self._connection()
+        with connection:
+            # BEGIN IMMEDIATE serializes concurrent uploads for the same store
+            connection.execute('BEGIN IMMEDIATE')
+            row = connection.execute('SELECT MAX(version) FROM patient_reports WHERE patient_key = ?', (key,)).fetchone()
+            version = (row[0] or 0) + 1
+            connection.execute(
+                'INSERT INTO patient_reports (patient_key, version, created_at, section_hashes, report_hash, labs, '
+                'local_items, summary) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (key, version, time.time(),
+                 json.dumps({name: _digest(text) for name, text in section_texts.items()}), _digest(report_text),
+                 json.dumps(labs), json.dumps(items), json.dumps(stored_summary))
+            )
+            connection.execute('DELETE FROM patient_reports WHERE patient_key = ? AND version <= ?',
+                               (key, version - max(self.max_versions, 1)))
+            connection.execute('DELETE FROM patient_reports WHERE created_at < ?', (self._cutoff(),))
+        return version
+
+def _lab_changes(previous, current):
+    """Readable lines for lab values that are new, changed or no longer reported"""
+    changes = []
+    for analyte, (name, value, unit, flag) in current.items():
+        before = previous.get(analyte)
+        if before is None:
+            changes.append(f"{name}: {_format_value(value, unit)} ({flag}), not in the previous report")
+        elif (before[1], before[2]) != (value, unit) or before[3] != flag:
+            changes.append(f"{name}: {_format_value(value, unit)} ({flag}), "
+                           f"previously {_format_value(before[1], before[2])} ({before[3]})")
+    for analyte, (name, value, unit, _flag) in previous.items():
+        if analyte not in current:
+            changes.append(f"{name}: not reported this time (previously {_format_value(value, unit)})")
+    return changes
+
+def plan_update(previous, section_texts, report_text, labs, full_prompt_tokens, max_delta_ratio=None):
+    """
+    Compare a report with the patient's previous version and choose how to summarize it
+
+    The stored summary is reused only when the whole cleaned report is unchanged;
+    section hashes alone miss edits in text the section filter leaves out.
+
+    Args:
+        previous: PatientReportStore.latest() result, or None
+        section_texts: Cleaned content per section of the new report
+        report_text: The whole cleaned report
+        labs: lab_snapshot() of the new report
+        full_prompt_tokens: Tokens the report would cost as a full prompt
+        max_delta_ratio: Send a full prompt when an incremental one would exceed this share of it
+                         (defaults to INCREMENTAL_MAX_DELTA_RATIO)
+
+    Returns:
+        Dictionary with 'mode' ('first', 'reused', 'incremental' or 'full'),
+        'changed_sections', 'removed_sections', 'lab_changes', 'delta_text',
+        'delta_tokens', 'prompt_tokens' (delta plus previous summary, what an
+        incremental prompt costs) and 'previous_summary' (the LLM's copy: without
+        locally extracted findings and answer metadata)
+    """
+    ratio = Config.INCREMENTAL_MAX_DELTA_RATIO if max_delta_ratio is None else max_delta_ratio
+    plan = {'mode': 'first', 'changed_sections': [], 'removed_sections': [], 'lab_changes': [],
+            'delta_text': '', 'delta_tokens': 0, 'prompt_tokens': 0, 'previous_summary': None}
+    if previous is None:
+        return plan
+
+    hashes = previous['section_hashes']
+    changed = [name for name, text in section_texts.items() if hashes.get(name) != _digest(text)]
+    removed = [name for name in hashes if name not in section_texts]
+    lab_changes = _lab_changes(previous['labs'], labs)
+
+    parts = [f"{section_label(name)} (new or changed):\n{section_texts[name]}" for name in changed]
+    if lab_changes:
+        parts.append("LAB CHANGES:\n" + '\n'.join(lab_changes))
+    if removed:
+        parts.append("NO LONGER IN THE REPORT: " + ', '.join(section_label(name) for name in removed))
+    delta_text = '\n\n'.join(parts)
+
+    skip = set(item.lower() for item in previous['local_items'])
+    summary = {}
+    for name, value in previous['summary'].items():
+        if isinstance(value, list):
+            value = [item for item in value if not (isinstance(item, str) and item.lower() in skip)]
+        summary[name] = value
+
+    delta_tokens = TokenCounter.estimate(delta_text)
+    plan.update({
+        'changed_sections': changed,
+        'removed_sections': removed,
+        'lab_changes': lab_changes,
+        'delta_text': delta_text,
+        'delta_tokens': delta_tokens,
+        'prompt_tokens': delta_tokens + TokenCounter.estimate(json.dumps(summary)),
+        'previous_summary': summary
+    })
+    if not parts and previous['report_hash'] == _digest(report_text):
+        plan['mode'] = 'reused'
+    elif not parts or plan['prompt_tokens'] > ratio * full_prompt_tokens:
+        plan['mode'] = 'full'
+    else:
+        plan['mode'] = 'incremental'
+    return plan
+
+# Shared by the summarize route
+patient_store = PatientReportStore()
@@ -4,6 +4,9 @@ RAG Service - Retrieval Augmented Generation for medical knowledge
 
 import os
 from config import Config
+from services.context_assembler import ContextAssembler
+from services.kb_snapshot import KnowledgeBaseSnapshot, SnapshotError
+from utils.metrics import track_stage
 
 class RAGService:
     """Service for RAG-based medical knowledge retrieval"""
@@ -11,10 +14,18 @@ class RAGService:
     def __init__(self):
         self.vectorstore = None
         self.embeddings_model = None
+        self.embedding_cache = None
+        self.snapshot = None
+        self.collection = None
+        self.deduplicator = None
+        self.context_assembler = ContextAssembler()
         self._init_rag()
     
     def _init_rag(self):
         """Initialize RAG components (vector store and embeddings)"""
+        # Map the knowledge base snapshot first; it is cheap and works without Chroma
+        self._map_snapshot()
+        
         try:
             from sentence_transformers import SentenceTransformer
             import chromadb
@@ -22,8 +33,18 @@ class RAGService:
             # Initialize embeddings model
             self.embeddings_model = SentenceTransformer(Config.EMBEDDING_MODEL)
             
+            # Content-hash keyed store so re-ingestion never re-encodes unchanged text
+            try:
+                from services.embedding_cache import EmbeddingCache
+                self.embedding_cache = EmbeddingCache(Config.EMBEDDING_MODEL)
+            except Exception as e:
+                print(f"Warning: Embedding cache disabled. {str(e)}")
+                self.embedding_cache = None
+            
             # Initialize ChromaDB
             self.client = chromadb.PersistentClient(path=Config.CHROMA_DB_PATH)
+            if hasattr(os, 'register_at_fork'):
+                os.register_at_fork(after_in_child=self._reopen_after_fork)
             
             # Get or create collection
             try:
@@ -31,13 +52,101 @@ class RAGService:
             except:
                 # Collection doesn't exist, create it
                 self.collection = self.client.create_collection("medical_knowledge")
-                # Load initial dataset if available
-                self._load_initial_dataset()
+                # Seed from the snapshot when possible, otherwise rebuild from the dataset
+                if not self._import_snapshot():
+                    self._load_initial_dataset()
                 
         except ImportError as e:
             print(f"Warning: RAG components not fully initialized. {str(e)}")
             print("RAG will work in fallback mode. Install: pip install chromadb sentence-transformers")
             self.collection = None
+            if self.snapshot is not None:
+                print(f"Serving retrieval from knowledge base snapshot ({len(self.snapshot)} documents)")
+    
+    def _reopen_after_fork(self):
+        """Reopen Chroma in a worker forked from a preloaded master (SQLite handles must not cross a fork)"""
+        if self.collection is None:
+            return
+        try:
+            import chromadb
+            from chromadb.api.client import SharedSystemClient
+            # PersistentClient reuses a per-path system cache, which still holds the parent's handles
+            SharedSystemClient.clear_system_cache()
+            self.client = chromadb.PersistentClient(path=Config.CHROMA_DB_PATH)
+            self.collection = self.client.get_collection("medical_knowledge")
+        except Exception as e:
+            print(f"Warning: Could not reopen the vector store after fork. {str(e)}")
+            self.collection = None
+    
+    def _map_snapshot(self):
+        """Memory-map the knowledge base snapshot if one is configured and valid"""
+        path = Config.KB_SNAPSHOT_PATH
+        if not path or not os.path.exists(path):
+            return
+        
+        try:
+            self.snapshot = KnowledgeBaseSnapshot.load(path, verify=Config.KB_SNAPSHOT_VERIFY)
+        except (SnapshotError, ImportError, OSError) as e:
+            print(f"Warning: Ignoring knowledge base snapshot {path}: {str(e)}")
+            self.snapshot = None
+    
+    def _import_snapshot(self):
+        """
+        Populate an empty collection from the mapped snapshot
+        
+        Returns:
+            True if the collection was populated
+        """
+        if self.snapshot is None or not len(self.snapshot):
+            return False
+        
+        if self.snapshot.embedding_model != Config.EMBEDDING_MODEL:
+            # Stored vectors are unusable with another model; rebuild from the stored text
+            print(f"Snapshot embeddings were built with {self.snapshot.embedding_model}, re-encoding for {Config.EMBEDDING_MODEL}")
+            return self.add_medical_documents(self.snapshot.documents, self.snapshot.metadatas)['added'] > 0
+        
+        try:
+            batch_size = 5000
+            for start in range(0, len(self.snapshot), batch_size):
+                end = start + batch_size
+                self.collection.add(
+                    embeddings=self.snapshot.embeddings[start:end].tolist(),
+                    documents=self.snapshot.documents[start:end],
+                    metadatas=self.snapshot.metadatas[start:end],
+                    ids=self.snapshot.ids[start:end]
+                )
+            
+            if self.embedding_cache is not None:
+                self.embedding_cache.put_many(self.snapshot.documents, self.snapshot.embeddings)
+            
+            print(f"Loaded {len(self.snapshot)} documents from knowledge base snapshot")
+            return True
+        except Exception as e:
+            print(f"Warning: Snapshot import failed, rebuilding instead: {str(e)}")
+            return False
+    
+    def export_snapshot(self, path=None):
+        """
+        Export the whole knowledge base into a single snapshot file
+        
+        Args:
+            path: Destination file (default Config.KB_SNAPSHOT_PATH)
+            
+        Returns:
+            Snapshot header dictionary
+        """
+        if not self.collection:
+            raise SnapshotError("No vector store collection to export")
+        
+        data = self.collection.get(include=['documents', 'metadatas', 'embeddings'])
+        return KnowledgeBaseSnapshot.export(
+            path or Config.KB_SNAPSHOT_PATH,
+            ids=data['ids'],
+            documents=data['documents'],
+            metadatas=data['metadatas'],
+            embeddings=data['embeddings'] if data['embeddings'] is not None else [],
+            embedding_model=Config.EMBEDDING_MODEL
+        )
     
     def _load_initial_dataset(self):
         """Load initial medical dataset into vector store"""
@@ -56,32 +165,209 @@ class RAGService:
         Returns:
             String with relevant medical context
         """
-        if not self.collection or not self.embeddings_model:
+        return self.retrieve_context_with_sources(query, top_k)['context']
+    
+    def retrieve_context_with_sources(self, query, top_k=None):
+        """
+        Retrieve deduplicated, MMR-selected context packed into the prompt token budget
+        
+        Args:
+            query: User query (symptoms, condition, etc.)
+            top_k: Number of passages to keep (default from config)
+            
+        Returns:
+            Dictionary with 'context' text and 'sources' metadata for citations
+        """
+        empty = {'context': "", 'sources': []}
+        
+        if not self.collection and self.snapshot is None:
             # Fallback: return empty context (LLM will still work)
-            return ""
+            return empty
         
         try:
             top_k = top_k or Config.TOP_K_RESULTS
             
-            # Generate query embedding
-            query_embedding = self.embeddings_model.encode(query).tolist()
+            # Over-fetch so deduplication and MMR have candidates to choose from
+            candidates, query_embedding = self._retrieve_candidates(query, max(top_k, Config.RETRIEVAL_CANDIDATES))
+            
+            if not candidates:
+                return empty
             
-            # Search in vector store
+            assembled = self.context_assembler.assemble(candidates, query_embedding, top_k)
+            return {'context': assembled['context'], 'sources': assembled['sources']}
+                
+        except Exception as e:
+            print(f"RAG retrieval error: {str(e)}")
+            return empty
+    
+    def _retrieve_candidates(self, query, n_results):
+        """
+        Fetch ranked candidate passages from Chroma, or from the mapped snapshot when Chroma is unavailable
+        
+        Returns:
+            Tuple of (candidate list, query embedding or None)
+        """
+        if self.embeddings_model is None:
+            # No embedding model: lexical search over the snapshot index
+            if self.snapshot is None:
+                return [], None
+            with track_stage('vector_search', provider='snapshot-bm25'):
+                return self.snapshot.lexical_search(query, n_results), None
+        
+        # Generate query embedding
+        with track_stage('embedding', provider='sentence-transformers', model=Config.EMBEDDING_MODEL):
+            query_embedding = self.embeddings_model.encode(query).tolist()
+        
+        if not self.collection:
+            with track_stage('vector_search', provider='snapshot', model=Config.EMBEDDING_MODEL):
+                return self.snapshot.search(query_embedding, n_results), query_embedding
+        
+        # Search in vector store
+        with track_stage('vector_search', provider='chroma', model=Config.EMBEDDING_MODEL):
             results = self.collection.query(
                 query_embeddings=[query_embedding],
-                n_results=top_k
+                n_results=n_results,
+                include=['documents', 'metadatas', 'embeddings', 'distances']
             )
+        
+        if not results['documents'] or len(results['documents'][0]) == 0:
+            return [], query_embedding
+        
+        candidates = []
+        for index, document in enumerate(results['documents'][0]):
+            candidates.append({
+                'id': self._result_field(results, 'ids', index),
+                'text': document,
+                'metadata': self._result_field(results, 'metadatas', index) or {},
+                'embedding': self._result_field(results, 'embeddings', index),
+                # Chroma returns distances; smaller means closer
+                'score': 1.0 - float(self._result_field(results, 'distances', index) or 0.0)
+            })
+        return candidates, query_embedding
+    
+    @staticmethod
+    def _result_field(results, field, index):
+        """Read one entry of a Chroma query result column, tolerating missing columns"""
+        column = results.get(field)
+        if column is None or len(column) == 0 or column[0] is None:
+            return None
+        return column[0][index]
+    
+    def _encode_documents(self, texts):
+        """
+        Embed documents, reusing cached embeddings for text seen before
+        
+        Args:
+            texts: List of document texts
+            
+        Returns:
+            List of embedding lists aligned with texts
+        """
+        with track_stage('embedding', provider='sentence-transformers', model=Config.EMBEDDING_MODEL):
+            if self.embedding_cache is not None:
+                vectors, encoded = self.embedding_cache.encode(texts, self.embeddings_model.encode)
+                if encoded < len(texts):
+                    print(f"Embedding cache: reused {len(texts) - encoded} of {len(texts)} embeddings")
+                return vectors.tolist()
+            
+            return [embedding.tolist() for embedding in self.embeddings_model.encode(texts)]
+    
+    @staticmethod
+    def _document_id(text):
+        """Deterministic document id derived from the content hash"""
+        import hashlib
+        return f"doc_{hashlib.sha256(text.encode('utf-8')).hexdigest()[:16]}"
+    
+    def _get_deduplicator(self):
+        """Create the MinHash/LSH index lazily, seeded with documents already stored"""
+        if self.deduplicator is None:
+            from services.near_duplicates import MinHashDeduplicator
+            
+            deduplicator = MinHashDeduplicator()
+            existing = self.collection.get(include=['documents'])
+            for doc_id, document in zip(existing['ids'], existing['documents'] or []):
+                if document:
+                    deduplicator.add(doc_id, deduplicator.signature(document))
+            self.deduplicator = deduplicator
+        return self.deduplicator
+    
+    def add_medical_documents(self, texts, metadatas=None, deduplicate=None):
+        """
+        Add many medical documents to the knowledge base in one batch
+        
+        Args:
+            texts: List of medical document texts
+            metadatas: Optional list of metadata dictionaries aligned with texts
+            deduplicate: Drop near-duplicate passages (default Config.NEAR_DUP_DEDUP)
             
-            # Combine retrieved documents
-            if results['documents'] and len(results['documents'][0]) > 0:
-                context = "\n\n".join(results['documents'][0])
-                return context
-            else:
-                return ""
+        Returns:
+            Ingestion report dictionary with 'received', 'added' and near-duplicate statistics
+        """
+        texts = list(texts or [])
+        metadatas = list(metadatas) if metadatas else [{} for _ in texts]
+        report = {
+            'received': len(texts),
+            'added': 0,
+            'dropped_near_duplicates': 0,
+            'bytes_saved': 0,
+            'index_size_saved_pct': 0.0,
+            'duplicates': []
+        }
+        
+        if not self.collection or not self.embeddings_model or not texts:
+            return report
+        
+        try:
+            deduplicate = Config.NEAR_DUP_DEDUP if deduplicate is None else deduplicate
+            if deduplicate:
+                ids = [self._document_id(text) for text in texts]
+                kept, dropped = self._get_deduplicator().filter(texts, ids)
                 
+                if dropped:
+                    # Index cost per passage: text, metadata and one float32 embedding row
+                    dimension = self.embeddings_model.get_sentence_embedding_dimension() or 0
+                    
+                    def passage_bytes(position):
+                        return (len(texts[position].encode('utf-8'))
+                                + len(str(metadatas[position] or {}).encode('utf-8'))
+                                + dimension * 4)
+                    
+                    total_bytes = sum(passage_bytes(position) for position in range(len(texts)))
+                    saved_bytes = sum(passage_bytes(position) for position, _ in dropped)
+                    report['dropped_near_duplicates'] = len(dropped)
+                    report['bytes_saved'] = saved_bytes
+                    report['index_size_saved_pct'] = round(100.0 * saved_bytes / total_bytes, 2) if total_bytes else 0.0
+                    report['duplicates'] = [
+                        {'id': ids[position], 'duplicate_of': duplicate_of} for position, duplicate_of in dropped
+                    ]
+                    
+                    texts = [texts[position] for position in kept]
+                    metadatas = [metadatas[position] for position in kept]
+            
+            if not texts:
+                return report
+            
+            # Content-derived ids make re-ingestion idempotent; exact repeats collapse to one id
+            unique = {}
+            for text, metadata in zip(texts, metadatas):
+                unique.setdefault(self._document_id(text), (text, metadata or {}))
+            texts = [text for text, _ in unique.values()]
+            
+            embeddings = self._encode_documents(texts)
+            
+            self.collection.upsert(
+                embeddings=embeddings,
+                documents=texts,
+                metadatas=[metadata for _, metadata in unique.values()],
+                ids=list(unique.keys())
+            )
+            
+            report['added'] = len(texts)
+            return report
         except Exception as e:
-            print(f"RAG retrieval error: {str(e)}")
-            return ""
+            print(f"Error adding documents to RAG: {str(e)}")
+            report['error'] = str(e)
+            return report
     
     def add_medical_document(self, text, metadata=None):
         """
@@ -91,23 +377,4 @@ class RAGService:
             text: Medical document text
             metadata: Optional metadata dictionary
         """
-        if not self.collection or not self.embeddings_model:
-            return False
-        
-        try:
-            # Generate embedding
-            embedding = self.embeddings_model.encode(text).tolist()
-            
-            # Add to collection
-            self.collection.add(
-                embeddings=[embedding],
-                documents=[text],
-                metadatas=[metadata or {}],
-                ids=[f"doc_{len(self.collection.get()['ids'])}"]
-            )
-            
-            return True
-        except Exception as e:
-            print(f"Error adding document to RAG: {str(e)}")
-            return False
-
+        return self.add_medical_documents([text], [metadata or {}])['added'] == 1
@@ -0,0 +1,230 @@
+"""
+Rate Limiter - Per-provider token buckets and AIMD adaptive concurrency for LLM calls
+"""
+
+import math
+import time
+import threading
+from contextlib import contextmanager
+from config import Config
+from utils.metrics import registry
+
+llm_concurrency_limit = registry.gauge(
+    'medisense_llm_concurrency_limit', 'Adaptive concurrency window per LLM provider', ('provider',)
+)
+llm_in_flight = registry.gauge(
+    'medisense_llm_in_flight', 'LLM calls holding a concurrency slot', ('provider',)
+)
+llm_queue_depth = registry.gauge(
+    'medisense_llm_queue_depth', 'LLM calls waiting for a rate or concurrency slot', ('provider',)
+)
+llm_shed_total = registry.counter(
+    'medisense_llm_shed_total', 'LLM calls rejected before reaching the provider', ('provider', 'reason')
+)
+llm_rate_limited_total = registry.counter(
+    'medisense_llm_rate_limited_total', 'HTTP 429 / quota errors returned by LLM providers', ('provider',)
+)
+
+class Overloaded(Exception):
+    """The provider is at capacity; the client should retry after retry_after seconds"""
+
+    def __init__(self, message, retry_after=1.0):
+        super().__init__(message)
+        self.retry_after = max(1, int(math.ceil(retry_after)))
+
+class TokenBucket:
+    """Refills `per_minute` units per minute up to `capacity` (0 = unlimited)"""
+
+    def __init__(self, per_minute, capacity=None):
+        self.rate = per_minute / 60.0
+        self.capacity = float(capacity if capacity is not None else per_minute)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    @property
+    def unlimited(self):
+        return self.rate <= 0
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount, max_wait):
+        """
+        Take `amount` units, borrowing against future refill for at most max_wait seconds
+
+        Returns:
+            Seconds the caller must wait before proceeding, or None if that exceeds
+            max_wait (nothing is taken)
+        """
+        if self.unlimited:
+            return 0.0
+        # A single request larger than the bucket can never be served otherwise
+        amount = min(amount, self.capacity)
+        with self._lock:
+            self._refill(time.monotonic())
+            wait = max(0.0, (amount - self.tokens) / self.rate)
+            if wait > max_wait:
+                return None
+            self.tokens -= amount
+            return wait
+
+    def refund(self, amount):
+        """Give back units reserved for a call that was never made"""
+        if self.unlimited:
+            return
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens = min(self.capacity, self.tokens + min(amount, self.capacity))
+
+    def time_until(self, amount):
+        """Seconds until `amount` units would be available"""
+        if self.unlimited:
+            return 0.0
+        with self._lock:
+            self._refill(time.monotonic())
+            return max(0.0, (min(amount, self.capacity) - self.tokens) / self.rate)
+
+class AdaptiveConcurrencyLimiter:
+    """
+    AIMD concurrency window
+
+    Each call completing within LLM_LATENCY_TOLERANCE x the baseline latency grows
+    the window by 1/limit (about +1 per window of calls). Slower calls shrink it by
+    LLM_LATENCY_BACKOFF, and provider rate-limit errors halve it.
+    """
+
+    def __init__(self, provider, initial=None, minimum=None, maximum=None):
+        self.provider = provider
+        self.minimum = Config.LLM_CONCURRENCY_MIN if minimum is None else minimum
+        self.maximum = Config.LLM_CONCURRENCY_MAX if maximum is None else maximum
+        self.limit = float(Config.LLM_CONCURRENCY_INITIAL if initial is None else initial)
+        self.in_flight = 0
+        self.waiting = 0
+        self.baseline = None
+        self.average = None
+        self._condition = threading.Condition()
+        llm_concurrency_limit.set(int(self.limit), provider=provider)
+
+    def acquire(self, timeout):
+        """Wait up to timeout seconds for a slot; returns False when none freed up"""
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            if self.in_flight >= int(self.limit) and self.waiting >= Config.LLM_MAX_QUEUE:
+                return False
+            self.waiting += 1
+            llm_queue_depth.inc(provider=self.provider)
+            try:
+                while self.in_flight >= int(self.limit):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return False
+                    self._condition.wait(remaining)
+                self.in_flight += 1
+                llm_in_flight.inc(provider=self.provider)
+                return True
+            finally:
+                self.waiting -= 1
+                llm_queue_depth.dec(provider=self.provider)
+
+    def release(self, latency=None, rate_limited=False):
+        """Free a slot and adapt the window to the call's outcome"""
+        with self._condition:
+            self.in_flight -= 1
+            llm_in_flight.dec(provider=self.provider)
+            if rate_limited:
+                self.limit = max(self.minimum, self.limit * 0.5)
+            elif latency is not None:
+                self._observe(latency)
+            llm_concurrency_limit.set(int(self.limit), provider=self.provider)
+            self._condition.notify_all()
+
+    def _observe(self, latency):
+        self.average = latency if self.average is None else 0.9 * self.average + 0.1 * latency
+        # Baseline tracks the fastest recent calls but drifts up so it can recover after a change
+        self.baseline = latency if self.baseline is None else min(latency, self.baseline * 1.01)
+        if latency > self.baseline * Config.LLM_LATENCY_TOLERANCE:
+            self.limit = max(self.minimum, self.limit * Config.LLM_LATENCY_BACKOFF)
+        else:
+            self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+
+    def retry_after(self):
+        """Rough time until a slot frees up"""
+        return self.average if self.average is not None else 1.0
+
+class ProviderLimiter:
+    """Request/token budgets and adaptive concurrency for one provider in this process"""
+
+    def __init__(self, provider):
+        self.provider = provider
+        self.requests = TokenBucket(Config.LLM_RATE_LIMIT_RPM)
+        self.tokens = TokenBucket(Config.LLM_RATE_LIMIT_TPM)
+        self.concurrency = AdaptiveConcurrencyLimiter(provider)
+
+    def _shed(self, reason, retry_after):
+        llm_shed_total.inc(provider=self.provider, reason=reason)
+        return Overloaded(f"LLM provider '{self.provider}' is at capacity ({reason}), retry later", retry_after)
+
+    @contextmanager
+    def slot(self, estimated_tokens=0, deadline=None):
+        """
+        Hold a rate and concurrency slot for one provider call
+
+        Waits at most LLM_QUEUE_TIMEOUT (and never past the deadline); requests that
+        cannot be served in that time are shed immediately with Overloaded.
+
+        Yields:
+            Callable marking the call as rate limited by the provider (HTTP 429)
+        """
+        max_wait = Config.LLM_QUEUE_TIMEOUT
+        if deadline is not None:
+            max_wait = min(max_wait, deadline.remaining())
+
+        # Check the token budget first so a rejected request does not consume a request slot
+        if self.tokens.time_until(estimated_tokens) > max_wait:
+            raise self._shed('tokens_per_minute', self.tokens.time_until(estimated_tokens))
+        wait = self.requests.reserve(1, max_wait)
+        if wait is None:
+            raise self._shed('requests_per_minute', self.requests.time_until(1))
+        token_wait = self.tokens.reserve(estimated_tokens, max_wait)
+        if token_wait is None:
+            # A shed call gives back what it reserved, so overload does not drain the budgets
+            self.requests.refund(1)
+            raise self._shed('tokens_per_minute', self.tokens.time_until(estimated_tokens))
+        wait = max(wait, token_wait)
+        if wait > 0:
+            time.sleep(wait)
+
+        if not self.concurrency.acquire(max(0.0, max_wait - wait)):
+            self.requests.refund(1)
+            self.tokens.refund(estimated_tokens)
+            raise self._shed('concurrency', self.concurrency.retry_after())
+
+        state = {'rate_limited': False}
+
+        def mark_rate_limited():
+            state['rate_limited'] = True
+            llm_rate_limited_total.inc(provider=self.provider)
+
+        started = time.perf_counter()
+        failed = False
+        try:
+            yield mark_rate_limited
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            # Failed calls say nothing about latency under load; only 429s shrink the window
+            latency = None if failed else time.perf_counter() - started
+            self.concurrency.release(latency, rate_limited=state['rate_limited'])
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+def provider_limiter(provider):
+    """Process-wide limiter for a provider (shared by every LLMService instance)"""
+    with _limiters_lock:
+        if provider not in _limiters:
+            _limiters[provider] = ProviderLimiter(provider)
+        return _limiters[provider]
@@ -0,0 +1,275 @@
+"""
+Report Sections Service - Segments raw reports and builds compact, section-labeled LLM input
+"""
+
+import re
+from config import Config
+from utils.metrics import registry
+from utils.token_counter import TokenCounter
+from services.text_cleaner import TextCleaner
+
+report_tokens_total = registry.counter(
+    'medisense_report_tokens_total', 'Report tokens before and after section-aware condensing', ('stage',)
+)
+report_lines_dropped_total = registry.counter(
+    'medisense_report_lines_dropped_total', 'Report lines left out of the LLM prompt', ('reason',)
+)
+
+# Header keywords per section, checked in order: allergies before medications
+# ("Drug Allergies" lists allergies, not drugs taken), and a header mentioning
+# "patient" is only patient_info when it names an identifier ("Patient Education"
+# is advice)
+_SECTION_KEYWORDS = (
+    ('allergies', r'allerg\w*|intoleran\w*|adverse reactions?'),
+    ('diagnosis', r'diagnos[ie]s|impressions?|assessment|dx'),
+    ('medications', r'medications?|meds|prescriptions?|prescribed|rx|drugs?'),
+    ('labs', r'lab\w*|test results?|results|blood work|panel'),
+    ('history', r'history|complaints?|hpi|presenting'),
+    ('findings', r'findings?|examinations?|exam|observations?|vitals?|imaging|radiology|notes?'),
+    ('recommendations', r'recommendations?|plan|follow.?up|advice|instructions?|education'),
+    # Identifier fields only: a patient_info header drops just its own line, so dates,
+    # ages and clinician names (which head clinical content) are not listed here
+    ('patient_info', r'^patient$|patient (?:id|no|number)|name|dob|date of birth|mrn|sex|gender|address|ward|bed')
+)
+_SECTION_PATTERNS = [
+    (name, re.compile(r'\b(?:' + keywords + r')\b', re.IGNORECASE)) for name, keywords in _SECTION_KEYWORDS
+]
+
+# Labels written into the prompt, in the order sections are sent
+_SECTION_LABELS = {
+    'diagnosis': 'DIAGNOSIS',
+    'history': 'HISTORY',
+    'allergies': 'ALLERGIES',
+    'findings': 'FINDINGS',
+    'labs': 'LAB RESULTS',
+    'medications': 'MEDICATIONS',
+    'recommendations': 'RECOMMENDATIONS',
+    'other': 'NOTES'
+}
+
+def section_label(name):
+    """Prompt label of a section name ('labs' -> 'LAB RESULTS')"""
+    return _SECTION_LABELS.get(name, name.replace('_', ' ').upper())
+
+# "HEADER: rest" or a stand-alone upper-case "HEADER" line
+_HEADER = re.compile(r'^[ \t\-*#•]*([A-Za-z][A-Za-z /&()\-]{0,40}?)[ \t]*(?::(.*)|[ \t]*$)')
+_SMALL_WORDS = {'of', 'and', 'or', 'for', 'the', 'on', 'at', 'to', 'in'}
+
+# Lines that never carry clinical content: contact details, addresses, legal notices
+_BOILERPLATE = re.compile(
+    r'\b(?:tel|phone|fax|ph)\b\.?[ \t]*:?[ \t]*[+(]?\d'
+    r'|www\.|https?://|\b[\w.+-]+@[\w-]+\.[a-z]{2,}'
+    r'|\b\d+[ \t]+(?:[a-z]+[ \t]+){1,3}(?:street|avenue|ave|road|rd|boulevard|blvd|lane|drive|suite)\b'
+    r'|\b(?:this|the)[ \t]+(?:report|document|message|communication|e-?mail)[^.]{0,40}\bconfidential'
+    r'|\bconfidential(?:ity)?[ \t]+(?:notice|information)|\bstrictly[ \t]+confidential'
+    r'|\bintended[ \t]+(?:solely|only)[ \t]+for|\breceived[ \t]+(?:it|this)\b[^.]{0,40}\bin[ \t]+error'
+    r'|\bdestroy[ \t]+all[ \t]+copies|\ball[ \t]+rights[ \t]+reserved|\bprinted[ \t]+(?:on|by)\b'
+    r'|\belectronically[ \t]+(?:signed|generated)|\bcomputer.generated'
+    r'|^\W*page[ \t]*\d+(?:[ \t]*(?:of|/)[ \t]*\d+)?\W*$',
+    re.IGNORECASE
+)
+
+# Demographics worth keeping from otherwise dropped identifier lines
+_DEMOGRAPHICS = re.compile(r'\b(age|sex|gender)[ \t]*[:\-]?[ \t]*(\d{1,3}(?:[ \t]*(?:y|yrs?|years?)\b)?|[MF]\b|male|female)', re.IGNORECASE)
+
+# A line among the first or last few of a page that already appeared at the same edge
+# of an earlier page is a letterhead/footer (as in TextCleaner); only lines up to the
+# maximum length are checked for boilerplate
+_EDGE_LINES = 3
+_REPEAT_MIN_LENGTH = 20
+_REPEAT_MAX_LENGTH = 200
+
+class ReportSegmenter:
+    """Splits a report into clinical sections and drops boilerplate before it reaches the LLM"""
+
+    def __init__(self, drop_sections=None, text_cleaner=None):
+        self.drop_sections = set(Config.REPORT_DROP_SECTIONS if drop_sections is None else drop_sections)
+        self.text_cleaner = text_cleaner or TextCleaner()
+
+    @staticmethod
+    def _header_section(line):
+        """Section a header line starts, with any text after the colon, or (None, None)"""
+        match = _HEADER.match(line)
+        if not match:
+            return None, None
+        header, rest = match.group(1).strip(), match.group(2)
+        words = header.replace('/', ' ').replace('-', ' ').split()
+        if not words or len(words) > 4:
+            return None, None
+        if rest is None and not header.isupper():
+            return None, None
+        # Headers are upper- or title-case ("Date of Birth"), which keeps prose such as
+        # "Patient reports thirst: ..." from opening a section
+        if not all(word[0].isupper() or word.lower() in _SMALL_WORDS for word in words):
+            return None, None
+        for name, pattern in _SECTION_PATTERNS:
+            if pattern.search(header):
+                return name, (rest or '').strip()
+        return None, None
+
+    def segment(self, text):
+        """
+        Assign every line of a raw (uncleaned) report to a section
+
+        Text before the first header on each page is the page's preamble: upper-case
+        letterheads there count as boilerplate, anything else is kept as 'other'.
+        A patient_info header (name, MRN, date of birth) covers only its own line;
+        the lines after it stay in the section that was open before.
+
+        Args:
+            text: Raw report text from OCR or PDF, with its line breaks
+
+        Returns:
+            List of (section, lines) pairs in document order; section is one of the
+            _SECTION_KEYWORDS names, 'other' or 'boilerplate'
+        """
+        segments = []
+        edges = {'top': set(), 'bottom': set()}
+
+        def add(section, line):
+            if segments and segments[-1][0] == section:
+                segments[-1][1].append(line)
+            else:
+                segments.append((section, [line]))
+
+        for page in text.split('\f'):
+            lines = [line for line in page.splitlines() if line.strip()]
+            page_edges = {'top': set(), 'bottom': set()}
+            current = None
+            preamble = True
+            for index, line in enumerate(lines):
+                stripped = line.strip()
+
+                # Letterheads, addresses and disclaimers are short lines; long prose is kept
+                if len(stripped) <= _REPEAT_MAX_LENGTH and _BOILERPLATE.search(stripped):
+                    add('boilerplate', line)
+                    continue
+
+                repeated = False
+                if _REPEAT_MIN_LENGTH <= len(stripped) <= _REPEAT_MAX_LENGTH:
+                    key = stripped.lower()
+                    at_edges = [edge for edge, at_edge in (('top', index < _EDGE_LINES),
+                                                           ('bottom', index >= len(lines) - _EDGE_LINES)) if at_edge]
+                    repeated = any(key in edges[edge] for edge in at_edges)
+                    for edge in at_edges:
+                        page_edges[edge].add(key)
+
+                # Headers are recognized even on repeated lines so later pages keep their sections
+                section, rest = self._header_section(stripped)
+                if section:
+                    preamble = False
+                    if section != 'patient_info':
+                        current = section
+                if repeated:
+                    add('boilerplate', line)
+                    continue
+                if section == 'patient_info':
+                    add(section, line)
+                    continue
+                if section:
+                    if rest:
+                        add(section, rest)
+                    continue
+
+                if current is None:
+                    letters = [char for char in stripped if char.isalpha()]
+                    if preamble and len(letters) >= 3 and stripped.isupper():
+                        add('boilerplate', line)
+                    else:
+                        add('other', line)
+                else:
+                    add(current, line)
+
+            for edge, keys in page_edges.items():
+                edges[edge].update(keys)
+
+        return segments
+
+    def condense(self, text, extracted_spans=(), extra_sections=None):
+        """
+        Build the LLM input for a report: relevant sections only, cleaned and labeled
+
+        Reports without recognizable headers are sent as one cleaned block (minus
+        boilerplate lines). Dropped identifier lines still contribute age and sex.
+
+        Args:
+            text: Raw report text from OCR or PDF
+            extracted_spans: (start, end) spans of text already captured in structured
+                             form (e.g. lab rows); they are left out of the sections
+            extra_sections: Dict of section name to ready-made content (e.g. a compact
+                            lab table), sent ahead of that section's remaining text
+
+        Returns:
+            Dictionary with the prompt 'text', 'sections' sent, 'section_texts' (cleaned
+            content per section, without extra_sections), 'original_text' (the whole
+            report after clean_text), 'dropped' line counts per section, and
+            'original_tokens' / 'prompt_tokens' / 'saved_tokens'
+        """
+        remaining = text
+        if extracted_spans:
+            pieces, position = [], 0
+            for start, end in sorted(extracted_spans):
+                pieces.append(text[position:max(start, position)])
+                position = max(position, end)
+            pieces.append(text[position:])
+            remaining = ''.join(pieces)
+        extra_sections = {name: content for name, content in (extra_sections or {}).items() if content}
+
+        grouped = {name: [] for name in extra_sections}
+        dropped = {}
+        demographics = []
+        for section, lines in self.segment(remaining):
+            if section == 'boilerplate' or section in self.drop_sections:
+                dropped[section] = dropped.get(section, 0) + len(lines)
+                if section == 'patient_info':
+                    for line in lines:
+                        demographics.extend(f"{field.capitalize()}: {value}" for field, value in _DEMOGRAPHICS.findall(line))
+                continue
+            grouped.setdefault(section, []).extend(lines)
+
+        labeled = [name for name in grouped if name not in ('other', 'patient_info')]
+        section_texts = {}
+        if labeled:
+            order = [name for name in _SECTION_LABELS if name in grouped]
+            if 'patient_info' in grouped:
+                order.insert(0, 'patient_info')
+            parts = []
+            for name in order:
+                content = self.text_cleaner.clean_text('\n'.join(grouped[name]))
+                if content:
+                    section_texts[name] = content
+                if name in extra_sections:
+                    content = '\n'.join(part for part in (extra_sections[name], content) if part)
+                if content:
+                    parts.append(f"{_SECTION_LABELS.get(name, 'PATIENT')}:\n{content}")
+            if demographics:
+                section_texts['patient'] = ', '.join(dict.fromkeys(demographics))
+                parts.insert(0, f"PATIENT:\n{section_texts['patient']}")
+            prompt_text = '\n\n'.join(parts)
+        else:
+            prompt_text = self.text_cleaner.clean_text('\n'.join(line for lines in grouped.values() for line in lines))
+            section_texts = {'other': prompt_text}
+
+        original_text = self.text_cleaner.clean_text(text)
+        if not prompt_text:
+            # Nothing survived the filters; fall back to the whole cleaned report
+            prompt_text, labeled, dropped = original_text, [], {}
+            section_texts = {'other': original_text}
+
+        original_tokens = TokenCounter.estimate(original_text)
+        prompt_tokens = TokenCounter.estimate(prompt_text)
+        report_tokens_total.inc(original_tokens, stage='original')
+        report_tokens_total.inc(prompt_tokens, stage='prompt')
+        for reason, count in dropped.items():
+            report_lines_dropped_total.inc(count, reason=reason)
+
+        return {
+            'text': prompt_text,
+            'sections': labeled,
+            'section_texts': section_texts,
+            'original_text': original_text,
+            'dropped': dropped,
+            'original_tokens': original_tokens,
+            'prompt_tokens': prompt_tokens,
+            'saved_tokens': original_tokens - prompt_tokens
+        }
@@ -0,0 +1,54 @@
+"""
+Response Cache - Recent successful LLM answers, served when the provider is unavailable
+"""
+
+import copy
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from config import Config
+
+class ResponseCache:
+    """Thread-safe LRU cache with a per-entry time-to-live"""
+
+    def __init__(self, max_entries=None, ttl_seconds=None):
+        self.max_entries = Config.RESPONSE_CACHE_SIZE if max_entries is None else max_entries
+        self.ttl_seconds = Config.RESPONSE_CACHE_TTL if ttl_seconds is None else ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(kind, *parts):
+        """Cache key for a request kind and its inputs (whitespace/case-insensitive)"""
+        normalized = '\x1f'.join(' '.join(str(part).lower().split()) for part in parts)
+        return f"{kind}:{hashlib.sha256(normalized.encode('utf-8')).hexdigest()}"
+
+    def get(self, key):
+        """Return a copy of the cached value, or None if missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, value = entry
+            if self.ttl_seconds > 0 and time.time() - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+        return copy.deepcopy(value)
+
+    def put(self, key, value):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.time(), copy.deepcopy(value))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+# Shared by every LLMService instance in the process
+response_cache = ResponseCache()
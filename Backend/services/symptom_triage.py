@@ -0,0 +1,277 @@
+"""
+Symptom Triage Service - Normalizes symptom text and applies red-flag rules without an LLM
+"""
+
+import re
+from utils.metrics import registry
+from utils.patterns import trie_pattern
+
+symptom_triage_total = registry.counter(
+    'medisense_symptom_triage_total', 'Symptom checks by answering path', ('path',)
+)
+
+# Canonical symptom -> lay phrasings (lower-case; spaces match any whitespace or hyphen)
+_SYNONYMS = {
+    'chest pain': ('chest pain', 'chest pains', 'chest pressure', 'chest tightness', 'tight chest', 'tightness in my chest',
+                   'pain in my chest', 'pain in the chest', 'crushing chest', 'heart pain', 'chest discomfort', 'angina'),
+    'shortness of breath': ('shortness of breath', 'short of breath', 'sob', 'breathless', 'breathlessness',
+                            'difficulty breathing', 'trouble breathing', 'hard to breathe', 'cant breathe',
+                            'cannot breathe', 'struggling to breathe', 'dyspnea', 'dyspnoea', 'winded'),
+    'pain radiating to arm or jaw': ('pain in my left arm', 'left arm pain', 'arm pain', 'jaw pain', 'pain in my jaw',
+                                     'pain radiating', 'radiating pain', 'pain spreading to my arm'),
+    'sweating': ('sweating', 'sweaty', 'cold sweat', 'cold sweats', 'diaphoresis', 'clammy'),
+    'face drooping': ('face drooping', 'facial droop', 'drooping face', 'face droop', 'one side of my face',
+                      'crooked smile', 'uneven smile'),
+    'one-sided weakness': ('one sided weakness', 'weakness on one side', 'arm weakness', 'sudden weakness',
+                           'numbness on one side', 'cant move my arm', 'cannot move my arm', 'paralysis', 'hemiparesis'),
+    'slurred speech': ('slurred speech', 'slurring', 'trouble speaking', 'difficulty speaking', 'cant speak',
+                       'cannot speak', 'garbled speech', 'aphasia'),
+    'sudden vision loss': ('vision loss', 'loss of vision', 'lost my vision', 'sudden blindness', 'cant see',
+                           'cannot see', 'double vision'),
+    'confusion': ('confusion', 'confused', 'disoriented', 'disorientation', 'not making sense', 'altered mental status'),
+    'worst headache': ('worst headache', 'thunderclap headache', 'worst headache of my life', 'sudden severe headache',
+                       'exploding headache'),
+    'headache': ('headache', 'headaches', 'head ache', 'head pain', 'migraine', 'migraines'),
+    'stiff neck': ('stiff neck', 'neck stiffness', 'cant bend my neck', 'cannot bend my neck'),
+    # A bare "temperature" is a measurement ("temperature normal"), not a symptom
+    'fever': ('fever', 'feverish', 'high temperature', 'raised temperature', 'elevated temperature',
+              'running a temperature', 'pyrexia', 'febrile', 'chills'),
+    'rash that does not fade': ('rash that does not fade', 'non blanching rash', 'purple rash', 'purpura', 'petechiae'),
+    'rash': ('rash', 'skin rash', 'spots', 'hives', 'urticaria'),
+    'loss of consciousness': ('unconscious', 'passed out', 'pass out', 'passing out', 'fainted', 'fainting',
+                              'blacked out', 'blackout', 'collapsed', 'unresponsive', 'syncope', 'loss of consciousness'),
+    'seizure': ('seizure', 'seizures', 'convulsion', 'convulsions', 'convulsing'),
+    'severe bleeding': ('severe bleeding', 'heavy bleeding', 'bleeding heavily', 'wont stop bleeding',
+                        'will not stop bleeding', 'bleeding that wont stop', 'hemorrhage', 'haemorrhage'),
+    'vomiting blood': ('vomiting blood', 'throwing up blood', 'blood in vomit', 'hematemesis', 'haematemesis',
+                       'coffee ground vomit'),
+    'coughing blood': ('coughing blood', 'coughing up blood', 'blood in sputum', 'hemoptysis', 'haemoptysis'),
+    'black or bloody stools': ('black stools', 'black stool', 'tarry stools', 'bloody stools', 'blood in stool',
+                               'blood in my stool', 'melena', 'rectal bleeding'),
+    'throat or face swelling': ('throat swelling', 'swollen throat', 'throat closing', 'tongue swelling', 'swollen tongue',
+                                'swollen lips', 'lip swelling', 'face swelling', 'swollen face', 'anaphylaxis'),
+    'blue lips or skin': ('blue lips', 'lips turning blue', 'bluish skin', 'cyanosis', 'turning blue'),
+    'severe abdominal pain': ('severe abdominal pain', 'severe stomach pain', 'severe belly pain', 'rigid abdomen',
+                              'worst stomach pain', 'excruciating abdominal pain'),
+    'abdominal pain': ('abdominal pain', 'stomach pain', 'belly pain', 'stomach ache', 'stomachache', 'tummy ache',
+                       'cramps', 'abdominal cramps'),
+    'suicidal thoughts': ('suicidal', 'suicide', 'want to die', 'kill myself', 'end my life', 'self harm',
+                          'hurt myself', 'harming myself'),
+    'pregnancy': ('pregnant', 'pregnancy', 'expecting a baby'),
+    'vaginal bleeding': ('vaginal bleeding', 'bleeding from the vagina', 'spotting'),
+    'cough': ('cough', 'coughing', 'dry cough', 'wet cough', 'productive cough'),
+    'sore throat': ('sore throat', 'throat pain', 'scratchy throat', 'pharyngitis'),
+    'runny nose': ('runny nose', 'stuffy nose', 'blocked nose', 'congestion', 'nasal congestion', 'sneezing'),
+    'nausea': ('nausea', 'nauseous', 'nauseated', 'feel sick', 'queasy'),
+    'vomiting': ('vomiting', 'throwing up', 'vomit', 'being sick'),
+    'diarrhea': ('diarrhea', 'diarrhoea', 'loose stools', 'watery stools', 'the runs'),
+    'fatigue': ('fatigue', 'tired', 'tiredness', 'exhausted', 'exhaustion', 'lethargy', 'lethargic', 'no energy'),
+    'dizziness': ('dizziness', 'dizzy', 'lightheaded', 'light headed', 'vertigo', 'room spinning'),
+    'palpitations': ('palpitations', 'racing heart', 'heart racing', 'pounding heart', 'fluttering heart',
+                     'irregular heartbeat'),
+    'body aches': ('body aches', 'body ache', 'muscle aches', 'muscle pain', 'aching muscles', 'myalgia'),
+    'joint pain': ('joint pain', 'joint pains', 'painful joints', 'arthralgia'),
+    'back pain': ('back pain', 'backache', 'lower back pain'),
+    'painful urination': ('painful urination', 'burning when i pee', 'burning urination', 'dysuria',
+                          'pain when urinating'),
+    'frequent urination': ('frequent urination', 'peeing a lot', 'urinating often', 'polyuria'),
+    'excessive thirst': ('excessive thirst', 'always thirsty', 'very thirsty', 'polydipsia'),
+    'swollen legs': ('swollen legs', 'leg swelling', 'swollen ankles', 'ankle swelling', 'edema', 'oedema'),
+    'weight loss': ('weight loss', 'losing weight', 'lost weight'),
+    'itching': ('itching', 'itchy', 'pruritus'),
+    'loss of smell or taste': ('loss of smell', 'loss of taste', 'cant smell', 'cannot smell', 'cant taste', 'anosmia')
+}
+
+# Red-flag rules: any one trigger, or every symptom of a combination, makes the case urgent
+# (name, condition shown to the user, triggers (any), combinations (all of one), advice)
+_RED_FLAG_RULES = (
+    ('cardiac', 'Possible heart attack (acute coronary syndrome)',
+     ('chest pain',), (('shortness of breath', 'sweating'), ('pain radiating to arm or jaw', 'sweating')),
+     "Chest pain or pressure, especially with breathlessness, sweating or pain spreading to the arm or jaw"),
+    ('stroke', 'Possible stroke',
+     ('face drooping', 'one-sided weakness', 'slurred speech', 'sudden vision loss'), (),
+     "Face drooping, arm or leg weakness, or difficulty speaking (call emergency services immediately)"),
+    ('breathing', 'Severe breathing difficulty',
+     ('blue lips or skin',), (('shortness of breath', 'chest pain'), ('shortness of breath', 'confusion')),
+     "Severe difficulty breathing or blue lips"),
+    ('anaphylaxis', 'Possible severe allergic reaction (anaphylaxis)',
+     ('throat or face swelling',), (('rash', 'shortness of breath'),),
+     "Swelling of the face, lips or throat, or hives with difficulty breathing"),
+    ('meningitis', 'Possible meningitis',
+     ('rash that does not fade',), (('fever', 'stiff neck'), ('headache', 'stiff neck'), ('fever', 'confusion')),
+     "Fever with a stiff neck, confusion or a rash that does not fade under pressure"),
+    ('brain_bleed', 'Possible bleeding in the brain',
+     ('worst headache',), (),
+     "A sudden, severe headache unlike any before"),
+    ('neurological', 'Loss of consciousness or seizure',
+     ('loss of consciousness', 'seizure'), (),
+     "Fainting, unresponsiveness or a seizure"),
+    ('bleeding', 'Serious bleeding',
+     ('severe bleeding', 'vomiting blood', 'coughing blood', 'black or bloody stools'), (('pregnancy', 'vaginal bleeding'),),
+     "Heavy bleeding, vomiting or coughing up blood, or black stools"),
+    ('abdominal', 'Possible abdominal emergency',
+     ('severe abdominal pain',), (('abdominal pain', 'vomiting blood'), ('pregnancy', 'abdominal pain')),
+     "Severe or worsening abdominal pain, especially with a rigid belly"),
+    ('mental_health', 'Mental health crisis',
+     ('suicidal thoughts',), (),
+     "Thoughts of suicide or self-harm (call your local emergency number or a crisis line now)")
+)
+
+_ALWAYS_SEEK_CARE = ["Chest pain", "Difficulty breathing", "Loss of consciousness", "Severe bleeding"]
+
+_ALIAS_TO_SYMPTOM = {
+    alias: symptom for symptom, aliases in _SYNONYMS.items() for alias in aliases
+}
+_RED_FLAG_SYMPTOMS = {
+    symptom for _, _, triggers, combinations, _ in _RED_FLAG_RULES
+    for symptom in triggers + tuple(symptom for combination in combinations for symptom in combination)
+}
+_SYMPTOM_PATTERN = re.compile(r'(?<![\w])(?:' + trie_pattern(_ALIAS_TO_SYMPTOM) + r')(?![\w])')
+# Negation (NegEx-style): a cue negates a symptom at most a few words after it, within
+# its clause, so "no fever or cough" negates both but "not sure, crushing chest pain"
+# negates nothing. Definite cues negate anything; ambiguous ones ("never had chest
+# pain like this") do not negate red-flag symptoms.
+_NEGATION = re.compile(
+    r'\b(?:(?P<definite>no|denies|denied|without|negative for|free of|absence of)'
+    r'|not|never|(?:do|does|did|have|has|had)nt)\b'
+)
+# Phrases that contain a cue but do not negate what follows
+_PSEUDO_NEGATION = re.compile(
+    r'\b(?:not (?:sure|certain|only|just|able to)|no (?:idea|change|better|improvement|longer)'
+    r'|never (?:had|felt|experienced)\b[^.;:!?]*\blike)\b'
+)
+_NEGATION_WINDOW = 4
+_CLAUSE_BREAK = re.compile(r'[.,;:!?]|\b(?:and|but|however|though|although|except|yet|while|whereas)\b')
+_WORD = re.compile(r'\w+')
+_APOSTROPHES = re.compile(r"[’'`]")
+
+def _merge_care(primary, extra):
+    """Primary advice followed by extra items it does not already cover"""
+    covered = [line.lower() for line in primary]
+    return list(primary) + [item for item in extra
+                            if not any(item.lower() in line for line in covered)]
+
+class SymptomTriage:
+    """Maps free-text symptoms to canonical terms and decides urgency from red-flag rules"""
+
+    def normalize(self, text):
+        """
+        Find canonical symptoms in free text, separating negated ones
+
+        Args:
+            text: User's symptom description
+
+        Returns:
+            Dictionary with 'symptoms' and 'negated' lists of canonical terms, in order of mention
+        """
+        lowered = _APOSTROPHES.sub('', (text or '').lower())
+        pseudo = [found.span() for found in _PSEUDO_NEGATION.finditer(lowered)]
+        cues = [cue for cue in _NEGATION.finditer(lowered)
+                if not any(start <= cue.start() < end for start, end in pseudo)]
+        present, negated = [], []
+        for match in _SYMPTOM_PATTERN.finditer(lowered):
+            symptom = _ALIAS_TO_SYMPTOM.get(' '.join(match.group(0).replace('-', ' ').split()))
+            if symptom is None:
+                continue
+            target = negated if self._negated(lowered, cues, match.start(), symptom) else present
+            if symptom not in target:
+                target.append(symptom)
+        return {'symptoms': present, 'negated': [symptom for symptom in negated if symptom not in present]}
+
+    @staticmethod
+    def _negated(lowered, cues, start, symptom):
+        """Whether the nearest negation cue before a symptom mention covers it"""
+        cue = next((cue for cue in reversed(cues) if cue.end() <= start), None)
+        if cue is None:
+            return False
+        if _CLAUSE_BREAK.search(lowered, cue.end(), start):
+            return False
+        # "or"/"nor" lists stay inside the window: "denies chest pain or shortness of breath"
+        if len(_WORD.findall(lowered, cue.end(), start)) > _NEGATION_WINDOW:
+            return False
+        return bool(cue.group('definite')) or symptom not in _RED_FLAG_SYMPTOMS
+
+    def triage(self, text):
+        """
+        Apply red-flag rules to a symptom description
+
+        Args:
+            text: User's symptom description
+
+        Returns:
+            Dictionary with 'symptoms', 'negated', 'red_flags' (rule names), 'conditions'
+            (what each red flag may indicate), 'urgency' ('high' when any red flag fires,
+            otherwise None: the rules do not judge non-urgent cases) and 'seek_immediate_care_if'
+        """
+        normalized = self.normalize(text)
+        present = set(normalized['symptoms'])
+
+        red_flags, conditions, advice = [], [], []
+        for name, condition, triggers, combinations, care in _RED_FLAG_RULES:
+            if any(trigger in present for trigger in triggers) or \
+                    any(all(symptom in present for symptom in combination) for combination in combinations):
+                red_flags.append(name)
+                conditions.append(condition)
+                advice.append(care)
+
+        return {
+            'symptoms': normalized['symptoms'],
+            'negated': normalized['negated'],
+            'red_flags': red_flags,
+            'conditions': conditions,
+            'urgency': 'high' if red_flags else None,
+            'seek_immediate_care_if': _merge_care(advice, _ALWAYS_SEEK_CARE)
+        }
+
+    def urgent_response(self, triage):
+        """
+        Full SymptomAnalysis-shaped answer for a red-flag case, built without an LLM
+
+        Args:
+            triage: Result of triage() with at least one red flag
+
+        Returns:
+            Dictionary with the SymptomAnalysis fields
+        """
+        described = ', '.join(triage['symptoms'])
+        return {
+            'possible_conditions': [{
+                'name': condition,
+                'probability': "possible",
+                'description': "Your symptoms match a warning sign that needs urgent medical assessment"
+            } for condition in triage['conditions']],
+            'urgency': 'high',
+            'explanation': (f"You described {described}. These can be signs of a medical emergency, so they should be "
+                            "assessed by a doctor right away rather than waiting for an online analysis. "
+                            "This check is automated and cannot rule a serious condition in or out."),
+            'recommendations': [
+                "Call your local emergency number or go to the nearest emergency department now",
+                "Do not drive yourself if you feel faint, confused or short of breath",
+                "Stay with someone until help arrives"
+            ],
+            'citations': [],
+            'seek_immediate_care_if': triage['seek_immediate_care_if']
+        }
+
+    @staticmethod
+    def apply(result, triage):
+        """
+        Make an LLM (or cached) analysis at least as urgent as the red-flag rules
+
+        Args:
+            result: SymptomAnalysis dictionary, updated in place
+            triage: Result of triage()
+
+        Returns:
+            The updated result
+        """
+        if triage['urgency'] == 'high':
+            result['urgency'] = 'high'
+            result['seek_immediate_care_if'] = _merge_care(
+                triage['seek_immediate_care_if'][:len(triage['red_flags'])],
+                result.get('seek_immediate_care_if') or []
+            )
+        return result
+
+# Shared by the symptom route and the degraded-mode triage
+symptom_triage = SymptomTriage()
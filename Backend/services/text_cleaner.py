@@ -4,64 +4,253 @@ Text Cleaner Service - Preprocesses and cleans medical text
 
 import re
 
+# Process large inputs in slices of about this many characters (split at line breaks)
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+# Everything except letters, digits, whitespace-free medical punctuation and symbols.
+# Whitespace is matched too, so one substitution both drops junk and collapses spacing.
+_DISALLOWED = re.compile(r'[^\w.,;:\-+%°/()]+')
+
+# Word split across a line break by OCR/PDF hyphenation: "fol-\nlow" -> "follow"
+# (starts with a literal '-' so the regex engine can skip ahead between candidates)
+_HYPHENATION = re.compile(r'(?<=[a-z])-[ \t]*\r?\n[ \t\f]*(?=[a-z])')
+
+# Stand-alone page numbers: "Page 3", "Page 3 of 10" anywhere; a bare "3 / 10" or
+# "3 of 10" only as the first or last line of a page (see _PageFilter)
+_PAGE_NUMBER = re.compile(r'^[ \t]*page[ \t]*\d+(?:[ \t]*(?:of|/)[ \t]*\d+)?[ \t]*$', re.IGNORECASE)
+_PAGE_FRACTION = re.compile(r'^[ \t]*(\d+)[ \t]*(?:of|/)[ \t]*(\d+)[ \t]*$', re.IGNORECASE)
+
+# Typographic ligatures emitted by OCR engines and PDF text layers
+_LIGATURES = (('ﬀ', 'ff'), ('ﬁ', 'fi'), ('ﬂ', 'fl'), ('ﬃ', 'ffi'), ('ﬄ', 'ffl'), ('ﬅ', 'st'), ('ﬆ', 'st'))
+_HAS_LIGATURE = re.compile('[\ufb00-\ufb06]')
+
+# Letterhead/footer candidates: the first and last few non-blank lines of each page
+# ('\f'-separated), within this length range. One repeated at the same edge of an
+# earlier page is dropped; text inside a page is never deduplicated.
+_EDGE_LINES = 3
+_REPEAT_MIN_LENGTH = 20
+_REPEAT_MAX_LENGTH = 200
+
+# One pattern per header alias: each starts with a literal, which the regex engine
+# scans for far faster than a combined alternation
+_SECTION_HEADERS = {
+    'diagnosis': ('diagnosis:', 'diagnoses:', 'dx:'),
+    'medications': ('medications:', 'meds:', 'prescription:', 'rx:'),
+    'test_results': ('test results:', 'lab results:', 'findings:'),
+    'recommendations': ('recommendations:', 'follow.?up:', 'advice:')
+}
+_SECTION_ALIASES = {
+    name: [re.compile(alias) for alias in aliases] for name, aliases in _SECTION_HEADERS.items()
+}
+_SECTION_ALIASES_ANY_CASE = {
+    name: [re.compile(alias, re.IGNORECASE) for alias in aliases] for name, aliases in _SECTION_HEADERS.items()
+}
+# A section ends at a blank line or at a new line starting with a letter
+_SECTION_END = re.compile(r'\n\n|\n[A-Z]', re.IGNORECASE)
+
+class _PageFilter:
+    """
+    Line filter that drops page numbers and page-edge letterheads/footers
+
+    Lines are fed in order; the last _EDGE_LINES non-blank lines of the current
+    page are held back until the page ends (a '\f') or more lines push them into
+    the page body. Without any '\f' nothing counts as a page edge, so plain text
+    only loses "Page N" lines.
+    """
+
+    def __init__(self):
+        self.page_index = 0
+        self.top_seen = 0
+        self.held = []
+        self.held_nonblank = 0
+        self.edges = {'top': set(), 'bottom': set()}
+        self.page_edges = {'top': set(), 'bottom': set()}
+
+    def feed(self, line, out):
+        """Add one line of the current page, emitting lines no longer at its bottom edge"""
+        if _PAGE_NUMBER.match(line):
+            return
+        top = False
+        if line.strip():
+            top = self.top_seen < _EDGE_LINES
+            if top and self.top_seen == 0 and self.page_index > 0 and self._is_fraction(line):
+                return
+            self.top_seen += 1
+            self.held_nonblank += 1
+        self.held.append((line, top))
+        while self.held_nonblank > _EDGE_LINES:
+            held_line, held_top = self.held.pop(0)
+            if held_line.strip():
+                self.held_nonblank -= 1
+            self._emit(held_line, ('top',) if held_top else (), out)
+
+    def end_page(self, out, boundary=True):
+        """Flush the held lines as the page's bottom edge (boundary=False at the end of unpaged text)"""
+        at_edge = boundary or self.page_index > 0
+        last = max((index for index, (line, _) in enumerate(self.held) if line.strip()), default=None)
+        for index, (line, top) in enumerate(self.held):
+            if at_edge and index == last and self._is_fraction(line):
+                continue
+            self._emit(line, (('bottom',) if at_edge else ()) + (('top',) if top else ()), out)
+        for edge, keys in self.page_edges.items():
+            self.edges[edge].update(keys)
+            keys.clear()
+        self.held = []
+        self.held_nonblank = 0
+        self.top_seen = 0
+        self.page_index += 1
+
+    def _emit(self, line, edges, out):
+        stripped = line.strip()
+        if edges and _REPEAT_MIN_LENGTH <= len(stripped) <= _REPEAT_MAX_LENGTH:
+            key = stripped.lower()
+            if any(key in self.edges[edge] for edge in edges):
+                return
+            for edge in edges:
+                self.page_edges[edge].add(key)
+        out.append(line)
+
+    @staticmethod
+    def _is_fraction(line):
+        """'3 / 10' or '3 of 10' with page <= pages (so a blood pressure like 120/80 is kept)"""
+        match = _PAGE_FRACTION.match(line)
+        return match is not None and 0 < int(match.group(1)) <= int(match.group(2))
+
 class TextCleaner:
     """Utility class for cleaning and preprocessing medical text"""
-    
+
     def clean_text(self, text):
         """
         Clean and normalize medical report text
-        
+
         Args:
             text: Raw text from OCR or PDF
-            
+
         Returns:
             Cleaned text string
         """
         if not text:
             return ""
-        
-        # Remove excessive whitespace
-        text = re.sub(r'\s+', ' ', text)
-        
-        # Remove special characters but keep medical symbols
-        # Keep: letters, numbers, common punctuation, medical symbols
-        text = re.sub(r'[^\w\s\.\,\;\:\-\+\%\°\/\(\)]', ' ', text)
-        
-        # Normalize line breaks
-        text = text.replace('\n', ' ').replace('\r', ' ')
-        
-        # Remove multiple spaces
-        text = re.sub(r' +', ' ', text)
-        
-        # Trim
-        text = text.strip()
-        
-        return text
-    
+
+        return ''.join(self.clean_stream(self._slices(text)))
+
+    def clean_stream(self, chunks, chunk_size=DEFAULT_CHUNK_SIZE):
+        """
+        Clean a document that arrives in pieces, without holding it all in memory
+
+        Joining the yielded pieces gives the same result as clean_text() on the
+        whole document: pieces are only processed up to the last complete line, so
+        hyphenation and page-edge detection work across chunk boundaries.
+
+        Args:
+            chunks: Iterable of text chunks, or a file-like object with read()
+            chunk_size: Characters read per call when given a file-like object
+
+        Yields:
+            Cleaned text pieces
+        """
+        if hasattr(chunks, 'read'):
+            reader = chunks
+            chunks = iter(lambda: reader.read(chunk_size), '')
+
+        pages = _PageFilter()
+        carry = ''
+        emitted = False
+        for chunk in chunks:
+            if not chunk:
+                continue
+            buffer = carry + chunk
+            cut = self._safe_cut(buffer)
+            if cut <= 0:
+                carry = buffer
+                continue
+            carry = buffer[cut:]
+            piece = self._clean_block(buffer[:cut], pages)
+            if piece:
+                yield (' ' + piece) if emitted else piece
+                emitted = True
+
+        piece = self._clean_block(carry, pages, final=True)
+        if piece:
+            yield (' ' + piece) if emitted else piece
+
+    @staticmethod
+    def _slices(text, size=DEFAULT_CHUNK_SIZE):
+        for start in range(0, len(text), size):
+            yield text[start:start + size]
+
+    @staticmethod
+    def _safe_cut(buffer):
+        """Index after which the buffer may still continue (the last line, or a hyphenated pair)"""
+        cut = buffer.rfind('\n')
+        if cut < 0:
+            return 0
+        # Keep a line ending in a hyphen together with the line that completes the word
+        while cut > 0 and buffer[:cut].rstrip(' \t\r').endswith('-'):
+            cut = buffer.rfind('\n', 0, cut)
+        return cut
+
+    @staticmethod
+    def _clean_block(block, pages, final=False):
+        """Fix OCR artifacts, drop page numbers and repeated page-edge lines, and normalize characters"""
+        if _HAS_LIGATURE.search(block):
+            for ligature, letters in _LIGATURES:
+                block = block.replace(ligature, letters)
+        block = _HYPHENATION.sub('', block)
+
+        kept = []
+        segments = block.split('\f')
+        for index, segment in enumerate(segments):
+            if index:
+                pages.end_page(kept)
+            for line in segment.split('\n'):
+                pages.feed(line.rstrip('\r'), kept)
+        if final:
+            pages.end_page(kept, boundary=False)
+
+        return _DISALLOWED.sub(' ', '\n'.join(kept)).strip()
+
     def extract_sections(self, text):
         """
         Extract common sections from medical reports
-        
+
         Args:
             text: Medical report text
-            
+
         Returns:
             Dictionary with section names and content
         """
         sections = {}
-        
-        # Common section headers
-        section_patterns = {
-            'diagnosis': r'(?:diagnosis|diagnoses|dx)[:]\s*(.+?)(?=\n\n|\n[A-Z]|$)',
-            'medications': r'(?:medications|meds|prescription|rx)[:]\s*(.+?)(?=\n\n|\n[A-Z]|$)',
-            'test_results': r'(?:test results|lab results|findings)[:]\s*(.+?)(?=\n\n|\n[A-Z]|$)',
-            'recommendations': r'(?:recommendations|follow.?up|advice)[:]\s*(.+?)(?=\n\n|\n[A-Z]|$)'
-        }
-        
-        for section_name, pattern in section_patterns.items():
-            matches = re.findall(pattern, text, re.IGNORECASE | re.DOTALL)
-            if matches:
-                sections[section_name] = matches[0].strip()
-        
+
+        # Search a lower-cased copy when lowering keeps character offsets (always for ASCII)
+        lowered = text.lower()
+        if len(lowered) == len(text):
+            haystack, aliases = lowered, _SECTION_ALIASES
+        else:
+            haystack, aliases = text, _SECTION_ALIASES_ANY_CASE
+
+        for name, patterns in aliases.items():
+            position = 0
+            while True:
+                # Earliest header of this section from position onwards
+                matches = [match for match in (pattern.search(haystack, position) for pattern in patterns) if match]
+                if not matches:
+                    break
+                match = min(matches, key=lambda found: found.start())
+                content = self._section_content(text, match.end())
+                if content:
+                    sections[name] = content
+                    break
+                position = match.end()
+
         return sections
 
+    @staticmethod
+    def _section_content(text, start):
+        """Text after a header up to a blank line or a new line starting with a letter"""
+        while start < len(text) and text[start].isspace():
+            start += 1
+        if start >= len(text):
+            return ''
+        end = _SECTION_END.search(text, start + 1)
+        return text[start:end.start() if end else len(text)].strip()
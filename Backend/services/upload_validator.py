@@ -0,0 +1,280 @@
+"""
+Upload Validator - Checks uploads by content (magic bytes, image header dimensions) before any decoding
+"""
+
+import io
+import struct
+import hashlib
+from config import Config
+from utils.metrics import registry
+
+upload_rejections_total = registry.counter(
+    'medisense_upload_rejections_total', 'Uploads rejected before OCR, by reason', ('reason',)
+)
+uploads_validated_total = registry.counter(
+    'medisense_uploads_validated_total', 'Uploads accepted by content type', ('kind',)
+)
+
+# JPEG start-of-frame markers (SOF0-SOF15 without DHT, JPG and DAC)
+_JPEG_SOF = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+class UploadRejected(Exception):
+    """An upload failed validation; `reason` labels the metric, `status` is the HTTP status"""
+
+    def __init__(self, reason, message, status=400):
+        super().__init__(message)
+        self.reason = reason
+        self.status = status
+
+class _Truncated(Exception):
+    """The bytes seen so far end before the header does"""
+
+def sniff(head):
+    """
+    Content type from the first bytes of a file
+
+    Args:
+        head: Leading bytes (at least 1 KB when available)
+
+    Returns:
+        'pdf', 'png', 'jpeg', 'gif', 'bmp' or 'tiff', or None
+    """
+    if head.startswith(b'\x89PNG\r\n\x1a\n'):
+        return 'png'
+    if head.startswith(b'\xff\xd8\xff'):
+        return 'jpeg'
+    if head[:6] in (b'GIF87a', b'GIF89a'):
+        return 'gif'
+    if head.startswith(b'BM') and len(head) >= 26:
+        return 'bmp'
+    if head[:4] in (b'II*\x00', b'MM\x00*'):
+        return 'tiff'
+    # The PDF header may follow up to 1 KB of leading junk
+    if b'%PDF-' in head[:1024]:
+        return 'pdf'
+    return None
+
+def _read_at(fileobj, offset, size):
+    fileobj.seek(offset)
+    data = fileobj.read(size)
+    if len(data) < size:
+        raise _Truncated()
+    return data
+
+def _png_size(fileobj):
+    length, chunk = struct.unpack('>I4s', _read_at(fileobj, 8, 8))
+    if chunk != b'IHDR' or length < 8:
+        raise ValueError('PNG does not start with an IHDR chunk')
+    return struct.unpack('>II', _read_at(fileobj, 16, 8))
+
+def _gif_size(fileobj):
+    return struct.unpack('<HH', _read_at(fileobj, 6, 4))
+
+def _bmp_size(fileobj):
+    header_size = struct.unpack('<I', _read_at(fileobj, 14, 4))[0]
+    if header_size == 12:
+        return struct.unpack('<HH', _read_at(fileobj, 18, 4))
+    width, height = struct.unpack('<ii', _read_at(fileobj, 18, 8))
+    # Negative height means a top-down bitmap
+    return width, abs(height)
+
+def _jpeg_size(fileobj):
+    offset = 2
+    while True:
+        marker = _read_at(fileobj, offset, 2)
+        if marker[0] != 0xFF:
+            raise ValueError('JPEG marker expected')
+        code = marker[1]
+        if code == 0xFF:
+            # Fill byte
+            offset += 1
+            continue
+        if code == 0x01 or 0xD0 <= code <= 0xD7:
+            offset += 2
+            continue
+        if code in (0xD9, 0xDA):
+            raise ValueError('JPEG has no frame header before its image data')
+        length = struct.unpack('>H', _read_at(fileobj, offset + 2, 2))[0]
+        if code in _JPEG_SOF:
+            height, width = struct.unpack('>HH', _read_at(fileobj, offset + 5, 4))
+            return width, height
+        if length < 2:
+            raise ValueError('JPEG segment length is invalid')
+        offset += 2 + length
+
+def _tiff_size(fileobj):
+    order = '<' if _read_at(fileobj, 0, 2) == b'II' else '>'
+    ifd_offset = struct.unpack(order + 'I', _read_at(fileobj, 4, 4))[0]
+    count = struct.unpack(order + 'H', _read_at(fileobj, ifd_offset, 2))[0]
+    entries = _read_at(fileobj, ifd_offset + 2, 12 * count)
+    size = {}
+    for index in range(count):
+        tag, kind, _count, value = struct.unpack(order + 'HHI4s', entries[12 * index:12 * index + 12])
+        if tag in (256, 257):
+            # SHORT values sit in the first two bytes of the value field
+            size[tag] = struct.unpack(order + 'H', value[:2])[0] if kind == 3 else struct.unpack(order + 'I', value)[0]
+    if 256 not in size or 257 not in size:
+        raise ValueError('TIFF has no image dimensions')
+    return size[256], size[257]
+
+_SIZE_READERS = {'png': _png_size, 'gif': _gif_size, 'bmp': _bmp_size, 'jpeg': _jpeg_size, 'tiff': _tiff_size}
+
+class UploadValidator:
+    """
+    Validate an upload from its bytes rather than its filename
+
+    Only headers are read: the magic bytes decide the type, and the image header
+    gives the pixel dimensions, which are checked against UPLOAD_MAX_PIXELS
+    (decompression bombs are small files declaring huge images). Nothing is
+    decoded.
+    """
+
+    def __init__(self, max_pixels=None):
+        self.max_pixels = Config.UPLOAD_MAX_PIXELS if max_pixels is None else max_pixels
+
+    def inspect(self, fileobj, complete=True):
+        """
+        Check a file-like object (seekable)
+
+        Args:
+            fileobj: Upload contents
+            complete: Whether fileobj holds the whole upload; with only its first
+                      bytes, a header that runs past them leaves the verdict open
+
+        Returns:
+            Dictionary with 'kind', 'width', 'height' and 'pixels' (None for PDFs),
+            or None when complete is False and more bytes are needed
+
+        Raises:
+            UploadRejected: Empty, unknown type, unreadable header or over the pixel budget
+        """
+        fileobj.seek(0)
+        head = fileobj.read(1024)
+        if not head:
+            raise UploadRejected('empty', 'The uploaded file is empty')
+        kind = sniff(head)
+        if kind is None:
+            if not complete and len(head) < 1024:
+                return None
+            raise UploadRejected('unknown_type', 'File content is not a PDF or a supported image', 415)
+        info = {'kind': kind, 'width': None, 'height': None, 'pixels': None}
+        if kind == 'pdf':
+            return info
+
+        try:
+            width, height = _SIZE_READERS[kind](fileobj)
+        except _Truncated:
+            if not complete:
+                return None
+            raise UploadRejected('malformed', f'The {kind.upper()} header is incomplete')
+        except (ValueError, struct.error) as e:
+            raise UploadRejected('malformed', f'The {kind.upper()} header is invalid: {str(e)}')
+        if width <= 0 or height <= 0:
+            raise UploadRejected('malformed', f'The {kind.upper()} header declares an empty image')
+        pixels = width * height
+        if pixels > self.max_pixels:
+            raise UploadRejected(
+                'pixels', f'Image is {width}x{height} pixels; the limit is {self.max_pixels // 1_000_000} megapixels', 413
+            )
+        info.update({'width': width, 'height': height, 'pixels': pixels})
+        return info
+
+    def validate(self, file):
+        """
+        Validate an uploaded FileStorage, reusing the verdict reached while it streamed in
+
+        Args:
+            file: werkzeug FileStorage
+
+        Returns:
+            inspect() result
+
+        Raises:
+            UploadRejected: The upload must not be processed (counted by reason)
+        """
+        stream = file.stream
+        try:
+            rejection = getattr(stream, 'rejection', None)
+            if rejection is not None:
+                raise rejection
+            info = getattr(stream, 'verdict', None)
+            if info is None:
+                info = self.inspect(stream)
+            stream.seek(0)
+        except UploadRejected as e:
+            upload_rejections_total.inc(reason=e.reason)
+            raise
+        uploads_validated_total.inc(kind=info['kind'])
+        return info
+
+class ValidatingStream:
+    """
+    Upload stream that inspects the first UPLOAD_SNIFF_BYTES as they arrive
+
+    Once an upload is rejected, the rest of its bytes are read from the request
+    but not kept, so a renamed 16 MB file never reaches the disk in full. Every
+    byte received, kept or not, goes into `content_hash`, so a rejected upload
+    still has a stable fingerprint. Every other file method is delegated to the
+    underlying stream.
+    """
+
+    def __init__(self, target, validator, sniff_bytes=None):
+        self._target = target
+        self._validator = validator
+        self._sniff_bytes = Config.UPLOAD_SNIFF_BYTES if sniff_bytes is None else sniff_bytes
+        self._head = bytearray()
+        self._checked = False
+        self.verdict = None
+        self.rejection = None
+        self.discarded_bytes = 0
+        self.content_hash = hashlib.sha256()
+
+    def write(self, data):
+        self.content_hash.update(data)
+        if self.rejection is not None:
+            self.discarded_bytes += len(data)
+            return len(data)
+        if not self._checked:
+            self._head += data[:self._sniff_bytes - len(self._head)]
+            if len(self._head) >= self._sniff_bytes:
+                self._check()
+                if self.rejection is not None:
+                    self.discarded_bytes += len(data)
+                    return len(data)
+        return self._target.write(data)
+
+    def _check(self):
+        self._checked = True
+        try:
+            self.verdict = self._validator.inspect(io.BytesIO(bytes(self._head)), complete=False)
+        except UploadRejected as e:
+            self.rejection = e
+        self._head = bytearray()
+
+    def __getattr__(self, name):
+        return getattr(self._target, name)
+
+    def __iter__(self):
+        return iter(self._target)
+
+upload_validator = UploadValidator()
+
+def init_upload_validation(app):
+    """Stream uploads through ValidatingStream and answer oversized bodies with JSON 413s"""
+    from flask import Request, jsonify
+    from werkzeug.exceptions import RequestEntityTooLarge
+
+    class ValidatingRequest(Request):
+        def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+            target = super()._get_file_stream(total_content_length, content_type, filename, content_length)
+            return ValidatingStream(target, upload_validator)
+
+    app.request_class = ValidatingRequest
+
+    @app.errorhandler(RequestEntityTooLarge)
+    def _too_large(error):
+        upload_rejections_total.inc(reason='too_large')
+        return jsonify({
+            'success': False,
+            'error': f'Request body exceeds the {app.config["MAX_CONTENT_LENGTH"] // (1024 * 1024)} MB limit'
+        }), 413
@@ -0,0 +1,58 @@
+"""
+Test script for the lab parser
+Checks that doses and prose next to an analyte name are not read as lab results
+"""
+
+import os
+import sys
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from services.lab_parser import LabParser
+
+# Text that names an analyte but is not a lab result
+NOT_RESULTS = [
+    "Potassium 20 mEq PO daily",
+    "Calcium 600 mg twice daily",
+    "Vitamin D 1000 IU",
+    "ALT 3 times upper limit",
+    "Vitamin B12 1000 mcg IM monthly"
+]
+
+# (text, flag, critical warning expected)
+RESULTS = [
+    ("Potassium: 6.9 mmol/L (3.5-5.1) H", 'critical_high', True),
+    ("Glucose 110 mg/dL 70-99 H", 'high', False),
+    ("Glucose: 6.1 mmol/L", 'high', False),
+    ("INR 6.1", 'critical_high', True),
+    # Unitless values are only compared with a range printed in the report
+    ("Potassium 7.2", 'unknown', False),
+    ("Potassium 7.2 H", 'unknown', False),
+    ("Potassium 7.2 (3.5-5.1)", 'high', False)
+]
+
+def test_doses_are_not_results():
+    parser = LabParser()
+    for text in NOT_RESULTS:
+        results = parser.parse(text)
+        assert len(results) == 0, f"{text!r} parsed as {results.rows()}"
+
+def test_flags():
+    parser = LabParser()
+    for text, flag, critical in RESULTS:
+        results = parser.parse(text)
+        assert len(results) == 1, f"{text!r} parsed as {results.rows()}"
+        assert results['flag'][0] == flag, f"{text!r} flagged {results['flag'][0]}, expected {flag}"
+        assert bool(results.critical_warnings()) == critical, f"{text!r} warnings: {results.critical_warnings()}"
+
+if __name__ == '__main__':
+    failed = False
+    for test in (test_doses_are_not_results, test_flags):
+        try:
+            test()
+            print(f"✓ {test.__name__}")
+        except AssertionError as e:
+            failed = True
+            print(f"❌ {test.__name__}: {e}")
+    sys.exit(1 if failed else 0)
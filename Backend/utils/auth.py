@@ -0,0 +1,29 @@
+"""
+Auth Utility - Bearer token checks for operational endpoints and debug headers
+"""
+
+import hmac
+from config import Config
+
+def has_admin_token(request):
+    """
+    Whether a request carries the configured ADMIN_TOKEN as a Bearer token
+
+    Args:
+        request: Flask request
+
+    Returns:
+        False when no ADMIN_TOKEN is configured or the token does not match
+    """
+    return _bearer_matches(request, Config.ADMIN_TOKEN)
+
+def has_metrics_token(request):
+    """Whether a request carries METRICS_TOKEN (or ADMIN_TOKEN) as a Bearer token"""
+    return _bearer_matches(request, Config.METRICS_TOKEN) or has_admin_token(request)
+
+def _bearer_matches(request, expected):
+    if not expected:
+        return False
+    header = request.headers.get('Authorization', '')
+    token = header[7:] if header.startswith('Bearer ') else ''
+    return hmac.compare_digest(token.encode('utf-8'), expected.encode('utf-8'))
@@ -0,0 +1,73 @@
+"""
+Deadline Utility - Request-level time budgets shared by every downstream call
+"""
+
+import time
+import contextvars
+from contextlib import contextmanager
+from config import Config
+
+_current_deadline = contextvars.ContextVar('medisense_request_deadline', default=None)
+
+class DeadlineExceeded(Exception):
+    """The request ran out of time before the work could complete"""
+
+class Deadline:
+    """Absolute point in time (monotonic clock) by which a request must finish"""
+
+    def __init__(self, seconds):
+        self.budget = float(seconds)
+        self.expires_at = time.monotonic() + self.budget
+
+    def remaining(self):
+        """Seconds left, never negative"""
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self):
+        return self.remaining() <= 0.0
+
+    def check(self, what='request'):
+        """Raise DeadlineExceeded if no time is left"""
+        if self.expired():
+            raise DeadlineExceeded(f"Deadline of {self.budget:.1f}s exceeded before {what}")
+
+def current_deadline():
+    """Deadline of the request being served on this context, or None"""
+    return _current_deadline.get()
+
+@contextmanager
+def request_deadline(seconds):
+    """
+    Run a block under a deadline; nested deadlines can only shorten the outer one
+
+    Args:
+        seconds: Time budget for the block
+    """
+    deadline = Deadline(seconds)
+    outer = _current_deadline.get()
+    if outer is not None and outer.expires_at < deadline.expires_at:
+        deadline = outer
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
+
+def init_request_deadline(app):
+    """Start a REQUEST_DEADLINE_SECONDS budget for every request"""
+    from flask import g
+
+    @app.before_request
+    def _start_deadline():
+        if Config.REQUEST_DEADLINE_SECONDS > 0:
+            g._deadline_token = _current_deadline.set(Deadline(Config.REQUEST_DEADLINE_SECONDS))
+
+    @app.teardown_request
+    def _clear_deadline(error=None):
+        token = g.pop('_deadline_token', None)
+        if token is not None:
+            try:
+                _current_deadline.reset(token)
+            except ValueError:
+                # Token created in a different context (e.g. streamed response); just clear it
+                _current_deadline.set(None)
@@ -0,0 +1,253 @@
+"""
+Idempotency Utility - Replays stored responses for retried requests carrying an Idempotency-Key
+"""
+
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+import functools
+from config import Config
+from utils.metrics import registry
+from utils.deadline import current_deadline
+
+idempotency_requests_total = registry.counter(
+    'medisense_idempotency_requests_total',
+    'Requests with an Idempotency-Key by outcome (executed, replayed, attached, in_progress, mismatch, invalid)',
+    ('endpoint', 'outcome')
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS idempotent_responses (
+    request_key TEXT PRIMARY KEY,
+    fingerprint TEXT NOT NULL,
+    state TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    status INTEGER,
+    content_type TEXT,
+    body BLOB
+)
+"""
+
+MAX_KEY_LENGTH = 255
+REPLAY_HEADER = 'Idempotent-Replayed'
+_POLL_SECONDS = 0.25
+# A pending claim outlives the request deadline by this much, then a retry may take it over
+_LEASE_MARGIN_SECONDS = 30.0
+
+class IdempotencyStore:
+    """
+    SQLite store of responses keyed by endpoint and Idempotency-Key
+
+    A request first claims its key ('pending'), then stores the finished response
+    ('done') for IDEMPOTENCY_TTL_SECONDS. Claims of a worker that died lapse once
+    the request deadline has passed. Retries served by the same process wake up
+    as soon as the original finishes; other workers poll the store.
+    """
+
+    def __init__(self, path=None, ttl_seconds=None):
+        self.path = path or Config.IDEMPOTENCY_STORE_PATH
+        self.ttl_seconds = Config.IDEMPOTENCY_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        self._local = threading.local()
+        self._events = {}
+        self._lock = threading.Lock()
+
+    def _connection(self):
+        """Per-thread connection, reopened after a fork"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=5)
+            # WAL lets gunicorn workers read while another one writes
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute(_SCHEMA)
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def claim(self, request_key, fingerprint, lease_seconds):
+        """
+        Claim a key for execution, or find what already happened to it
+
+        Args:
+            request_key: Endpoint-scoped key (see request_key())
+            fingerprint: Hash of the request body
+            lease_seconds: How long the claim holds if never completed
+
+        Returns:
+            Tuple (state, record): 'claimed' (run the request), 'done' (record holds
+            'status', 'content_type' and 'body'), 'pending' (another request is
+            running it) or 'mismatch' (the key was used for a different request)
+        """
+        now = time.time()
+        connection = self._connection()
+        with connection:
+            # BEGIN IMMEDIATE makes check-and-claim atomic across workers
+            connection.execute('BEGIN IMMEDIATE')
+            row = connection.execute(
+                'SELECT fingerprint, state, status, content_type, body FROM idempotent_responses '
+                'WHERE request_key = ? AND expires_at > ?', (request_key, now)
+            ).fetchone()
+            if row is not None:
+                stored_fingerprint, state, status, content_type, body = row
+                if stored_fingerprint != fingerprint:
+                    return 'mismatch', None
+                if state == 'done':
+                    return 'done', {'status': status, 'content_type': content_type, 'body': body}
+                return 'pending', None
+            connection.execute(
+                'INSERT OR REPLACE INTO idempotent_responses VALUES (?, ?, ?, ?, ?, NULL, NULL, NULL)',
+                (request_key, fingerprint, 'pending', now, now + lease_seconds)
+            )
+        with self._lock:
+            self._events[request_key] = threading.Event()
+        return 'claimed', None
+
+    def complete(self, request_key, status, content_type, body):
+        """Store the finished response of a claimed key and wake up waiting retries"""
+        now = time.time()
+        connection = self._connection()
+        with connection:
+            connection.execute(
+                "UPDATE idempotent_responses SET state = 'done', expires_at = ?, status = ?, content_type = ?, body = ? "
+                "WHERE request_key = ?", (now + self.ttl_seconds, status, content_type, body, request_key)
+            )
+            connection.execute('DELETE FROM idempotent_responses WHERE expires_at <= ?', (now,))
+        self._wake(request_key)
+
+    def release(self, request_key):
+        """Drop the claim of a request whose response should not be replayed (a waiting retry runs it instead)"""
+        connection = self._connection()
+        with connection:
+            connection.execute("DELETE FROM idempotent_responses WHERE request_key = ? AND state = 'pending'", (request_key,))
+        self._wake(request_key)
+
+    def wait(self, request_key, seconds):
+        """Sleep until the key's in-process owner finishes, or at most `seconds`"""
+        with self._lock:
+            event = self._events.get(request_key)
+        if event is not None:
+            event.wait(seconds)
+        else:
+            time.sleep(seconds)
+
+    def _wake(self, request_key):
+        with self._lock:
+            event = self._events.pop(request_key, None)
+        if event is not None:
+            event.set()
+
+def request_key(endpoint, key):
+    """Store key for an Idempotency-Key sent to an endpoint"""
+    return hashlib.sha256(f"{endpoint}\x1f{key}".encode('utf-8')).hexdigest()
+
+def request_fingerprint(request):
+    """Hash of what a request asks for (form fields and file contents, or the raw body)"""
+    digest = hashlib.sha256(request.method.encode('utf-8'))
+    if request.mimetype in ('multipart/form-data', 'application/x-www-form-urlencoded'):
+        for name, value in sorted(request.form.items(multi=True)):
+            digest.update(f"\x1f{name}={value}".encode('utf-8'))
+        for name, storage in sorted(request.files.items(multi=True), key=lambda item: item[0]):
+            digest.update(f"\x1f{name}:{storage.filename}:".encode('utf-8'))
+            # A ValidatingStream hashed the upload as it arrived, including the
+            # bytes it discarded after rejecting it
+            content_hash = getattr(storage.stream, 'content_hash', None)
+            if content_hash is not None:
+                digest.update(content_hash.digest())
+                continue
+            file_hash = hashlib.sha256()
+            for chunk in iter(lambda: storage.stream.read(65536), b''):
+                file_hash.update(chunk)
+            storage.stream.seek(0)
+            digest.update(file_hash.digest())
+    else:
+        digest.update(request.get_data())
+    return digest.hexdigest()
+
+def _replayable(response):
+    """Only final answers are stored: no server errors, degraded fallbacks or unparsed placeholders"""
+    if response.status_code >= 500 or response.direct_passthrough or response.is_streamed:
+        return False
+    payload = response.get_json(silent=True)
+    return not (isinstance(payload, dict) and (payload.get('degraded') or payload.get('parse_failed')))
+
+def idempotent(view):
+    """
+    Make a POST view safe to retry with an Idempotency-Key header
+
+    A request with a key is run once per endpoint and key. A retry gets the stored
+    response (with an Idempotent-Replayed header), or waits for the original while
+    it is still running. Requests without a key are not affected.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        from flask import request, jsonify, make_response
+
+        key = request.headers.get(Config.IDEMPOTENCY_HEADER)
+        if not Config.IDEMPOTENCY_ENABLED or not key:
+            return view(*args, **kwargs)
+
+        endpoint = request.url_rule.rule if request.url_rule else request.path
+        if len(key) > MAX_KEY_LENGTH:
+            idempotency_requests_total.inc(endpoint=endpoint, outcome='invalid')
+            return jsonify({
+                'success': False,
+                'error': f'{Config.IDEMPOTENCY_HEADER} must be at most {MAX_KEY_LENGTH} characters'
+            }), 400
+
+        store_key = request_key(endpoint, key)
+        fingerprint = request_fingerprint(request)
+        deadline = current_deadline()
+        wait_seconds = Config.IDEMPOTENCY_WAIT_SECONDS
+        lease_seconds = (deadline.remaining() if deadline else Config.REQUEST_DEADLINE_SECONDS or 300) + _LEASE_MARGIN_SECONDS
+        if deadline is not None:
+            wait_seconds = min(wait_seconds, deadline.remaining())
+        give_up_at = time.monotonic() + wait_seconds
+        waited = False
+
+        while True:
+            state, record = idempotency_store.claim(store_key, fingerprint, lease_seconds)
+            if state == 'claimed':
+                break
+            if state == 'mismatch':
+                idempotency_requests_total.inc(endpoint=endpoint, outcome='mismatch')
+                return jsonify({
+                    'success': False,
+                    'error': f'{Config.IDEMPOTENCY_HEADER} was already used for a different request'
+                }), 422
+            if state == 'done':
+                idempotency_requests_total.inc(endpoint=endpoint, outcome='attached' if waited else 'replayed')
+                response = make_response(record['body'], record['status'])
+                response.content_type = record['content_type']
+                response.headers[REPLAY_HEADER] = 'true'
+                return response
+            remaining = give_up_at - time.monotonic()
+            if remaining <= 0:
+                idempotency_requests_total.inc(endpoint=endpoint, outcome='in_progress')
+                return jsonify({
+                    'success': False,
+                    'error': f'A request with this {Config.IDEMPOTENCY_HEADER} is still in progress'
+                }), 409, {'Retry-After': '1'}
+            waited = True
+            idempotency_store.wait(store_key, min(_POLL_SECONDS, remaining))
+
+        idempotency_requests_total.inc(endpoint=endpoint, outcome='executed')
+        try:
+            response = make_response(view(*args, **kwargs))
+        except BaseException:
+            idempotency_store.release(store_key)
+            raise
+        if _replayable(response):
+            idempotency_store.complete(store_key, response.status_code, response.content_type, response.get_data())
+        else:
+            idempotency_store.release(store_key)
+        return response
+
+    return wrapper
+
+# Shared by every idempotent route in the process
+idempotency_store = IdempotencyStore()
@@ -0,0 +1,248 @@
+"""
+Metrics Utility - Lightweight Prometheus-compatible counters, gauges and histograms
+"""
+
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+from utils.profiling import record_stage
+
+# Latency buckets (seconds) spanning sub-millisecond regex work to slow LLM calls
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+class _Metric:
+    """Base class holding per-label-set values behind a lock"""
+
+    metric_type = 'untyped'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._render_sample(key, value))
+        return lines
+
+    def _render_sample(self, key, value):
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"]
+
+class Counter(_Metric):
+    """Monotonically increasing count"""
+
+    metric_type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+class Gauge(_Metric):
+    """Value that can go up and down (e.g. requests in flight)"""
+
+    metric_type = 'gauge'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram of observations"""
+
+    metric_type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # [per-bucket counts (+Inf last), sum, count]
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def snapshot(self, **labels):
+        """Return (bucket upper bounds, cumulative counts, sum, count) for one label set"""
+        with self._lock:
+            state = self._values.get(self._key(labels))
+            if state is None:
+                return self.buckets, [0] * len(self.buckets), 0.0, 0
+            counts, total, count = list(state[0]), state[1], state[2]
+        cumulative = []
+        running = 0
+        for bucket_count in counts[:-1]:
+            running += bucket_count
+            cumulative.append(running)
+        return self.buckets, cumulative, total, count
+
+    def _render_sample(self, key, value):
+        counts, total, count = value
+        lines = []
+        running = 0
+        for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+            running += bucket_count
+            le = f'le="{_format_value(float(bound))}"'
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {running}")
+        lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+        lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+class MetricsRegistry:
+    """Collection of metrics rendered together in Prometheus text exposition format"""
+
+    CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+# Process-wide registry and the pipeline metrics shared by all services
+registry = MetricsRegistry()
+
+STAGE_LABELS = ('stage', 'provider', 'model')
+
+stage_duration = registry.histogram(
+    'medisense_stage_duration_seconds', 'Latency of backend pipeline stages', STAGE_LABELS
+)
+stage_total = registry.counter(
+    'medisense_stage_total', 'Pipeline stage executions by outcome', STAGE_LABELS + ('status',)
+)
+stage_in_flight = registry.gauge(
+    'medisense_stage_in_flight', 'Pipeline stages currently executing', ('stage',)
+)
+http_request_duration = registry.histogram(
+    'medisense_http_request_duration_seconds', 'HTTP request latency', ('endpoint', 'method')
+)
+http_requests_total = registry.counter(
+    'medisense_http_requests_total', 'HTTP requests by status code', ('endpoint', 'method', 'status')
+)
+http_requests_in_flight = registry.gauge(
+    'medisense_http_requests_in_flight', 'HTTP requests currently being served', ()
+)
+
+@contextmanager
+def track_stage(stage, provider='', model=''):
+    """
+    Time a pipeline stage and record its latency, outcome and concurrency
+
+    Args:
+        stage: Stage name (e.g. 'ocr', 'llm_call')
+        provider: Provider or engine label
+        model: Model label
+    """
+    stage_in_flight.inc(stage=stage)
+    started = time.perf_counter()
+    status = 'ok'
+    try:
+        yield
+    except BaseException:
+        status = 'error'
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        stage_in_flight.dec(stage=stage)
+        stage_duration.observe(elapsed, stage=stage, provider=provider, model=model)
+        stage_total.inc(stage=stage, provider=provider, model=model, status=status)
+        record_stage(stage, elapsed)
+
+def init_request_metrics(app):
+    """Register Flask hooks recording per-endpoint HTTP latency and status counts"""
+    from flask import g, request
+
+    @app.before_request
+    def _start_request_timer():
+        g._metrics_started = time.perf_counter()
+        http_requests_in_flight.inc()
+
+    @app.teardown_request
+    def _finish_request_metrics(error=None):
+        started = g.pop('_metrics_started', None)
+        if started is not None:
+            http_requests_in_flight.dec()
+            http_request_duration.observe(
+                time.perf_counter() - started,
+                endpoint=request.url_rule.rule if request.url_rule else 'unmatched',
+                method=request.method
+            )
+
+    @app.after_request
+    def _count_response(response):
+        http_requests_total.inc(
+            endpoint=request.url_rule.rule if request.url_rule else 'unmatched',
+            method=request.method,
+            status=response.status_code
+        )
+        return response
@@ -0,0 +1,39 @@
+"""
+Pattern Utility - Builds fast regular expressions for large word lists
+"""
+
+import re
+
+def trie_pattern(words, separator=r'[\s-]+'):
+    """
+    Compile words into one regex shaped like a prefix trie
+
+    A flat alternation tries every word at every position; the trie shares
+    prefixes, so the C regex engine does far less backtracking. Greedy optional
+    continuations make matches leftmost-longest ("insulin glargine" over "insulin").
+    A space inside a word matches any run of whitespace or hyphens (separator).
+
+    Args:
+        words: Iterable of lower-case words or phrases
+        separator: Regex source a space inside a word stands for
+
+    Returns:
+        Regex source (no anchors or word boundaries)
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = True
+
+    def emit(node):
+        branches = [(separator if char == ' ' else re.escape(char)) + emit(child)
+                    for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        # A word ending here may also continue into a longer one
+        return f'(?:{body})?' if '' in node else body
+
+    return emit(trie)
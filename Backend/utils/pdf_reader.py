@@ -24,26 +24,26 @@ class PDFReader:
         Returns:
             Extracted text string
         """
+        # Combine all pages; the form feed marks page breaks for TextCleaner's letterhead/footer detection
+        return '\n\f\n'.join(text for text in self.extract_pages(pdf_path) if text)
+    
+    def extract_pages(self, pdf_path):
+        """
+        Extract text from each page of a PDF file
+        
+        Args:
+            pdf_path: Path to PDF file
+            
+        Returns:
+            List of page texts in page order ('' for pages without a text layer)
+        """
         if not os.path.exists(pdf_path):
             raise FileNotFoundError(f"PDF file not found: {pdf_path}")
         
         try:
-            text_content = []
-            
             with open(pdf_path, 'rb') as file:
                 pdf_reader = self.PyPDF2.PdfReader(file)
-                
-                # Extract text from all pages
-                for page_num in range(len(pdf_reader.pages)):
-                    page = pdf_reader.pages[page_num]
-                    text = page.extract_text()
-                    if text:
-                        text_content.append(text)
-            
-            # Combine all pages
-            full_text = '\n\n'.join(text_content)
-            
-            return full_text
+                return [page.extract_text() or '' for page in pdf_reader.pages]
             
         except Exception as e:
             raise Exception(f"PDF extraction failed: {str(e)}")
@@ -0,0 +1,145 @@
+"""
+Profiling Utility - Opt-in per-request stage timing and cProfile dumps
+"""
+
+import os
+import time
+import uuid
+import random
+import threading
+import contextvars
+from config import Config
+from utils.auth import has_admin_token
+
+_current_profile = contextvars.ContextVar('medisense_request_profile', default=None)
+
+# cProfile can only have one active profiler per process on recent Python versions
+_cprofile_lock = threading.Lock()
+
+class RequestProfile:
+    """Stage timings collected while serving one request"""
+
+    def __init__(self):
+        self.id = uuid.uuid4().hex[:12]
+        self.started = time.perf_counter()
+        self.stages = {}
+        self.profiler = None
+        self._lock = threading.Lock()
+
+    def add(self, stage, duration):
+        with self._lock:
+            total, count = self.stages.get(stage, (0.0, 0))
+            self.stages[stage] = (total + duration, count + 1)
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def breakdown(self):
+        """JSON-friendly timing breakdown in milliseconds"""
+        with self._lock:
+            stages = dict(self.stages)
+        return {
+            'profile_id': self.id,
+            'total_ms': round(self.elapsed() * 1000, 2),
+            'stages': {
+                stage: {'ms': round(total * 1000, 2), 'count': count}
+                for stage, (total, count) in stages.items()
+            }
+        }
+
+    def server_timing(self):
+        """Server-Timing header value (https://www.w3.org/TR/server-timing/)"""
+        with self._lock:
+            stages = dict(self.stages)
+        entries = [f"{stage};dur={total * 1000:.2f}" for stage, (total, _) in stages.items()]
+        entries.append(f"total;dur={self.elapsed() * 1000:.2f}")
+        return ', '.join(entries)
+
+def current_profile():
+    """Profile of the request being served on this context, or None"""
+    return _current_profile.get()
+
+def record_stage(stage, duration):
+    """Attach a stage duration to the active request profile (no-op when profiling is off)"""
+    profile = _current_profile.get()
+    if profile is not None:
+        profile.add(stage, duration)
+
+def _should_profile(request):
+    header = request.headers.get(Config.PROFILING_HEADER, '').lower()
+    if Config.PROFILING_ALLOW_HEADER and header in ('1', 'true', 'yes'):
+        # Stage timings and .pstats dumps are internal; only admins may ask for them
+        if has_admin_token(request) or (Config.DEBUG and not Config.ADMIN_TOKEN):
+            return True
+    return Config.PROFILING_ENABLED and random.random() < Config.PROFILING_SAMPLE_RATE
+
+def _dump_stats(profile, request):
+    import pstats
+
+    os.makedirs(Config.PROFILE_DUMP_DIR, exist_ok=True)
+    endpoint = (request.endpoint or 'unknown').replace('.', '_')
+    filename = f"{time.strftime('%Y%m%d-%H%M%S')}_{endpoint}_{profile.id}.pstats"
+    path = os.path.join(Config.PROFILE_DUMP_DIR, filename)
+    pstats.Stats(profile.profiler).dump_stats(path)
+    return path
+
+def init_profiling(app):
+    """Register Flask hooks that profile sampled requests"""
+    from flask import request
+
+    @app.before_request
+    def _start_profile():
+        if not _should_profile(request):
+            return
+        profile = RequestProfile()
+        profile.token = _current_profile.set(profile)
+
+        if Config.PROFILE_DUMP and _cprofile_lock.acquire(blocking=False):
+            import cProfile
+            profile.profiler = cProfile.Profile()
+            try:
+                profile.profiler.enable()
+            except ValueError:
+                # Another profiler (e.g. a debugger) is already active
+                profile.profiler = None
+                _cprofile_lock.release()
+
+    @app.after_request
+    def _attach_timing(response):
+        profile = _current_profile.get()
+        if profile is None:
+            return response
+
+        if profile.profiler is not None:
+            profile.profiler.disable()
+            try:
+                response.headers['X-Profile-Dump'] = os.path.basename(_dump_stats(profile, request))
+            except Exception as e:
+                print(f"Profile dump failed: {str(e)}")
+            finally:
+                profile.profiler = None
+                _cprofile_lock.release()
+
+        response.headers['Server-Timing'] = profile.server_timing()
+        response.headers['X-Profile-Id'] = profile.id
+
+        if response.is_json and not response.direct_passthrough:
+            payload = response.get_json(silent=True)
+            if isinstance(payload, dict):
+                payload['timing'] = profile.breakdown()
+                response.set_data(app.json.dumps(payload))
+        return response
+
+    @app.teardown_request
+    def _end_profile(error=None):
+        profile = _current_profile.get()
+        if profile is None:
+            return
+        if profile.profiler is not None:
+            profile.profiler.disable()
+            profile.profiler = None
+            _cprofile_lock.release()
+        try:
+            _current_profile.reset(profile.token)
+        except ValueError:
+            _current_profile.set(None)
@@ -0,0 +1,73 @@
+"""
+Token Counter Utility - Estimates LLM token counts for prompt budgeting
+"""
+
+import math
+
+class TokenCounter:
+    """Utility class for estimating how many tokens a piece of text costs"""
+    
+    # Rough average for English medical text with BPE tokenizers
+    CHARS_PER_TOKEN = 4
+    
+    _encoding = None
+    _encoding_checked = False
+    
+    @classmethod
+    def _get_encoding(cls):
+        """Load tiktoken encoding once if the package is installed"""
+        if not cls._encoding_checked:
+            cls._encoding_checked = True
+            try:
+                import tiktoken
+                cls._encoding = tiktoken.get_encoding('cl100k_base')
+            except Exception:
+                cls._encoding = None
+        return cls._encoding
+    
+    @classmethod
+    def estimate(cls, text):
+        """
+        Estimate the number of tokens in text
+        
+        Args:
+            text: Text to measure
+            
+        Returns:
+            Estimated token count (int)
+        """
+        if not text:
+            return 0
+        
+        encoding = cls._get_encoding()
+        if encoding is not None:
+            return len(encoding.encode(text, disallowed_special=()))
+        
+        return int(math.ceil(len(text) / cls.CHARS_PER_TOKEN))
+    
+    @classmethod
+    def truncate(cls, text, max_tokens):
+        """
+        Truncate text so that it fits into max_tokens, preferring sentence boundaries
+        
+        Args:
+            text: Text to truncate
+            max_tokens: Token budget
+            
+        Returns:
+            Truncated text (may be empty)
+        """
+        if max_tokens <= 0 or not text:
+            return ""
+        if cls.estimate(text) <= max_tokens:
+            return text
+        
+        cut = text[:max_tokens * cls.CHARS_PER_TOKEN]
+        while cut and cls.estimate(cut) > max_tokens:
+            cut = cut[:int(len(cut) * 0.9)]
+        
+        # Prefer to end on a full sentence when one is available
+        boundary = max(cut.rfind('. '), cut.rfind('.\n'))
+        if boundary > len(cut) // 2:
+            cut = cut[:boundary + 1]
+        return cut.strip()
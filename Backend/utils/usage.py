@@ -0,0 +1,259 @@
+"""
+Usage Utility - LLM token usage and cost accounting per request, endpoint, provider and model
+"""
+
+import time
+import threading
+import contextvars
+from collections import deque
+from config import Config
+from utils.metrics import registry
+
+_current_usage = contextvars.ContextVar('medisense_request_usage', default=None)
+
+# Prompt sizes (tokens) that latency is broken down by in the usage summary
+PROMPT_SIZE_BANDS = (500, 1000, 2000, 4000, 8000, 16000)
+_TOKEN_BUCKETS = (250, 500, 1000, 2000, 4000, 8000, 16000, 32000, 64000, 128000)
+
+llm_tokens_total = registry.counter(
+    'medisense_llm_tokens_total', 'LLM tokens by endpoint, provider and model (source: reported or estimated)',
+    ('endpoint', 'provider', 'model', 'type', 'source')
+)
+llm_cost_total = registry.counter(
+    'medisense_llm_cost_usd_total', 'Estimated LLM spend in USD (list prices or LLM_MODEL_PRICES)', ('endpoint', 'provider', 'model')
+)
+llm_calls_total = registry.counter(
+    'medisense_llm_calls_total', 'LLM provider calls, including retries, hedges and failovers', ('endpoint', 'provider', 'model', 'status')
+)
+llm_prompt_tokens = registry.histogram(
+    'medisense_llm_prompt_tokens', 'Prompt tokens per LLM call', ('endpoint', 'provider', 'model'), buckets=_TOKEN_BUCKETS
+)
+request_llm_tokens = registry.histogram(
+    'medisense_request_llm_tokens', 'Prompt plus completion tokens consumed per HTTP request', ('endpoint',), buckets=_TOKEN_BUCKETS
+)
+
+# List prices in USD per million (input, output) tokens; LLM_MODEL_PRICES adds or overrides entries
+_MODEL_PRICES = {
+    'gemini-pro': (0.50, 1.50),
+    'gemini-1.5-pro': (1.25, 5.00),
+    'gemini-1.5-flash': (0.075, 0.30),
+    'gemini-2.0-flash': (0.10, 0.40),
+    'gemini-2.0-flash-lite': (0.075, 0.30),
+    'gemini-2.5-flash-lite': (0.10, 0.40),
+    'gemini-2.5-flash': (0.30, 2.50),
+    'gemini-2.5-pro': (1.25, 10.00),
+    'gpt-3.5-turbo': (0.50, 1.50),
+    'gpt-4o-mini': (0.15, 0.60),
+    'gpt-4o': (2.50, 10.00),
+    'llama-3.1-70b-versatile': (0.59, 0.79),
+    'llama-3.3-70b-versatile': (0.59, 0.79),
+    'llama-3.1-8b-instant': (0.05, 0.08),
+    'mock-medisense': (0.50, 1.50),
+    'mock-medisense-small': (0.05, 0.08)
+}
+
+def _parse_prices(spec):
+    """'model=input/output,...' (USD per million tokens) -> {model: (input, output)}"""
+    prices = {}
+    for entry in spec.split(','):
+        model, _, price = entry.partition('=')
+        input_price, _, output_price = price.partition('/')
+        try:
+            prices[model.strip()] = (float(input_price), float(output_price or input_price))
+        except ValueError:
+            if entry.strip():
+                print(f"Warning: Ignoring malformed LLM_MODEL_PRICES entry '{entry.strip()}'")
+    return prices
+
+_PRICE_OVERRIDES = _parse_prices(Config.LLM_MODEL_PRICES)
+
+def model_price(model):
+    """(input, output) USD per million tokens for a model, or (0.0, 0.0) when unknown"""
+    return _PRICE_OVERRIDES.get(model) or _MODEL_PRICES.get(model, (0.0, 0.0))
+
+def call_cost(model, prompt_tokens, completion_tokens):
+    """Estimated USD cost of one call"""
+    input_price, output_price = model_price(model)
+    return (prompt_tokens * input_price + completion_tokens * output_price) / 1e6
+
+def _band(prompt_tokens):
+    """Label of the prompt-size band a call falls in (e.g. '1000-2000')"""
+    lower = 0
+    for upper in PROMPT_SIZE_BANDS:
+        if prompt_tokens <= upper:
+            return f"{lower}-{upper}"
+        lower = upper
+    return f">{lower}"
+
+class RequestUsage:
+    """LLM calls made while serving one request"""
+
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cost_usd = 0.0
+        self.estimated = False
+        self._lock = threading.Lock()
+
+    def add(self, prompt_tokens, completion_tokens, cost, reported):
+        with self._lock:
+            self.calls += 1
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+            self.cost_usd += cost
+            self.estimated = self.estimated or not reported
+
+    def summary(self):
+        """JSON-friendly totals for the response body"""
+        with self._lock:
+            return {
+                'llm_calls': self.calls,
+                'prompt_tokens': self.prompt_tokens,
+                'completion_tokens': self.completion_tokens,
+                'total_tokens': self.prompt_tokens + self.completion_tokens,
+                'cost_usd': round(self.cost_usd, 6),
+                'estimated': self.estimated
+            }
+
+class UsageStats:
+    """Process-wide usage totals and recent (prompt tokens, latency) samples per endpoint/provider/model"""
+
+    def __init__(self, window=None):
+        self.window = window or Config.USAGE_STATS_WINDOW
+        self.started = time.time()
+        self._totals = {}
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, key, prompt_tokens, completion_tokens, latency, cost, reported, ok):
+        with self._lock:
+            totals = self._totals.get(key)
+            if totals is None:
+                totals = self._totals[key] = {
+                    'calls': 0, 'errors': 0, 'prompt_tokens': 0, 'completion_tokens': 0,
+                    'reported_calls': 0, 'cost_usd': 0.0, 'latency_s': 0.0
+                }
+                self._samples[key] = deque(maxlen=self.window)
+            totals['calls'] += 1
+            if not ok:
+                totals['errors'] += 1
+                return
+            totals['prompt_tokens'] += prompt_tokens
+            totals['completion_tokens'] += completion_tokens
+            totals['reported_calls'] += 1 if reported else 0
+            totals['cost_usd'] += cost
+            totals['latency_s'] += latency
+            self._samples[key].append((prompt_tokens, completion_tokens, latency))
+
+    @staticmethod
+    def _percentile(ordered, fraction):
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    def summary(self):
+        """
+        Usage per endpoint/provider/model with latency by prompt-size band
+
+        Returns:
+            Dictionary with 'since' (unix time), overall 'totals' and a 'breakdown' list
+        """
+        with self._lock:
+            totals = {key: dict(value) for key, value in self._totals.items()}
+            samples = {key: list(value) for key, value in self._samples.items()}
+
+        breakdown = []
+        overall = {'calls': 0, 'errors': 0, 'prompt_tokens': 0, 'completion_tokens': 0, 'cost_usd': 0.0}
+        for (endpoint, provider, model), value in sorted(totals.items()):
+            succeeded = value['calls'] - value['errors']
+            bands = {}
+            for prompt_tokens, completion_tokens, latency in samples[(endpoint, provider, model)]:
+                bands.setdefault(_band(prompt_tokens), []).append((latency, prompt_tokens, completion_tokens))
+            by_prompt_size = []
+            for label in sorted(bands, key=lambda name: float(name.lstrip('>').split('-')[0])):
+                entries = bands[label]
+                latencies = sorted(entry[0] for entry in entries)
+                by_prompt_size.append({
+                    'prompt_tokens': label,
+                    'calls': len(entries),
+                    'avg_prompt_tokens': round(sum(entry[1] for entry in entries) / len(entries)),
+                    'avg_completion_tokens': round(sum(entry[2] for entry in entries) / len(entries)),
+                    'p50_ms': round(self._percentile(latencies, 0.50) * 1000, 1),
+                    'p95_ms': round(self._percentile(latencies, 0.95) * 1000, 1)
+                })
+            breakdown.append({
+                'endpoint': endpoint,
+                'provider': provider,
+                'model': model,
+                'calls': value['calls'],
+                'errors': value['errors'],
+                'prompt_tokens': value['prompt_tokens'],
+                'completion_tokens': value['completion_tokens'],
+                'reported_share': round(value['reported_calls'] / succeeded, 3) if succeeded else None,
+                'avg_prompt_tokens': round(value['prompt_tokens'] / succeeded) if succeeded else None,
+                'avg_latency_ms': round(value['latency_s'] / succeeded * 1000, 1) if succeeded else None,
+                'cost_usd': round(value['cost_usd'], 6),
+                'by_prompt_size': by_prompt_size
+            })
+            for field in overall:
+                overall[field] += value[field]
+        overall['cost_usd'] = round(overall['cost_usd'], 6)
+        overall['total_tokens'] = overall['prompt_tokens'] + overall['completion_tokens']
+        return {'since': round(self.started, 3), 'totals': overall, 'breakdown': breakdown}
+
+usage_stats = UsageStats()
+
+def current_usage():
+    """Usage of the request being served on this context, or None"""
+    return _current_usage.get()
+
+def record_llm_usage(provider, model, prompt_tokens, completion_tokens, latency, reported, ok=True):
+    """
+    Account for one provider call (every attempt, hedge and failover is a call)
+
+    Args:
+        provider: Provider name
+        model: Model name
+        prompt_tokens: Prompt tokens (provider-reported or estimated)
+        completion_tokens: Completion tokens (provider-reported or estimated)
+        latency: Seconds the call took
+        reported: Whether the counts came from the provider
+        ok: Whether the call succeeded (failed calls are counted without tokens)
+    """
+    usage = _current_usage.get()
+    endpoint = usage.endpoint if usage is not None else 'background'
+    llm_calls_total.inc(endpoint=endpoint, provider=provider, model=model, status='ok' if ok else 'error')
+    cost = call_cost(model, prompt_tokens, completion_tokens) if ok else 0.0
+    usage_stats.record((endpoint, provider, model), prompt_tokens, completion_tokens, latency, cost, reported, ok)
+    if not ok:
+        return
+    source = 'reported' if reported else 'estimated'
+    llm_tokens_total.inc(prompt_tokens, endpoint=endpoint, provider=provider, model=model, type='prompt', source=source)
+    llm_tokens_total.inc(completion_tokens, endpoint=endpoint, provider=provider, model=model, type='completion', source=source)
+    llm_cost_total.inc(cost, endpoint=endpoint, provider=provider, model=model)
+    llm_prompt_tokens.observe(prompt_tokens, endpoint=endpoint, provider=provider, model=model)
+    if usage is not None:
+        usage.add(prompt_tokens, completion_tokens, cost, reported)
+
+def init_usage_tracking(app):
+    """Collect LLM usage per request and record per-request token totals"""
+    from flask import g, request
+
+    @app.before_request
+    def _start_usage():
+        endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+        g._usage_token = _current_usage.set(RequestUsage(endpoint))
+
+    @app.teardown_request
+    def _finish_usage(error=None):
+        token = g.pop('_usage_token', None)
+        if token is None:
+            return
+        usage = _current_usage.get()
+        if usage is not None and usage.calls:
+            request_llm_tokens.observe(usage.prompt_tokens + usage.completion_tokens, endpoint=usage.endpoint)
+        try:
+            _current_usage.reset(token)
+        except ValueError:
+            # Token created in a different context (e.g. streamed response); just clear it
+            _current_usage.set(None)